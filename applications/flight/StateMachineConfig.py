@@ -1,29 +1,24 @@
-from Tasks.safety import task as safety
-from Tasks.telemetry import task as telemetry
-from Tasks.blink import task as blink
-from Tasks.imu import task as imu
-from Tasks.time import task as time
-from Tasks.gnc import task as gnc
-from Tasks.radio import task as radio
-from Tasks.image import task as image
-from Tasks.deployment_manager import deployment_manager
-from Tasks.hw_monitor import task as hw_monitor
 from TransitionFunctions import announcer, low_power_on, low_power_off
 from config import config  # noqa: F401
 
+# Tasks are given by name ('module.class') so that each is only imported, along with
+# everything it imports, once a state that runs it is entered
 TaskMap = {
-    "Safety": safety,
-    "Telemetry": telemetry,
-    "Blink": blink,
-    "IMU": imu,
-    "Time": time,
-    "GNC": gnc,
-    "Radio": radio,
-    "Image": image,
-    "DeploymentManager": deployment_manager,
-    "HwMonitor": hw_monitor,
+    "Safety": "Tasks.safety.task",
+    "Telemetry": "Tasks.telemetry.task",
+    "Blink": "Tasks.blink.task",
+    "IMU": "Tasks.imu.task",
+    "Time": "Tasks.time.task",
+    "GNC": "Tasks.gnc.task",
+    "Radio": "Tasks.radio.task",
+    "Image": "Tasks.image.task",
+    "DeploymentManager": "Tasks.deployment_manager.deployment_manager",
+    "HwMonitor": "Tasks.hw_monitor.task",
 }
 
+# Run tasks by priority, see tasko.Loop.set_policy for the other policies and PriorityAging
+SchedulingPolicy = 'priority'
+
 TransitionFunctionMap = {
     'Announcer': announcer,
     'LowPowerOn': low_power_on,
@@ -29,12 +29,18 @@ class task(Task):
         if not cubesat.imu:
             return
 
+        # the IMU readings shared with the other tasks, and when they were taken
+        sample_nanos, readings = cubesat.imu_snapshot.get()
+        if readings is None:
+            return
+        _, mag, gyro = readings
+
         # compute control
-        m = bcross(cubesat.magnetic, cubesat.gyro)
+        m = bcross(mag, gyro)
 
         # replace with calls to pycubed lib once it is ready
         if hasattr(cubesat, 'sim') and cubesat.sim:  # detects if we are hooked up to simulator
             print(f">>>m{toStr(m)}")
-            print(f">>>t{time.monotonic_ns()}")
+            print(f">>>t{sample_nanos}")
 
         self.last = time.monotonic()
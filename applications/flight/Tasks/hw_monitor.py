@@ -16,3 +16,9 @@ class task(Task):
         alerts.set_value(self.debug, 'rtc_available', cubesat.rtc is not None)
         alerts.set_value(self.debug, 'neopixel_available', cubesat.neopixel is not None)
         alerts.set_value(self.debug, 'camera_available', cubesat.camera is not None)
+
+        # devices whose last init failed or that were reset after an error, and are waiting out their backoff
+        failing = [name for name, (_, _, failures, _, _) in cubesat.device_stats().items() if failures]
+        if alerts.alerts.get('devices_failing') != len(failing) and failing:
+            self.debug(f'Failing devices: {", ".join(failing)}', log=True)
+        alerts.set_value(self.debug, 'devices_failing', len(failing))
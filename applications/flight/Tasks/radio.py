@@ -8,6 +8,7 @@ from radio_utils.transmission_queue import transmission_queue as tq
 import radio_utils.commands as cdh
 import radio_utils.headers as headers
 import radio_utils.message as message
+from radio_utils.windowed_message import WindowedMessage, unpack_sack
 from pycubed import cubesat
 import settings
 import time
@@ -19,13 +20,14 @@ TX_SKIP = 5  # skip every TX_SKIP transmissions
 tx_ready_counter = 0
 
 TX_UPLINK_ENABLE_TIME = 5 * 60  # 5 minutes
+TQ_JOURNAL = '/sd/tq'
 tx_before_time = 0
 
 def should_transmit():
     """
     Return if we should transmit
     """
-    tx_ready = settings.TX_ALLOWED and not tq.empty() and cubesat.radio.fifo_empty()
+    tx_ready = settings.TX_ALLOWED and not tq.empty() and tq.peek().ready() and cubesat.radio.fifo_empty()
     tx_time_ready = time.time() < tx_before_time
     if tx_ready:
         global tx_ready_counter
@@ -41,6 +43,11 @@ class task(Task):
         self.msg = bytes([])
         self.cmsg_last = None
         self.msg_last = None
+        if cubesat.sdcard and cubesat.vfs:
+            # queue again what was queued before a reset, and journal the queue from now on
+            replayed = tq.open_journal(TQ_JOURNAL)
+            if replayed:
+                self.debug(f'Replayed {replayed} queued messages')
 
     async def main_task(self):
         """
@@ -65,6 +72,7 @@ class task(Task):
             if with_ack:
                 if await cubesat.radio.send_with_ack(packet):
                     msg.ack()
+                    tq.acked(msg)
                 else:
                     msg.no_ack()
             else:
@@ -97,11 +105,17 @@ class task(Task):
                         header == headers.DISK_BUFFERED_MID or
                         header == headers.DISK_BUFFERED_END):
                     self.handle_disk_buffered_message(header, response)
+                elif header == headers.SACK:
+                    self.handle_sack(response)
                 elif header == headers.COMMAND:
                     await self.handle_command(response)
             else:
                 self.debug('No packets received')
 
+            if not tq.empty() and not tq.peek().ready():
+                # what the message waits for didn't come while listening
+                tq.peek().no_ack()
+
     def on_uplink(self):
         """Called when a packet is received"""
         cubesat.c_uplink += 1
@@ -128,6 +142,21 @@ class task(Task):
             self.msg_last = None
             self.msg = str(self.msg, 'utf-8')
 
+    def handle_sack(self, response):
+        """Handler function for the selective acks of windowed transfers"""
+        try:
+            transfer_id, base, bitmap = unpack_sack(response)
+        except Exception as e:
+            self.debug(f'Invalid SACK: {e}')
+            return
+        for msg in tq.queue:
+            if isinstance(msg, WindowedMessage) and msg.transfer_id == transfer_id:
+                msg.sack(base, bitmap)
+                if msg.done():
+                    tq.remove(msg)
+                return
+        self.debug(f'SACK for unknown transfer {transfer_id}')
+
     async def handle_command(self, response):
         """Handler function for commands"""
         if len(response) < 6 or response[:4] != cdh.super_secret_code:
@@ -38,6 +38,7 @@ alerts = AlertManager(
         'rtc_available',
         'neopixel_available',
         'camera_available',
+        'devices_failing',
         'image_queue_full',
         'camera_failed',
         'voltage_low',
@@ -7,17 +7,20 @@ except ImportError:
 from pycubed import cubesat
 from state_machine import state_machine
 from collections import namedtuple
+import lib.boot_profile as boot_profile
+import tasko
 
-# 3 uint8 + 1 uint16 + 11 float32
-# = 49 bytes of data
-# = 52 byte c struct (1 extra to align chars, 2 extra to align short)
-beacon_format = 3 * 'B' + 'H' + 'f' * 11
+# 3 uint8 + 1 uint16 + 11 float32 + 1 uint16 + 1 uint8
+# = 52 bytes of data
+# = 55 byte c struct (1 extra to align chars, 2 extra to align short)
+beacon_format = 3 * 'B' + 'H' + 'f' * 11 + 'H' + 'B'
 
 # Defines what the unpack_beacon will return
 beacon_tuple = namedtuple("beacon_tuple", ("state_index", "datetime_valid_flag", "contact_flag",
                                            "burn_flag", "software_error_count", "boot_count",
                                            "battery_voltage", "cpu_temperature_C", "imu_temperature_C",
-                                           "gyro", "mag", "RSSI_dB", "FEI_Hz"))
+                                           "gyro", "mag", "RSSI_dB", "FEI_Hz",
+                                           "boot_ms", "failed_device_count"))
 
 # 6 float32
 # = 24 bytes of data
@@ -35,12 +38,27 @@ time_tuple = namedtuple("time_tuple", ("tm_min", "tm_sec"))
 
 telemetry_tuple = namedtuple("telemetry_tuple", ("time", "beacon", "system"))
 
+# 1 uint8 + 3 uint16 = 7 byte header, then for each task
+# 4 char + 4 uint32 + 4 uint16 = 28 bytes
+# (packed without alignment, so 8 tasks fit in a single packet)
+profile_format = '<BHHH'
+profile_task_format = '<4sIIIIHHHH'
+PROFILE_MAX_TASKS = 8
+
+# defines what unpack_profile will return, task_profiles is a list of profile_task_tuple
+profile_tuple = namedtuple("profile_tuple", ("idle_permille", "overhead_permille", "coalesced_per_minute",
+                                             "task_profiles"))
+profile_task_tuple = namedtuple("profile_task_tuple", ("name", "runs", "mean_us", "p90_us", "max_us",
+                                                       "max_late_ms", "overruns", "missed", "errors"))
+
 def beacon_packet():
     """Creates a beacon packet containing the: state index byte,
     f_datetime_valid, f_contact and f_burn flags,
     state_error_count, boot count, battery voltage,
     CPU temperature, IMU temperature, gyro reading, mag reading,
-    radio signal strength (RSSI), radio frequency error (FEI).
+    radio signal strength (RSSI), radio frequency error (FEI),
+    milliseconds from main.py starting to the first tasks being scheduled (0 while booting)
+    and the number of devices that failed to initialize while booting (see lib.boot_profile).
 
     This data is packed into a c struct using `struct.pack`.
     """
@@ -57,28 +75,24 @@ def beacon_packet():
     mag = cubesat.magnetic if cubesat.imu else array([nan, nan, nan])
     rssi = cubesat.radio.last_rssi if cubesat.radio else nan
     fei = cubesat.radio.frequency_error if cubesat.radio else nan
+    boot_ms = boot_profile.boot_nanos // 1000000 if boot_profile.boot_nanos is not None else 0
+    failed_devices = len(boot_profile.failed_devices())
     return struct.pack(beacon_format,
                        state_byte, flags, software_error, boot_count,
                        vbatt, cpu_temp, imu_temp,
                        gyro[0], gyro[1], gyro[2],
                        mag[0], mag[1], mag[2],
-                       rssi, fei)
+                       rssi, fei,
+                       min(boot_ms, 0xFFFF), min(failed_devices, 0xFF))
 
 def system_packet():
     """Function for logging system data, packs this data into a
     c struct.
 
-    includes the: lux values from each sun sensor
+    includes the: lux values from each sun sensor (nan if a sensor can't be read)
     """
-    lux_xp = cubesat.sun_xp.lux if cubesat.sun_xp and cubesat.sun_xp.lux is not None else nan
-    lux_yp = cubesat.sun_yp.lux if cubesat.sun_yp and cubesat.sun_yp.lux is not None else nan
-    lux_zp = cubesat.sun_zp.lux if cubesat.sun_zp and cubesat.sun_zp.lux is not None else nan
-    lux_xn = cubesat.sun_xn.lux if cubesat.sun_xn and cubesat.sun_xn.lux is not None else nan
-    lux_yn = cubesat.sun_yn.lux if cubesat.sun_yn and cubesat.sun_yn.lux is not None else nan
-    lux_zn = cubesat.sun_zn.lux if cubesat.sun_zn and cubesat.sun_zn.lux is not None else nan
-    return struct.pack(system_format,
-                       lux_xp, lux_yp, lux_zp,
-                       lux_xn, lux_yn, lux_zn)
+    lux = [nan if value is None else value for value in cubesat.sun_snapshot.values()]
+    return struct.pack(system_format, *lux)
 
 def time_packet(t):
     """returns a struct containing only the minutes and seconds, which are
@@ -94,6 +108,39 @@ def time_packet(t):
 def telemetry_packet(t):
     return bytearray(time_packet(t)) + bytearray(beacon_packet()) + bytearray(system_packet())
 
+def profile_packet():
+    """Creates a packet summarizing the task profiler statistics (see tasko's Loop.enable_profiling):
+    the fraction of time the loop was idle and the scheduler's own overhead (in permille),
+    the wakeups saved per minute by coalescing sleepers,
+    then for the (up to 8) tasks that took the most time: the first 4 characters of the task name,
+    run count, mean/90th percentile/max execution time (µs), max lateness (ms),
+    overrun count, missed window count and error count.
+
+    Contains no tasks if profiling is disabled.
+    """
+    stats = tasko.get_loop().stats
+    if stats is None:
+        return struct.pack(profile_format, 0, 0, 0, 0)
+
+    total = max(stats.total_nanos(), 1)
+    task_stats = sorted(stats.tasks.values(), key=lambda t: t.total_nanos, reverse=True)[:PROFILE_MAX_TASKS]
+    pkt = bytearray(struct.pack(profile_format, len(task_stats),
+                                min(stats.idle_nanos * 1000 // total, 1000),
+                                min(max(stats.overhead_nanos(), 0) * 1000 // total, 1000),
+                                min(int(stats.coalesced_per_minute()), 0xFFFF)))
+    for t in task_stats:
+        task = state_machine.tasks.get(t.name) if hasattr(state_machine, 'tasks') else None
+        errors = task.errors if task is not None else 0
+        scheduled = state_machine.scheduled_tasks.get(t.name) if hasattr(state_machine, 'scheduled_tasks') else None
+        missed = scheduled.missed_windows if scheduled is not None else 0
+        pkt += struct.pack(profile_task_format, t.name.encode()[:4], min(t.runs, 0xFFFFFFFF),
+                           min(t.mean_nanos() // 1000, 0xFFFFFFFF),
+                           min(t.percentile_nanos(90) // 1000, 0xFFFFFFFF),
+                           min(t.max_nanos // 1000, 0xFFFFFFFF),
+                           min(t.max_late_nanos // 1000000, 0xFFFF),
+                           min(t.overruns, 0xFFFF), min(missed, 0xFFFF), min(errors, 0xFFFF))
+    return pkt
+
 def human_time_stamp(t):
     """Returns a human readable time stamp in the format: 'boot_year.month.day_hour:min'
     Gets the time from the RTC.
@@ -118,7 +165,8 @@ def unpack_beacon(bytes):
      vbatt, cpu_temp, imu_temp,
      gyro0, gyro1, gyro2,
      mag0, mag1, mag2,
-     rssi, fei) = struct.unpack(beacon_format, bytes)
+     rssi, fei,
+     boot_ms, failed_device_count) = struct.unpack(beacon_format, bytes)
 
     gyro = array([gyro0, gyro1, gyro2])
     mag = array([mag0, mag1, mag2])
@@ -127,7 +175,8 @@ def unpack_beacon(bytes):
                         bool(flags & (0b1 << 0)), software_error,
                         boot_count, vbatt, cpu_temp,
                         imu_temp, gyro, mag,
-                        rssi, fei)
+                        rssi, fei,
+                        boot_ms, failed_device_count)
 
 
 def unpack_system(bytes):
@@ -150,3 +199,18 @@ def unpack_telemetry(bytes):
     beacon = unpack_beacon(bytes[time_buffer:time_buffer + beacon_buffer])
     system = unpack_system(bytes[time_buffer + beacon_buffer:time_buffer + beacon_buffer + system_buffer])
     return telemetry_tuple(t, beacon, system)
+
+def unpack_profile(bytes):
+    """Unpacks the profiler summary packed by `profile_packet`"""
+    header_size = struct.calcsize(profile_format)
+    task_size = struct.calcsize(profile_task_format)
+    header = struct.unpack(profile_format, bytes[:header_size])
+    (count, idle_permille, overhead_permille, coalesced_per_minute) = header
+    task_profiles = []
+    for i in range(count):
+        start = header_size + i * task_size
+        (name, runs, mean_us, p90_us, max_us,
+         max_late_ms, overruns, missed, errors) = struct.unpack(profile_task_format, bytes[start:start + task_size])
+        task_profiles.append(profile_task_tuple(name.rstrip(b'\x00').decode(), runs, mean_us, p90_us, max_us,
+                                                max_late_ms, overruns, missed, errors))
+    return profile_tuple(idle_permille, overhead_permille, coalesced_per_minute, task_profiles)
@@ -13,12 +13,15 @@ from radio_utils import headers
 from radio_utils.disk_buffered_message import DiskBufferedMessage
 from radio_utils.memory_buffered_message import MemoryBufferedMessage
 from radio_utils.image_message import ImageMessage
+from radio_utils.windowed_message import WindowedMessage
+from radio_utils.transfer_index import transfer_index
+from radio_utils.fec_message import FECMessage, fec_index
 from radio_utils.message import Message
-import json
+from radio_utils.read_ahead import read_ahead
 import supervisor
-from logs import beacon_packet
-import msgpack
-from io import BytesIO
+from logs import beacon_packet, profile_packet
+import tasko
+import files
 import struct
 
 NO_OP = b'\x00\x00'
@@ -39,6 +42,17 @@ GET_RTC_UTIME = b'\x00\x15'
 SET_RTC = b'\x00\x16'
 CLEAR_TX_QUEUE = b'\x00\x17'
 REQUEST_IMAGE = b'\x00\x18'
+SET_PROFILING = b'\x00\x19'
+REQUEST_PROFILE = b'\x00\x20'
+SET_TRACING = b'\x00\x21'
+REQUEST_SCHEDULABILITY = b'\x00\x22'
+REQUEST_FILE_WINDOWED = b'\x00\x23'
+REQUEST_IMAGE_WINDOWED = b'\x00\x24'
+RESUME_TRANSFER = b'\x00\x25'
+LIST_MISSING = b'\x00\x26'
+LIST_TRANSFERS = b'\x00\x27'
+REQUEST_IMAGE_FEC = b'\x00\x28'
+RESEND_FEC_BLOCKS = b'\x00\x29'
 
 COMMAND_ERROR_PRIORITY = 9
 BEACON_PRIORITY = 10
@@ -83,6 +97,21 @@ def request_file(task, file):
         task.debug(f'File not found: {file}')
         tq.push(Message(9, b'File not found', with_ack=True))
 
+def request_file_windowed(task, file):
+    """Request a file to be downlinked as a selective-repeat transfer, see radio_utils.windowed_message
+
+    :param task: The task that called this function
+    :param file: The path to the file to downlink
+    :type file: str"""
+    file = str(file, 'utf-8')
+    if file_exists(file):
+        msg = WindowedMessage(file)
+        task.debug(f'Sending {file} as transfer {msg.transfer_id}')
+        tq.push(msg)
+    else:
+        task.debug(f'File not found: {file}')
+        tq.push(Message(9, b'File not found', with_ack=True))
+
 def list_dir(task, path):
     """List the contents of a directory, and downlink the result
 
@@ -90,6 +119,7 @@ def list_dir(task, path):
     :param path: The path to the directory to list
     :type path: str
     """
+    import json
     path = str(path, 'utf-8')
     res = os.listdir(path)
     res = json.dumps(res)
@@ -109,8 +139,10 @@ def move_file(task, args):
     :param args: json string [source, dest]
     :type args: str
     """
+    import json
     try:
         args = json.loads(args)
+        read_ahead.clear()
         os.rename(args[0], args[1])
         task.debug('Sucess moving file')
         tq.push(Message(9, b'Success moving file'))
@@ -126,6 +158,7 @@ def copy_file(task, args):
     :param args: json string [source, dest]
     :type args: str
     """
+    import json
     try:
         args = json.loads(args)
         with open(args[0], 'rb') as source, open(args[1], 'cb') as dest:
@@ -144,6 +177,7 @@ def delete_file(task, file):
     :type file: str
     """
     try:
+        read_ahead.clear()
         os.remove(file)
         tq.push(Message(9, b'Success deleting file'))
     except Exception as e:
@@ -193,6 +227,7 @@ def set_rtc_utime(task, args):
 def clear_tx_queue(task):
     """Clear the transmission queue"""
     tq.clear()
+    read_ahead.clear()
     task.debug('Cleared transmission queue')
 
 def request_image(task):
@@ -205,6 +240,156 @@ def request_image(task):
         img = ImageMessage(filepath)
         tq.push(img)
 
+def request_image_windowed(task):
+    """Downlink the next image as a selective-repeat transfer, see radio_utils.windowed_message"""
+    if iq.empty():
+        task.debug("empty image queue")
+        tq.push(Message(9, b'empty image queue', with_ack=True))
+    else:
+        tq.push(WindowedMessage(iq.pop(), priority=2))
+
+def request_image_fec(task, args=b''):
+    """Downlink the next image with forward error correction, see radio_utils.fec_message
+
+    :param task: The task that called this function
+    :param args: Optionally [data chunks per block: u8][parity chunks per block: u8]
+    """
+    if iq.empty():
+        task.debug("empty image queue")
+        tq.push(Message(9, b'empty image queue', with_ack=True))
+        return
+    if len(args) >= 2:
+        # an invalid block size raises before the image leaves the queue
+        msg = FECMessage(iq.peek(), args[0], args[1], index=fec_index)
+    else:
+        msg = FECMessage(iq.peek(), index=fec_index)
+    iq.pop()
+    task.debug(f'Sending {msg.path} as FEC transfer {msg.transfer_id}')
+    tq.push(msg)
+
+def resend_fec_blocks(task, args):
+    """Send again the blocks of an FEC transfer the ground couldn't decode.
+    The ground has every other block, without blocks the transfer is complete and is forgotten.
+
+    :param task: The task that called this function
+    :param args: [transfer id: u16][data chunks per block: u8][parity chunks per block: u8] then [block: u16]...
+    """
+    transfer_id, data, parity = struct.unpack_from('>HBB', args)
+    blocks = list(struct.unpack_from(f'>{(len(args) - 4) // 2}H', args, 4))
+    for msg in tq.queue:
+        if isinstance(msg, FECMessage) and msg.transfer_id == transfer_id:
+            tq.remove(msg)
+            break
+    record = fec_index.load(transfer_id)
+    if record is None:
+        _downlink_msg(f'Unknown transfer {transfer_id}'.encode(), priority=COMMAND_ERROR_PRIORITY)
+        return
+    if not blocks:
+        fec_index.remove(transfer_id)
+        task.debug(f'FEC transfer {transfer_id} complete')
+        return
+    if record.changed():
+        fec_index.remove(transfer_id)
+        _downlink_msg(f'Transfer {transfer_id}: file changed'.encode(), priority=COMMAND_ERROR_PRIORITY)
+        return
+    record.acked = bytearray(len(record.acked))
+    for block in range(record.count):
+        if block not in blocks:
+            record.acked[block >> 3] |= 1 << (block & 7)
+    fec_index.save(record)
+    msg = FECMessage(record.path, data, parity, index=fec_index, record=record)
+    task.debug(f'Sending {len(msg.blocks)} blocks of FEC transfer {transfer_id} again')
+    tq.push(msg)
+
+def resume_transfer(task, args):
+    """Resume a windowed transfer that was cut short (by the end of a pass, a reboot or CLEAR_TX_QUEUE),
+    sending only the chunks the ground hasn't acknowledged
+
+    :param task: The task that called this function
+    :param args: [transfer id: u16] optionally followed by [first chunk to send: u16],
+                 the chunks before it count as received
+    """
+    transfer_id = struct.unpack_from('>H', args)[0]
+    start = struct.unpack_from('>H', args, 2)[0] if len(args) >= 4 else 0
+    record = transfer_index.load(transfer_id)
+    if record is None:
+        _downlink_msg(f'Unknown transfer {transfer_id}'.encode(), priority=COMMAND_ERROR_PRIORITY)
+        return
+    if record.changed():
+        transfer_index.remove(transfer_id)
+        _downlink_msg(f'Transfer {transfer_id}: file changed'.encode(), priority=COMMAND_ERROR_PRIORITY)
+        return
+    for msg in tq.queue:
+        if isinstance(msg, WindowedMessage) and msg.transfer_id == transfer_id:
+            tq.remove(msg)
+            break
+    msg = WindowedMessage.resume(record, start, index=transfer_index)
+    if msg.done():
+        # nothing left to send, e.g. start is past the last chunk
+        transfer_index.remove(transfer_id)
+        _downlink_msg(f'Transfer {transfer_id} complete'.encode())
+        return
+    task.debug(f'Resuming transfer {transfer_id} at chunk {msg.base}/{msg.count}')
+    tq.push(msg)
+
+def list_missing(task, args):
+    """Downlink the chunks of a windowed transfer the ground hasn't acknowledged, as json
+    {"id", "path", "size", "crc", "count", "missing": [[first, last], ...]}
+
+    :param task: The task that called this function
+    :param args: [transfer id: u16]
+    """
+    import json
+    transfer_id = struct.unpack_from('>H', args)[0]
+    record = transfer_index.load(transfer_id)
+    if record is None:
+        _downlink_msg(f'Unknown transfer {transfer_id}'.encode(), priority=COMMAND_ERROR_PRIORITY)
+        return
+    _downlink(json.dumps({'id': transfer_id, 'path': record.path, 'size': record.size, 'crc': record.crc,
+                          'count': record.count, 'missing': record.missing_ranges()}))
+
+def list_transfers(task):
+    """Downlink the windowed transfers that are not complete, as json [[id, path, count, missing chunks], ...]"""
+    import json
+    _downlink(json.dumps([[record.transfer_id, record.path, record.count, len(record.missing())]
+                          for record in transfer_index.records()]))
+
+def set_profiling(task, args):
+    """Enable (first byte of args is not 0) or disable (it is 0) the task profiler.
+    Enabling it again resets the statistics."""
+    enabled = args[0] != 0
+    tasko.get_loop().enable_profiling(enabled)
+    task.debug(f'Profiling {"enabled" if enabled else "disabled"}')
+
+def request_profile(task):
+    """Request a summary of the task profiler statistics, see logs.profile_packet"""
+    _downlink_msg(profile_packet(), header=headers.PROFILE)
+
+def set_tracing(task, args):
+    """Start (first byte of args is not 0) or stop (it is 0) recording a trace of the task loop.
+    Stopping writes the trace to /sd/logs/trace/, from where it can be requested with REQUEST_FILE
+    and read with buildtools/trace_report.py. Starting again discards the unsaved trace."""
+    loop = tasko.get_loop()
+    if args[0] != 0:
+        loop.enable_tracing()
+        task.debug('Tracing enabled')
+        return
+    if loop.trace is not None and cubesat.sdcard and cubesat.vfs:
+        directory = f'/sd/logs/trace/{cubesat.c_boot:05}'
+        files.mkdirp(directory)
+        path = f'{directory}/{time.monotonic_ns()}.trace'
+        loop.trace.dump(path)
+        task.debug(f'Trace saved to {path}')
+    loop.enable_tracing(False)
+    task.debug('Tracing disabled')
+
+def request_schedulability(task):
+    """Request a schedulability report of the current state, with the iteration times
+    measured by the task profiler (see SET_PROFILING)"""
+    from state_machine import state_machine
+    from lib.schedulability import state_report, format_report
+    _downlink(format_report(state_report(state_machine, tasko.get_loop())))
+
 
 """
 HELPER FUNCTIONS
@@ -249,13 +434,19 @@ def file_exists(path):
     except Exception:
         return False
 
+# msgpack is imported on first use, to keep it out of RAM until a command needs it
+
 def _pack(data):
+    import msgpack
+    from io import BytesIO
     b = BytesIO()
     msgpack.pack(data, b)
     b.seek(0)
     return b.read()
 
 def _unpack(data):
+    import msgpack
+    from io import BytesIO
     b = BytesIO(data)
     return msgpack.unpack(b)
 
@@ -279,6 +470,22 @@ commands = {
     SET_RTC_UTIME: {"function": set_rtc_utime, "name": "SET_RTC_UTIME", "will_respond": False, "has_args": True},
     CLEAR_TX_QUEUE: {"function": clear_tx_queue, "name": "CLEAR_TX_QUEUE", "will_respond": False, "has_args": False},
     REQUEST_IMAGE: {"function": request_image, "name": "REQUEST_IMAGE", "will_respond": True, "has_args": False},
+    SET_PROFILING: {"function": set_profiling, "name": "SET_PROFILING", "will_respond": False, "has_args": True},
+    REQUEST_PROFILE: {"function": request_profile, "name": "REQUEST_PROFILE", "will_respond": True, "has_args": False},
+    SET_TRACING: {"function": set_tracing, "name": "SET_TRACING", "will_respond": False, "has_args": True},
+    REQUEST_SCHEDULABILITY: {"function": request_schedulability, "name": "REQUEST_SCHEDULABILITY",
+                             "will_respond": True, "has_args": False},
+    REQUEST_FILE_WINDOWED: {"function": request_file_windowed, "name": "REQUEST_FILE_WINDOWED",
+                            "will_respond": True, "has_args": True},
+    REQUEST_IMAGE_WINDOWED: {"function": request_image_windowed, "name": "REQUEST_IMAGE_WINDOWED",
+                             "will_respond": True, "has_args": False},
+    RESUME_TRANSFER: {"function": resume_transfer, "name": "RESUME_TRANSFER", "will_respond": True, "has_args": True},
+    LIST_MISSING: {"function": list_missing, "name": "LIST_MISSING", "will_respond": True, "has_args": True},
+    LIST_TRANSFERS: {"function": list_transfers, "name": "LIST_TRANSFERS", "will_respond": True, "has_args": False},
+    REQUEST_IMAGE_FEC: {"function": request_image_fec, "name": "REQUEST_IMAGE_FEC", "will_respond": True,
+                        "has_args": True},
+    RESEND_FEC_BLOCKS: {"function": resend_fec_blocks, "name": "RESEND_FEC_BLOCKS", "will_respond": True,
+                        "has_args": True},
 }
 
 super_secret_code = b'p\xba\xb8C'
@@ -1,12 +1,13 @@
 from .message import Message
 from . import headers
 from . import PACKET_DATA_LEN
+from .read_ahead import read_ahead
 import os
 
 class DiskBufferedMessage(Message):
     """Transmits the message PACKET_DATA_LEN bytes at a time.
     Sets special headers for the first packet, middle packets, and last packet.
-    Reads from a file one chunk at a time.
+    Reads from a file one chunk at a time, through the shared read-ahead.
 
     :param priority: The priority of the message (higher is better)
     :type priority: int
@@ -22,17 +23,18 @@ class DiskBufferedMessage(Message):
         self.path = path
         self.msg_len = os.stat(path)[6]
         self.file_err = False
+        # the file may have been rewritten since it was last read
+        read_ahead.close(path)
 
     def packet(self):
         """Reads the next chunk of data from sd, and returns this is a packet.
         Always requests an ack."""
         try:
-            with open(self.path, "rb") as f:
-                f.seek(self.cursor)
-                payload = f.read(self.packet_len)
+            payload = read_ahead.read(self.path, self.cursor, self.packet_len)
         except Exception as e:
             print(f'Error reading file {self.path}: {e}')
             self.file_err = True
+            read_ahead.close(self.path)
             pkt = bytearray([headers.DEFAULT]) + bytearray("Error reading file", "utf-8")
             return pkt, True
         pkt = bytearray(len(payload) + 1)
@@ -51,6 +53,8 @@ class DiskBufferedMessage(Message):
 
     def ack(self):
         self.cursor += self.packet_len
+        if self.done():
+            read_ahead.close(self.path)
 
     def __repr__(self) -> str:
         return f'<Disk Buffer: {self.path}>'
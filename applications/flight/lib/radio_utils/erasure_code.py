@@ -0,0 +1,66 @@
+"""Reed-Solomon erasure code over GF(2^8), in the systematic Cauchy form: a block of n data
+chunks is sent with k parity chunks, and any n of the n + k chunks give the data back.
+
+Parity chunk j is the sum over the data chunks i of coefficient(j, i) * chunk i, byte by byte.
+The coefficients are the Cauchy matrix 1 / (x_j + y_i), with x_j = 255 - j and y_i = i, every
+square submatrix of which is invertible, so n + k must not exceed 256.
+
+Only the encoder runs on the satellite, the decoder is ground/fec_decoder.py.
+"""
+
+# GF(2^8) with the polynomial x^8 + x^4 + x^3 + x^2 + 1
+POLYNOMIAL = 0x11d
+# LOG[0] points past the periodic part of EXP (indices below 510), and EXP is 0 from there up to
+# LOG[0] + LOG[0], so that EXP[LOG[a] + LOG[b]] is a * b without testing either for 0
+LOG_ZERO = 510
+
+EXP = bytearray(2 * LOG_ZERO + 1)
+LOG = [LOG_ZERO] * 256
+
+
+def _tables():
+    x = 1
+    for i in range(255):
+        EXP[i] = EXP[i + 255] = x
+        LOG[x] = i
+        x <<= 1
+        if x & 0x100:
+            x ^= POLYNOMIAL
+
+
+_tables()
+
+
+def gf_mul(a, b):
+    return EXP[LOG[a] + LOG[b]]
+
+
+def gf_inv(a):
+    if a == 0:
+        raise ZeroDivisionError('0 has no inverse in GF(2^8)')
+    return EXP[255 - LOG[a]]
+
+
+def coefficient(j, i):
+    """The coefficient of data chunk i in parity chunk j"""
+    return gf_inv((255 - j) ^ i)
+
+
+def encode_parity(chunks, j, p):
+    """Fill the buffer p with parity chunk j of the data chunks, as long as p.
+    Encoding the parity chunks one at a time spreads a block's work over the packets sending it."""
+    for b in range(len(p)):
+        p[b] = 0
+    for i, chunk in enumerate(chunks):
+        log_c = LOG[coefficient(j, i)]
+        for b in range(len(p)):
+            p[b] ^= EXP[LOG[chunk[b]] + log_c]
+
+
+def encode(chunks, parity):
+    """Fill the parity buffers with the parity of the data chunks.
+    The chunks are as long as the parity buffers, len(chunks) + len(parity) <= 256."""
+    if len(chunks) + len(parity) > 256:
+        raise ValueError('too many chunks in a block')
+    for j, p in enumerate(parity):
+        encode_parity(chunks, j, p)
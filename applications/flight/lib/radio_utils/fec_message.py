@@ -0,0 +1,137 @@
+"""Downlink of a file with forward error correction: the file is split into blocks of `data` chunks,
+each sent followed by `parity` Reed-Solomon parity chunks (see radio_utils.erasure_code), all
+without acks. The ground rebuilds the lost chunks of a block from any `data` of its chunks that
+arrived, and only asks again for the blocks it lost more than `parity` chunks of.
+
+Chunk packet (downlink):
+    [FEC_CHUNK][transfer id: u16][block: u16][index: u8][data: u8][parity: u8][file size: u32][chunk]
+Block b holds the data chunks from b * data on, the last block may hold fewer. The data chunks
+of a block come first (by index), then its parity chunks. Data chunks are FEC_CHUNK_LEN bytes
+but the last one of the file, parity chunks always are.
+
+After a pass the ground uplinks RESEND_FEC_BLOCKS with the blocks it still needs,
+transfers are recorded in fec_index until the ground has every block.
+"""
+import os
+import struct
+from .message import Message
+from . import headers
+from . import PACKET_DATA_LEN
+from .erasure_code import encode_parity
+from .read_ahead import read_ahead
+from .transfer_index import TransferIndex, TransferRecord, file_crc
+
+FEC_HEADER = '>HHBBBI'
+FEC_HEADER_LEN = struct.calcsize(FEC_HEADER)
+FEC_CHUNK_LEN = PACKET_DATA_LEN - FEC_HEADER_LEN
+DATA = 16
+PARITY = 4
+
+# the records count blocks rather than chunks, so they are kept apart from the windowed transfers
+fec_index = TransferIndex('/sd/fec')
+
+# transfer ids of the messages that are not recorded in an index
+_next_transfer_id = 0
+
+
+def block_count(size, data):
+    """Number of blocks of data chunks a file of size bytes is sent in"""
+    chunks = max(1, (size + FEC_CHUNK_LEN - 1) // FEC_CHUNK_LEN)
+    return (chunks + data - 1) // data
+
+
+class FECMessage(Message):
+    """Sends a file in blocks of data and parity chunks, see the module description.
+
+    :param path: The path to the file to send
+    :type path: str
+    :param data: Data chunks per block
+    :param parity: Parity chunks per block, data + parity <= 255
+    :param index: The TransferIndex the transfer is recorded in, None to not record it
+    :param record: The TransferRecord of a transfer to send blocks of again
+    :param blocks: The blocks to send, the blocks the record is missing by default
+    """
+
+    def __init__(self, path, data=DATA, parity=PARITY, priority=2, index=fec_index, record=None, blocks=None):
+        global _next_transfer_id
+        if not 0 < data or not 0 <= parity or data + parity > 255:
+            raise ValueError(f'invalid block of {data} data and {parity} parity chunks')
+        self.priority = priority
+        self.path = path
+        self.data = data
+        self.parity = parity
+        self.index = index
+        if record is None:
+            size = os.stat(path)[6]
+            if index is None:
+                record = TransferRecord(_next_transfer_id, path, size, 0, block_count(size, data))
+                _next_transfer_id = (_next_transfer_id + 1) & 0xffff
+            else:
+                record = TransferRecord(index.next_id(), path, size, file_crc(path), block_count(size, data))
+                index.save(record)
+        elif record.count != block_count(record.size, data):
+            raise ValueError(f'transfer {record.transfer_id} was sent in blocks of another size')
+        self.record = record
+        self.transfer_id = record.transfer_id
+        self.msg_len = record.size
+        self.chunk_count = max(1, (record.size + FEC_CHUNK_LEN - 1) // FEC_CHUNK_LEN)
+        self.blocks = record.missing() if blocks is None else [b for b in blocks if b < record.count]
+        # the block being sent, its data and parity chunks and the next one to send
+        self._chunks = [bytearray(FEC_CHUNK_LEN) for _ in range(data + parity)]
+        self._lengths = [0] * data
+        self._block_data = 0
+        self._next = 0
+        self.file_err = False
+        # the file may have been rewritten since it was last read
+        read_ahead.close(path)
+
+    def _load(self, block):
+        """Read the data chunks of block, its parity chunks are encoded as they are sent"""
+        first = block * self.data
+        self._block_data = min(self.data, self.chunk_count - first)
+        for i in range(self._block_data):
+            chunk = self._chunks[i]
+            view = read_ahead.read(self.path, (first + i) * FEC_CHUNK_LEN, FEC_CHUNK_LEN)
+            n = len(view)
+            chunk[:n] = view
+            for b in range(n, FEC_CHUNK_LEN):
+                chunk[b] = 0
+            self._lengths[i] = n
+
+    def packet(self):
+        """The next chunk of the block being sent, parity chunks after data chunks.
+        A parity chunk is encoded when it is sent, so no call encodes the whole block's parity."""
+        block = self.blocks[0]
+        try:
+            if self._next == 0:
+                self._load(block)
+        except Exception as e:
+            print(f'Error reading file {self.path}: {e}')
+            self.file_err = True
+            read_ahead.close(self.path)
+            pkt = bytearray([headers.DEFAULT]) + bytearray("Error reading file", "utf-8")
+            return pkt, False
+        i = self._next
+        if i < self._block_data:
+            chunk = memoryview(self._chunks[i])[:self._lengths[i]]
+        else:
+            j = i - self._block_data
+            chunk = self._chunks[self.data + j]
+            encode_parity(self._chunks[:self._block_data], j, chunk)
+        pkt = bytearray(1 + FEC_HEADER_LEN + len(chunk))
+        pkt[0] = headers.FEC_CHUNK
+        struct.pack_into(FEC_HEADER, pkt, 1, self.transfer_id, block, i, self.data, self.parity, self.msg_len)
+        pkt[1 + FEC_HEADER_LEN:] = chunk
+        self._next += 1
+        if self._next == self._block_data + self.parity:
+            self._next = 0
+            self.blocks.pop(0)
+            if not self.blocks:
+                read_ahead.close(self.path)
+        return pkt, False
+
+    def done(self):
+        return not self.blocks or self.file_err
+
+    def __repr__(self) -> str:
+        return f'<FEC: {self.path} #{self.transfer_id} {self.data}+{self.parity}, {len(self.blocks)} blocks to send>'
@@ -12,6 +12,15 @@ IMAGE_START = 0xf9
 IMAGE_MID = 0xf8
 IMAGE_END = 0xf7
 
+WINDOW_CHUNK = 0xf6
+WINDOW_POLL = 0xf5
+
+FEC_CHUNK = 0xf4
+
 COMMAND = 0x01
 
 BEACON = 0x02
+
+PROFILE = 0x03
+
+SACK = 0x04
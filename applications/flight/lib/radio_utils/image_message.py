@@ -1,5 +1,6 @@
 from .message import Message
 from radio_utils import PACKET_DATA_LEN
+from radio_utils.read_ahead import read_ahead
 import os
 # from configuration.radio_configuration import PROTOCOL
 from .headers import IMAGE_END, IMAGE_MID, IMAGE_START
@@ -45,6 +46,8 @@ class ImageMessage(Message):
         self.file_err = False
         self.scan_size = ((self.packet_size - 1) // 64) * 64
         self.priority = 2
+        # the file may have been rewritten since it was last read
+        read_ahead.close(filepath)
 
     def packet(self) -> bool:
         """
@@ -63,40 +66,37 @@ class ImageMessage(Message):
             Should use 64 byte increments in the image scan section
             """
             try:
-                with open(self.filepath, "rb") as file:
-                    file.seek(self.cursor)
-                    data = file.read(self.scan_size)
+                data = read_ahead.read(self.filepath, self.cursor, self.scan_size)
             except Exception as e:
                 print(f"error reading from image file: {e}")
                 self.file_err = True
+                read_ahead.close(self.filepath)
 
         else:
             """
             If we are in the header bytes still
             """
             try:
-                with open(self.filepath, "rb") as file:
-                    file.seek(self.cursor)
-                    data = file.read(self.packet_size)
+                data = read_ahead.read(self.filepath, self.cursor, self.packet_size)
             except Exception as e:
                 print(f"error reading from image file: {e}")
                 self.file_err = True
+                read_ahead.close(self.filepath)
 
         self.sent_packet_len = len(data) + 1
         packet = bytearray(self.sent_packet_len)
+        packet[1:] = data
 
         if self.cursor == 0:
             """start packet"""
             packet[0] = IMAGE_START
-        elif self.EOI in data:
+        elif packet.find(self.EOI, 1) != -1:
             """end packet"""
             packet[0] = IMAGE_END
         else:
             """mid packet"""
             packet[0] = IMAGE_MID
 
-        packet[1:] = data
-
         # always needs an ack for these packets
         return packet, True
 
@@ -111,6 +111,8 @@ class ImageMessage(Message):
             self.in_scan = True
         # cursor moves by packet len minus the 1 byte header
         self.cursor += self.sent_packet_len - 1
+        if self.done():
+            read_ahead.close(self.filepath)
 
     def __repr__(self) -> str:
         return f'<Image: {self.filepath}'
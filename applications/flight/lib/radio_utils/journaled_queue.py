@@ -0,0 +1,282 @@
+"""A priority queue of messages that journals itself to the SD card, so that the messages queued
+before a watchdog reset or a RELOAD are sent after it rather than lost.
+
+The journal is a text file of json events, one per line, appended as the queue changes:
+    ["push", id, descriptor]   a message was queued, see describe()
+    ["ack", id, cursor]        a buffered message was acknowledged up to cursor
+    ["pop", id]                a message was sent, or removed from the queue
+Replaying the events rebuilds the queue.
+
+To bound how much is written to the card the journal is compacted into the other of two files
+once it is COMPACT_RATIO times larger than the queue it describes (and at least COMPACT_MIN bytes):
+    ["gen", generation]        one more than the generation of the other file
+    ["push", id, descriptor]   for every message queued
+    ["snapshot"]               the file is complete
+so the bytes written stay within a constant factor of the events journaled. Replay starts from
+the complete file of the highest generation, a reset while compacting leaves the previous file.
+Acks are only journaled every ACK_EVERY bytes, after a reset a buffered message sends the bytes
+since the last journaled ack again.
+
+json is imported once the journal is opened, without an SD card it stays out of RAM.
+"""
+from binascii import hexlify, unhexlify
+from .priority_queue import PriorityQueue
+
+COMPACT_RATIO = 4
+COMPACT_MIN = 4096
+ACK_EVERY = 2048
+
+# descriptor kinds of the message classes that can be journaled, by class name
+# so that the message modules are only imported to replay
+KINDS = {
+    'Message': 'm',
+    'MemoryBufferedMessage': 'mb',
+    'DiskBufferedMessage': 'd',
+    'ImageMessage': 'i',
+    'WindowedMessage': 'w',
+    'FECMessage': 'f',
+}
+
+
+def describe(msg):
+    """Json-able descriptor of a message, what restore() needs to rebuild it.
+    None if the message can't be journaled."""
+    kind = KINDS.get(type(msg).__name__)
+    if kind == 'm':
+        return [kind, msg.priority, str(hexlify(msg.str), 'ascii'), msg.with_ack, msg.header]
+    if kind == 'mb':
+        return [kind, str(hexlify(msg.str), 'ascii'), msg.cursor]
+    if kind == 'd':
+        return [kind, msg.path, msg.cursor]
+    if kind == 'i':
+        return [kind, msg.filepath, msg.cursor]
+    if kind == 'w' and msg.index is not None:
+        # what was acknowledged is kept in the transfer index
+        return [kind, msg.transfer_id, msg.priority, msg.index.directory]
+    if kind == 'f' and msg.index is not None:
+        return [kind, msg.transfer_id, msg.priority, msg.index.directory, msg.data, msg.parity, msg.blocks]
+    return None
+
+
+def restore(descriptor):
+    """The message of a descriptor, None if it can't be sent anymore (e.g. its file was deleted)"""
+    kind = descriptor[0]
+    try:
+        if kind == 'm':
+            from .message import Message
+            _, priority, data, with_ack, header = descriptor
+            return Message(priority, unhexlify(data), with_ack=with_ack, header=header)
+        if kind == 'mb':
+            from .memory_buffered_message import MemoryBufferedMessage
+            msg = MemoryBufferedMessage(unhexlify(descriptor[1]))
+        elif kind == 'd':
+            from .disk_buffered_message import DiskBufferedMessage
+            msg = DiskBufferedMessage(descriptor[1])
+        elif kind == 'i':
+            from .image_message import ImageMessage
+            msg = ImageMessage(descriptor[1])
+        elif kind == 'w':
+            from .transfer_index import TransferIndex, transfer_index
+            from .windowed_message import WindowedMessage
+            _, transfer_id, priority, directory = descriptor
+            index = transfer_index if directory == transfer_index.directory else TransferIndex(directory)
+            record = index.load(transfer_id)
+            if record is None or record.changed():
+                return None
+            return WindowedMessage.resume(record, priority=priority, index=index)
+        elif kind == 'f':
+            from .transfer_index import TransferIndex
+            from .fec_message import FECMessage, fec_index
+            _, transfer_id, priority, directory, data, parity, blocks = descriptor
+            index = fec_index if directory == fec_index.directory else TransferIndex(directory)
+            record = index.load(transfer_id)
+            if record is None or record.changed():
+                return None
+            return FECMessage(record.path, data, parity, priority, index, record, blocks)
+        else:
+            return None
+        msg.cursor = descriptor[2]
+        return msg
+    except Exception as e:
+        print(f'Error restoring queued message {descriptor}: {e}')
+        return None
+
+
+class JournaledQueue(PriorityQueue):
+    """PriorityQueue of messages journaled to a directory, see the module description.
+    Nothing is journaled until open_journal() is called.
+    Failing to write the journal (e.g. the SD card was removed) stops journaling, the queue keeps working.
+
+    The radio task calls acked() when a message was acknowledged, to journal its cursor.
+    """
+
+    def __init__(self, queue, limit=1000) -> None:
+        super().__init__(queue, limit)
+        self.directory = None
+        # journal id and last journaled ack block of the journaled messages, by id(msg)
+        self._journaled = {}
+        self._next_id = 0
+        self._generation = 0
+        self._path = None
+        self._size = 0
+        self._snapshot_size = 0
+        self.writes = 0
+        self.bytes_written = 0
+
+    def open_journal(self, directory):
+        """Journal to directory from now on, first queueing the messages its journal has left.
+        Returns the number of messages replayed."""
+        if self.directory is not None:
+            return 0
+        import files
+        files.mkdirp(directory)
+        self.directory = directory
+        generation, events = self._latest()
+        replayed = 0
+        for msg in self._replay(events):
+            try:
+                super().push(msg)
+                replayed += 1
+            except Exception as e:
+                print(f'Error replaying queued message: {e}')
+                break
+        self._generation = generation
+        self.compact()
+        return replayed
+
+    def push(self, item) -> None:
+        super().push(item)
+        descriptor = describe(item)
+        if descriptor is not None:
+            journal_id = self._next_id
+            self._next_id += 1
+            self._journaled[id(item)] = [journal_id, getattr(item, 'cursor', 0) // ACK_EVERY]
+            self._append(['push', journal_id, descriptor])
+
+    def pop(self):
+        item = super().pop()
+        self._forget(item)
+        return item
+
+    def remove(self, item) -> None:
+        super().remove(item)
+        self._forget(item)
+
+    def clear(self) -> None:
+        super().clear()
+        self.compact()
+
+    def acked(self, item):
+        """Journal the cursor of item when it was acknowledged into the next ACK_EVERY bytes"""
+        journaled = self._journaled.get(id(item))
+        if journaled is None or not hasattr(item, 'cursor'):
+            return
+        block = item.cursor // ACK_EVERY
+        if block != journaled[1]:
+            journaled[1] = block
+            self._append(['ack', journaled[0], item.cursor])
+
+    def compact(self):
+        """Write the queue to the other journal file, and journal to it from now on"""
+        self._journaled = {}
+        if self.directory is None:
+            return
+        import json
+        generation = self._generation + 1
+        lines = [json.dumps(['gen', generation])]
+        journal_id = 0
+        for item in self.queue:
+            descriptor = describe(item)
+            if descriptor is not None:
+                self._journaled[id(item)] = [journal_id, getattr(item, 'cursor', 0) // ACK_EVERY]
+                lines.append(json.dumps(['push', journal_id, descriptor]))
+                journal_id += 1
+        lines.append(json.dumps(['snapshot']))
+        data = '\n'.join(lines) + '\n'
+        path = self._file(generation)
+        if self._write(path, 'w', data):
+            self._generation = generation
+            self._next_id = journal_id
+            self._path = path
+            self._size = self._snapshot_size = len(data)
+
+    def _forget(self, item):
+        journaled = self._journaled.pop(id(item), None)
+        if journaled is not None:
+            self._append(['pop', journaled[0]])
+
+    def _file(self, generation):
+        return f'{self.directory}/queue{generation % 2}.jnl'
+
+    def _append(self, event):
+        if self.directory is None:
+            return
+        import json
+        line = json.dumps(event) + '\n'
+        if self._write(self._path, 'a', line):
+            self._size += len(line)
+            if self._size > max(COMPACT_MIN, COMPACT_RATIO * self._snapshot_size):
+                self.compact()
+
+    def _write(self, path, mode, data):
+        try:
+            with open(path, mode) as f:
+                f.write(data)
+        except Exception as e:
+            print(f'Error writing the transmission queue journal, no longer journaling: {e}')
+            self.directory = None
+            self._journaled = {}
+            return False
+        self.writes += 1
+        self.bytes_written += len(data)
+        return True
+
+    def _latest(self):
+        """(generation, events) of the complete journal file of the highest generation, (0, []) if there is none"""
+        latest = (0, [])
+        for i in range(2):
+            generation, events = self._read(self._file(i))
+            if generation > latest[0]:
+                latest = (generation, events)
+        return latest
+
+    def _read(self, path):
+        """(generation, events) of a journal file, (0, []) if it is missing or has no complete snapshot.
+        Reading stops at the first line that doesn't parse, e.g. one cut short by a reset."""
+        import json
+        generation = 0
+        events = []
+        complete = False
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        break
+                    if event[0] == 'gen':
+                        generation = event[1]
+                    elif event[0] == 'snapshot':
+                        complete = True
+                    else:
+                        events.append(event)
+        except OSError:
+            pass
+        return (generation, events) if complete else (0, [])
+
+    def _replay(self, events):
+        """The messages the events leave queued"""
+        descriptors = {}
+        for event in events:
+            if event[0] == 'push':
+                descriptors[event[1]] = event[2]
+            elif event[0] == 'ack' and event[1] in descriptors:
+                descriptors[event[1]][-1] = event[2]
+            elif event[0] == 'pop':
+                descriptors.pop(event[1], None)
+        msgs = []
+        for journal_id in sorted(descriptors):
+            msg = restore(descriptors[journal_id])
+            if msg is not None:
+                msgs.append(msg)
+        return msgs
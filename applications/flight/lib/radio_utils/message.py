@@ -32,12 +32,16 @@ class Message:
         """Returns true if the message is done sending."""
         return True
 
+    def ready(self):
+        """Returns true if the message has a packet to send now, rather than waiting for the ground."""
+        return True
+
     def ack(self):
         """Called when the message is acknowledged."""
         pass
 
     def no_ack(self):
-        """Called when the message fails to be acknowledged."""
+        """Called when the message fails to be acknowledged, or what it waits for doesn't come."""
         pass
 
     def __lt__(self, other):
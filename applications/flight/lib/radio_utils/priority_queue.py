@@ -9,6 +9,7 @@ Usage:
 >>> heap.push(item)                 # pushes a new item on the heap if under limit
 >>> item = heap.pop()               # pops the largest item from the heap
 >>> item = heap.peek()              # largest item on the heap without popping it
+>>> heap.remove(item)               # removes that very item from anywhere in the heap
 >>> heap.heapify()                  # transforms list into a heap, in-place, in linear time
 
 All Items used in this should have a priority property for comparison
@@ -57,6 +58,19 @@ class PriorityQueue:
             return returnitem
         return lastelt
 
+    def remove(self, item) -> None:
+        """Remove item from the heap, wherever it is.
+        Items are compared by identity, as equal priorities compare equal.
+
+        :param item: An item on the heap
+        """
+        for i in range(len(self.queue)):
+            if self.queue[i] is item:
+                self.queue.pop(i)
+                self.heapify()
+                return
+        raise ValueError("Item not in queue")
+
     def heapify(self) -> None:
         """Transform list into a maxheap, in-place, in O(len(x)) time.
 
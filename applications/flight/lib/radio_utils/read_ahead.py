@@ -0,0 +1,100 @@
+"""Read-ahead for the files downlinked by radio messages.
+
+Opening a file on the SD card walks its directory every time, so rather than opening the file
+for every packet, the files being sent are kept open, and read a block at a time into a buffer
+that the packets are sliced from.
+
+Usage:
+
+>>> data = read_ahead.read(path, offset, length)   # memoryview valid until the next read of path
+>>> read_ahead.close(path)                         # when the message is done with the file
+"""
+
+
+class _File:
+    def __init__(self, path, file, buffer):
+        self.path = path
+        self.file = file
+        self.buffer = buffer
+        # file offset of buffer[0], how many bytes of the buffer are valid, and whether they end the file
+        self.start = 0
+        self.length = 0
+        self.at_end = False
+
+
+class ReadAhead:
+    """
+    Keeps up to max_files files open, each with a block_size buffer.
+    Opening one more closes the least recently read, and reuses its buffer.
+    With max_files 0 every read opens, reads and closes the file.
+    """
+
+    def __init__(self, max_files=2, block_size=4096):
+        self.max_files = max_files
+        self.block_size = block_size
+        # least recently read first
+        self._files = []
+        self.opens = 0
+        self.block_reads = 0
+
+    def read(self, path, offset, length):
+        """Up to length bytes of the file at path from offset, fewer at the end of the file.
+
+        :return: A memoryview into the buffer of the file, valid until it is read again
+        """
+        if self.max_files <= 0:
+            self.opens += 1
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                return memoryview(f.read(length))
+
+        entry = self._open(path)
+        end = entry.start + entry.length
+        # the block is refilled unless it holds the bytes, or all of them up to the end of the file
+        if offset < entry.start or (offset + length > end and not (entry.at_end and offset <= end)):
+            if length > len(entry.buffer):
+                raise ValueError('read longer than the block size')
+            entry.file.seek(offset)
+            entry.start = offset
+            entry.length = entry.file.readinto(entry.buffer) or 0
+            entry.at_end = entry.length < len(entry.buffer)
+            self.block_reads += 1
+        start = offset - entry.start
+        return memoryview(entry.buffer)[start:min(start + length, entry.length)]
+
+    def _open(self, path):
+        files = self._files
+        for i in range(len(files)):
+            if files[i].path == path:
+                entry = files.pop(i)
+                files.append(entry)
+                return entry
+
+        buffer = None
+        if len(files) >= self.max_files:
+            evicted = files.pop(0)
+            evicted.file.close()
+            buffer = evicted.buffer
+        if buffer is None or len(buffer) != self.block_size:
+            buffer = bytearray(self.block_size)
+        entry = _File(path, open(path, 'rb'), buffer)
+        self.opens += 1
+        files.append(entry)
+        return entry
+
+    def close(self, path):
+        """Close the file at path if it is open"""
+        for entry in self._files:
+            if entry.path == path:
+                self._files.remove(entry)
+                entry.file.close()
+                return
+
+    def clear(self):
+        """Close every open file, e.g. before files are moved or deleted"""
+        for entry in self._files:
+            entry.file.close()
+        self._files = []
+
+
+read_ahead = ReadAhead()
@@ -0,0 +1,144 @@
+"""Index of the windowed transfers that are not complete yet, kept on the SD card so that a transfer
+cut short by the end of a pass, a reboot or CLEAR_TX_QUEUE can be resumed with the chunks the
+ground is still missing, rather than sending the whole file again.
+
+Every transfer has a record file, rewritten whenever the ground acknowledges more chunks:
+    [transfer id: u16][file size: u32][file CRC32: u32][chunk count: u16][path length: u8][path][acked bitmap]
+The next transfer id is kept in the file `next`, so ids are not reused after a reboot.
+"""
+import os
+import struct
+import files
+
+RECORD_HEADER = '>HIIHB'
+RECORD_HEADER_LEN = struct.calcsize(RECORD_HEADER)
+CRC_BLOCK = 1024
+
+
+def file_crc(path):
+    """CRC32 of the file at path"""
+    import binascii
+    crc = 0
+    buffer = bytearray(CRC_BLOCK)
+    with open(path, 'rb') as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                return crc
+            crc = binascii.crc32(memoryview(buffer)[:n], crc)
+
+
+class TransferRecord:
+    """What the index keeps about a transfer: the file it sends and the chunks acked so far"""
+
+    def __init__(self, transfer_id, path, size, crc, count, acked=None):
+        self.transfer_id = transfer_id
+        self.path = path
+        self.size = size
+        self.crc = crc
+        self.count = count
+        self.acked = acked if acked is not None else bytearray((count + 7) // 8)
+
+    def missing(self):
+        """Sequence numbers of the chunks not acked yet"""
+        return [seq for seq in range(self.count) if not self.acked[seq >> 3] & (1 << (seq & 7))]
+
+    def missing_ranges(self):
+        """The missing chunks as [first, last] ranges"""
+        ranges = []
+        for seq in self.missing():
+            if ranges and ranges[-1][1] == seq - 1:
+                ranges[-1][1] = seq
+            else:
+                ranges.append([seq, seq])
+        return ranges
+
+    def changed(self):
+        """Whether the file is no longer the one the transfer started sending"""
+        try:
+            return os.stat(self.path)[6] != self.size or file_crc(self.path) != self.crc
+        except OSError:
+            return True
+
+    def pack(self):
+        path = self.path.encode('utf-8')
+        return struct.pack(RECORD_HEADER, self.transfer_id, self.size, self.crc, self.count, len(path)) + \
+            path + self.acked
+
+    @staticmethod
+    def unpack(data):
+        transfer_id, size, crc, count, path_len = struct.unpack_from(RECORD_HEADER, data)
+        path = str(data[RECORD_HEADER_LEN:RECORD_HEADER_LEN + path_len], 'utf-8')
+        acked = bytearray(data[RECORD_HEADER_LEN + path_len:])
+        if len(acked) != (count + 7) // 8:
+            raise ValueError('truncated transfer record')
+        return TransferRecord(transfer_id, path, size, crc, count, acked)
+
+
+class TransferIndex:
+    """The records of a directory on the SD card.
+    Failing to write (e.g. without an SD card) is reported, but doesn't stop the transfer."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._next_id = None
+
+    def _record_path(self, transfer_id):
+        return f'{self.directory}/{transfer_id:05}.tfr'
+
+    def next_id(self):
+        """A transfer id not used since the index was created (they wrap around after 65535)"""
+        if self._next_id is None:
+            try:
+                with open(f'{self.directory}/next', 'rb') as f:
+                    self._next_id = struct.unpack('>H', f.read(2))[0]
+            except Exception:
+                self._next_id = 0
+        transfer_id = self._next_id
+        self._next_id = (transfer_id + 1) & 0xffff
+        try:
+            files.mkdirp(self.directory)
+            with open(f'{self.directory}/next', 'wb') as f:
+                f.write(struct.pack('>H', self._next_id))
+        except Exception as e:
+            print(f'Error saving the next transfer id: {e}')
+        return transfer_id
+
+    def save(self, record):
+        try:
+            files.mkdirp(self.directory)
+            with open(self._record_path(record.transfer_id), 'wb') as f:
+                f.write(record.pack())
+        except Exception as e:
+            print(f'Error saving transfer {record.transfer_id}: {e}')
+
+    def load(self, transfer_id):
+        """The record of a transfer, None if there is none"""
+        try:
+            with open(self._record_path(transfer_id), 'rb') as f:
+                return TransferRecord.unpack(f.read())
+        except Exception:
+            return None
+
+    def remove(self, transfer_id):
+        try:
+            os.remove(self._record_path(transfer_id))
+        except OSError:
+            pass
+
+    def records(self):
+        """Every readable record, by transfer id"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        records = []
+        for name in sorted(names):
+            if name.endswith('.tfr') and name[:-4].isdigit():
+                record = self.load(int(name[:-4]))
+                if record is not None:
+                    records.append(record)
+        return records
+
+
+transfer_index = TransferIndex('/sd/transfers')
@@ -2,8 +2,10 @@
 
 Messages must support the `__lt__`, `__le__`, `__eq__`, `__ge__`, and `__gt__` operators.
 This enables to the max heap to compare messages based on their priority.
+
+The radio task journals the queue to the SD card (see radio_utils.journaled_queue),
+so the messages queued before a reset are sent after it.
 """
-# from . import priority_queue as pq
-from .priority_queue import PriorityQueue
+from .journaled_queue import JournaledQueue
 
-transmission_queue = PriorityQueue([], 100)
+transmission_queue = JournaledQueue([], 100)
@@ -0,0 +1,172 @@
+"""Selective-repeat downlink of a file: a window of chunks is sent without waiting for acks,
+then the ground acknowledges every chunk of the window it received in one selective ack (SACK).
+
+Chunk packet (downlink):
+    [WINDOW_CHUNK or WINDOW_POLL][transfer id: u16][sequence number: u16][chunk count: u16][data]
+The last chunk sent in a round is a WINDOW_POLL, asking the ground for a SACK.
+
+SACK packet (uplink):
+    [SACK][transfer id: u16][base: u16][bitmap]
+Every chunk before base was received, bit i of the bitmap (LSB first) is set if chunk base + i was.
+
+The next round sends the chunks of the window (starting at the first missing chunk) that are
+still missing, so lost chunks are retransmitted once per window instead of stalling every packet.
+
+Transfers are recorded in radio_utils.transfer_index until they complete, so one that was cut
+short can be resumed with the chunks still missing (see WindowedMessage.resume).
+"""
+import os
+import struct
+from .message import Message
+from . import headers
+from . import PACKET_DATA_LEN
+from .read_ahead import read_ahead
+from .transfer_index import TransferRecord, file_crc, transfer_index
+
+CHUNK_HEADER = '>HHH'
+CHUNK_HEADER_LEN = struct.calcsize(CHUNK_HEADER)
+CHUNK_LEN = PACKET_DATA_LEN - CHUNK_HEADER_LEN
+SACK_HEADER = '>HH'
+WINDOW = 32
+
+# transfer ids of the messages that are not recorded in an index
+_next_transfer_id = 0
+
+
+def chunk_count(size):
+    """Number of chunks a file of size bytes is sent in, an empty file still takes one"""
+    return max(1, (size + CHUNK_LEN - 1) // CHUNK_LEN)
+
+
+def pack_sack(transfer_id, base, received):
+    """SACK payload (without the header byte) for the chunks in received from base on"""
+    bitmap = bytearray(WINDOW // 8)
+    for seq in received:
+        i = seq - base
+        if 0 <= i < WINDOW:
+            bitmap[i >> 3] |= 1 << (i & 7)
+    return struct.pack(SACK_HEADER, transfer_id, base) + bitmap
+
+
+def unpack_sack(payload):
+    """(transfer id, base, bitmap) of a SACK payload (without the header byte)"""
+    transfer_id, base = struct.unpack_from(SACK_HEADER, payload)
+    return transfer_id, base, payload[struct.calcsize(SACK_HEADER):]
+
+
+class WindowedMessage(Message):
+    """Sends a file as a selective-repeat transfer, see the module description.
+
+    The radio task sends its packets without ack. After a poll the message is not ready() until
+    sack() is called with the ground's SACK, or no_ack() when none came, which polls again.
+
+    :param path: The path to the file to send
+    :type path: str
+    :param index: The TransferIndex the transfer is recorded in until it completes, None to not record it
+    :param record: The TransferRecord of the transfer to continue, see resume()
+    """
+
+    def __init__(self, path, priority=1, index=transfer_index, record=None):
+        global _next_transfer_id
+        self.priority = priority
+        self.path = path
+        self.index = index
+        if record is None:
+            size = os.stat(path)[6]
+            if index is None:
+                record = TransferRecord(_next_transfer_id, path, size, 0, chunk_count(size))
+                _next_transfer_id = (_next_transfer_id + 1) & 0xffff
+            else:
+                record = TransferRecord(index.next_id(), path, size, file_crc(path), chunk_count(size))
+                index.save(record)
+        self.record = record
+        self.transfer_id = record.transfer_id
+        self.msg_len = record.size
+        self.count = record.count
+        self.acked = record.acked
+        # first chunk not acked yet, the window starts there
+        self.base = 0
+        while self.base < self.count and self.is_acked(self.base):
+            self.base += 1
+        # chunks still to send this round, the last one polls
+        self.round = []
+        self.last_sent = None
+        self.waiting = False
+        self.missed_sacks = 0
+        self.file_err = False
+        # the file may have been rewritten since it was last read
+        read_ahead.close(path)
+
+    @staticmethod
+    def resume(record, start=0, priority=1, index=transfer_index):
+        """Continue a recorded transfer, sending only the chunks the ground is missing.
+        The chunks before start count as received too."""
+        for seq in range(min(start, record.count)):
+            record.acked[seq >> 3] |= 1 << (seq & 7)
+        return WindowedMessage(record.path, priority, index, record)
+
+    def is_acked(self, seq):
+        return self.acked[seq >> 3] & (1 << (seq & 7))
+
+    def packet(self):
+        """The next chunk of the round, a new round starts with the missing chunks of the window"""
+        if not self.round:
+            self.round = [seq for seq in range(self.base, min(self.base + WINDOW, self.count))
+                          if not self.is_acked(seq)]
+            if not self.round:
+                # every chunk was acked, a poll with the last one still gets the ground's SACK
+                self.round = [self.count - 1]
+        seq = self.round.pop(0)
+        self.last_sent = seq
+        if not self.round:
+            self.waiting = True
+        try:
+            data = read_ahead.read(self.path, seq * CHUNK_LEN, CHUNK_LEN)
+        except Exception as e:
+            print(f'Error reading file {self.path}: {e}')
+            self.file_err = True
+            read_ahead.close(self.path)
+            pkt = bytearray([headers.DEFAULT]) + bytearray("Error reading file", "utf-8")
+            return pkt, False
+        pkt = bytearray(1 + CHUNK_HEADER_LEN + len(data))
+        pkt[0] = headers.WINDOW_POLL if self.waiting else headers.WINDOW_CHUNK
+        struct.pack_into(CHUNK_HEADER, pkt, 1, self.transfer_id, seq, self.count)
+        pkt[1 + CHUNK_HEADER_LEN:] = data
+        return pkt, False
+
+    def ready(self):
+        return not self.waiting
+
+    def sack(self, base, bitmap):
+        """The ground received every chunk before base, and those set in bitmap"""
+        for seq in range(self.base, min(base, self.count)):
+            self.acked[seq >> 3] |= 1 << (seq & 7)
+        for i in range(min(len(bitmap) * 8, self.count - base)):
+            if bitmap[i >> 3] & (1 << (i & 7)):
+                seq = base + i
+                self.acked[seq >> 3] |= 1 << (seq & 7)
+        while self.base < self.count and self.is_acked(self.base):
+            self.base += 1
+        self.round = []
+        self.waiting = False
+        self.missed_sacks = 0
+        if self.done():
+            read_ahead.close(self.path)
+            if self.index is not None:
+                self.index.remove(self.transfer_id)
+        elif self.index is not None:
+            self.index.save(self.record)
+
+    def no_ack(self):
+        """No SACK came for the poll: poll again with the same chunk, its SACK tells what is missing"""
+        if not self.waiting:
+            return
+        self.waiting = False
+        self.missed_sacks += 1
+        self.round = [self.last_sent]
+
+    def done(self):
+        return self.base >= self.count or self.file_err
+
+    def __repr__(self) -> str:
+        return f'<Windowed: {self.path} #{self.transfer_id} {self.base}/{self.count}, {self.missed_sacks} missed SACKs>'
@@ -0,0 +1,77 @@
+"""
+Measures how long the flight software takes to start its state machine on the
+emulation driver, and the memory and modules it holds once started, with tasks
+imported and constructed lazily (as configured) and eagerly (every task at boot).
+
+Each strategy is measured in a fresh interpreter, from after the board driver is
+imported to just before the loop starts running. Memory is what tracemalloc
+counts on CPython; on a board gc.mem_free() is reported instead.
+
+Run from the repository root:
+    python3 benchmarks/boot.py
+"""
+import os
+import subprocess
+import sys
+import time
+
+STRATEGIES = ['lazy', 'eager']
+REPEATS = 10  # the fastest start of each strategy is reported
+
+
+def measure(strategy):
+    """Runs in the child process, prints milliseconds, bytes and modules loaded"""
+    sys.path.insert(0, './drivers/emulation')
+    sys.path.insert(0, './drivers/emulation/lib')
+    sys.path.insert(0, './applications/flight')
+    sys.path.insert(0, './applications/flight/lib')
+    sys.path.insert(0, './frame')
+    import gc
+    import tracemalloc
+    import pycubed  # noqa: F401
+    import tasko
+
+    # start() would run the loop forever
+    tasko.run = lambda: None
+    modules = len(sys.modules)
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    import StateMachineConfig
+    from state_machine import state_machine
+    from config import initial
+    if strategy == 'eager':
+        for name, task in StateMachineConfig.TaskMap.items():
+            module_name, attribute = task.rsplit('.', 1)
+            __import__(module_name)
+            StateMachineConfig.TaskMap[name] = getattr(sys.modules[module_name], attribute)
+    state_machine.start(initial)
+
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    allocated = gc.mem_free() if hasattr(gc, 'mem_free') else tracemalloc.get_traced_memory()[0]
+    print(elapsed * 1000, allocated, len(sys.modules) - modules)
+
+
+def run(strategy):
+    output = subprocess.run(
+        [sys.executable, __file__, strategy], capture_output=True, text=True, check=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1')).stdout
+    ms, allocated, modules = output.strip().splitlines()[-1].split()
+    return float(ms), int(allocated), int(modules)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        measure(sys.argv[1])
+    else:
+        # the strategies take turns, so they see the same noise from the rest of the system
+        results = {}
+        for _ in range(REPEATS):
+            for strategy in STRATEGIES:
+                ms, allocated, modules = run(strategy)
+                fastest = results.get(strategy, (ms,))[0]
+                results[strategy] = (min(ms, fastest), allocated, modules)
+        print(f'{"strategy":<10} {"ms":>8} {"bytes":>10} {"modules":>8}')
+        for strategy, (ms, allocated, modules) in results.items():
+            print(f'{strategy:<10} {ms:>8.1f} {allocated:>10} {modules:>8}')
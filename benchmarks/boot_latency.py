@@ -0,0 +1,94 @@
+"""
+Measures the boot of the flight software on the emulation driver, as lib.boot_profile
+reports it: the time from main.py starting to the first tasks being scheduled, each
+phase of the boot and each device init.
+
+Each boot runs frame/main.py in a fresh interpreter (in a temporary directory, which
+gets its SD card), stopped right after it started the loop. The fastest boot of the
+repeats is reported.
+
+To track the boot latency across commits, --record appends the result to a CSV file
+labeled with the checked out commit, and prints how it changed since the previous one.
+
+Run from the repository root:
+    python3 benchmarks/boot_latency.py [--record benchmarks/boot_latency.csv]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPEATS = 10
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def measure():
+    """Runs in the child process, boots and prints the boot report as JSON"""
+    for path in ['drivers/emulation', 'drivers/emulation/lib', 'applications/flight',
+                 'applications/flight/lib', 'frame']:
+        sys.path.insert(0, os.path.join(ROOT, path))
+    import runpy
+    # main.py imports it first as well, this only starts the clock slightly earlier
+    import lib.boot_profile as boot_profile
+    try:
+        runpy.run_path(os.path.join(ROOT, 'frame/main.py'), run_name='__main__')
+    except SystemExit:
+        pass
+    print(json.dumps(boot_profile.report()))
+
+
+def boot():
+    with tempfile.TemporaryDirectory() as directory:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child'], cwd=directory,
+            capture_output=True, text=True, check=True,
+            env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1', PYCUBED_RUN_FOR='0')).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def record(path, report):
+    """Append report to the CSV file at path, returns the previous row (None if there is none)"""
+    previous = None
+    if os.path.exists(path):
+        with open(path) as f:
+            rows = [line.strip().split(',') for line in f if line.strip()]
+        previous = rows[-1] if len(rows) > 1 else None
+    else:
+        with open(path, 'w') as f:
+            f.write(','.join(['commit', 'total_ms'] + [f'{name}_ms' for name, _ in report['phases']]) + '\n')
+    with open(path, 'a') as f:
+        f.write(','.join([commit(), f"{report['total_ms']:.3f}"] +
+                         [f'{ms:.3f}' for _, ms in report['phases']]) + '\n')
+    return previous
+
+
+if __name__ == '__main__':
+    if '--child' in sys.argv:
+        measure()
+        sys.exit(0)
+
+    fastest = min((boot() for _ in range(REPEATS)), key=lambda report: report['total_ms'])
+    print(f'{"phase":<16} {"ms":>8}')
+    for name, ms in fastest['phases']:
+        print(f'{name:<16} {ms:>8.2f}')
+    print(f'{"total":<16} {fastest["total_ms"]:>8.2f}')
+    print()
+    print(f'{"device":<16} {"ms":>8}')
+    for name, ms, ok in fastest['devices']:
+        print(f'{name:<16} {ms:>8.2f}{"" if ok else "  failed"}')
+
+    if '--record' in sys.argv:
+        path = sys.argv[sys.argv.index('--record') + 1]
+        previous = record(path, fastest)
+        if previous is not None:
+            change = fastest['total_ms'] - float(previous[1])
+            print(f'\ntotal {change:+.2f} ms since {previous[0]}')
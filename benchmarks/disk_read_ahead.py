@@ -0,0 +1,60 @@
+"""
+Measures how fast DiskBufferedMessage serves the packets of a file, reading it through
+the read-ahead (the file kept open, read 4 KB at a time) and without it (the file opened,
+read and closed for every packet, as before the read-ahead).
+
+One in RETRY_EVERY packets is not acked, so it is served again. Here the file is on the
+host's disk, where opening it is far cheaper than walking a FAT directory over SPI, so
+the difference on the SD card is larger.
+
+Run from the repository root:
+    python3 benchmarks/disk_read_ahead.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, './applications/flight/lib')
+
+from radio_utils import read_ahead as read_ahead_module  # noqa: E402
+from radio_utils.read_ahead import ReadAhead  # noqa: E402
+import radio_utils.disk_buffered_message as disk_buffered_message  # noqa: E402
+
+FILE_SIZE = 256 * 1024
+RETRY_EVERY = 10
+REPEATS = 5
+
+
+def send(path):
+    """Returns the packets served and the seconds it took to send the file"""
+    msg = disk_buffered_message.DiskBufferedMessage(path)
+    packets = 0
+    start = time.perf_counter()
+    while not msg.done():
+        msg.packet()
+        packets += 1
+        if packets % RETRY_EVERY == 0:
+            msg.no_ack()
+        else:
+            msg.ack()
+    return packets, time.perf_counter() - start
+
+
+def bench(path, max_files):
+    cache = ReadAhead(max_files=max_files)
+    disk_buffered_message.read_ahead = read_ahead_module.read_ahead = cache
+    packets, seconds = min((send(path) for _ in range(REPEATS)), key=lambda result: result[1])
+    return packets / seconds, cache.opens / REPEATS, cache.block_reads / REPEATS
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'file.bin')
+        with open(path, 'wb') as f:
+            f.write(os.urandom(FILE_SIZE))
+
+        print(f'{"":<12} {"packets/s":>10} {"opens":>7} {"blocks":>7}')
+        for name, max_files in [('per packet', 0), ('read-ahead', 2)]:
+            rate, opens, blocks = bench(path, max_files)
+            print(f'{name:<12} {rate:>10.0f} {opens:>7.0f} {blocks:>7.0f}')
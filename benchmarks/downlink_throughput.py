@@ -0,0 +1,53 @@
+"""
+Compares the throughput of downlinking a file stop-and-wait (DiskBufferedMessage, an ack
+for every packet) and as a selective-repeat transfer (WindowedMessage, a SACK per window)
+over the simulated link in ground/simulated_link.py, at increasing packet loss.
+
+Throughput is the file size over the simulated time the transfer took, the mean over SEEDS
+runs. The windowed transfers are checked to reassemble the file on the ground.
+
+Run from the repository root:
+    python3 benchmarks/downlink_throughput.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, './ground')
+
+from simulated_link import SimulatedLink  # noqa: E402
+from radio_utils.disk_buffered_message import DiskBufferedMessage  # noqa: E402
+from radio_utils.windowed_message import WindowedMessage  # noqa: E402
+
+FILE_SIZE = 16 * 1024
+LOSSES = [0.0, 0.05, 0.1, 0.2, 0.3]
+SEEDS = 10
+
+
+def bench(path, data, loss):
+    stop_and_wait = 0
+    windowed = 0
+    packets = 0
+    for seed in range(SEEDS):
+        stop_and_wait += SimulatedLink(loss, seed).stop_and_wait(DiskBufferedMessage(path))
+        link = SimulatedLink(loss, seed)
+        msg = WindowedMessage(path, index=None)
+        seconds, reassembler = link.windowed(msg)
+        assert reassembler.data(msg.transfer_id) == data
+        windowed += seconds
+        packets += link.packets_sent
+    return FILE_SIZE * SEEDS / stop_and_wait, FILE_SIZE * SEEDS / windowed, packets / SEEDS
+
+
+if __name__ == '__main__':
+    data = os.urandom(FILE_SIZE)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'file.bin')
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        print(f'{"loss":>5} {"stop-and-wait B/s":>18} {"windowed B/s":>13} {"speedup":>8} {"packets":>8}')
+        for loss in LOSSES:
+            stop_and_wait, windowed, packets = bench(path, data, loss)
+            print(f'{loss:>5.2f} {stop_and_wait:>18.0f} {windowed:>13.0f} {windowed / stop_and_wait:>8.1f} '
+                  f'{packets:>8.0f}')
@@ -0,0 +1,56 @@
+"""
+Compares the throughput of downlinking an image stop-and-wait (ImageMessage, an ack for every
+packet) and with forward error correction (FECMessage, blocks of DATA data and some parity
+chunks without acks, the blocks the ground can't decode sent again) over the simulated link
+in ground/simulated_link.py, at increasing packet loss.
+
+Throughput is the image size over the simulated time until the ground has all of it, the mean
+over SEEDS runs. The FEC transfers are checked to decode to the image on the ground.
+
+Run from the repository root:
+    python3 benchmarks/image_downlink_fec.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, './ground')
+
+from simulated_link import SimulatedLink  # noqa: E402
+from radio_utils.image_message import ImageMessage  # noqa: E402
+from radio_utils.fec_message import FECMessage  # noqa: E402
+
+IMAGE_SIZE = 16 * 1024
+LOSSES = [0.0, 0.05, 0.1, 0.2, 0.3]
+DATA = 16
+PARITIES = [2, 4, 8]
+SEEDS = 10
+
+
+def bench(path, data, loss):
+    stop_and_wait = sum(SimulatedLink(loss, seed).stop_and_wait(ImageMessage(path)) for seed in range(SEEDS))
+    fec = []
+    for parity in PARITIES:
+        seconds = 0
+        for seed in range(SEEDS):
+            msg = FECMessage(path, DATA, parity, index=None)
+            link_seconds, decoder = SimulatedLink(loss, seed).fec(msg)
+            assert decoder.data(msg.transfer_id) == data
+            seconds += link_seconds
+        fec.append(IMAGE_SIZE * SEEDS / seconds)
+    return IMAGE_SIZE * SEEDS / stop_and_wait, fec
+
+
+if __name__ == '__main__':
+    data = os.urandom(IMAGE_SIZE)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'image.jpg')
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        columns = ''.join(f'{f"FEC {DATA}+{parity} B/s":>16}' for parity in PARITIES)
+        print(f'{"loss":>5} {"stop-and-wait B/s":>18}{columns} {"best speedup":>13}')
+        for loss in LOSSES:
+            stop_and_wait, fec = bench(path, data, loss)
+            columns = ''.join(f'{b:>16.0f}' for b in fec)
+            print(f'{loss:>5.2f} {stop_and_wait:>18.0f}{columns} {max(fec) / stop_and_wait:>13.1f}')
@@ -0,0 +1,46 @@
+"""
+Measures tasko Loop steps per second with debugging and profiling off, to track
+the cost instrumentation adds to the plain loop.
+
+Every task yields on every step, so each step runs all of them: this is the
+per-task overhead of stepping, without the cost of any sleeping or real work.
+
+Run from the repository root:
+    python3 benchmarks/loop_instrumentation.py
+"""
+import sys
+import time
+
+sys.path.insert(0, './frame')
+
+from tasko.loop import Loop, _yield_once  # noqa: E402
+
+TASK_COUNTS = [1, 10, 50]
+TASK_RUNS = 20000  # per measurement, split into steps over all tasks
+REPEATS = 20  # the fastest measurement is reported, to filter out noise from the rest of the system
+
+
+def bench(task_count, **loop_kwargs):
+    loop = Loop(**loop_kwargs)
+
+    async def busy():
+        while True:
+            await _yield_once()
+
+    for i in range(task_count):
+        loop.add_task(busy(), i % 4)
+
+    steps = TASK_RUNS // task_count
+    fastest = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for _ in range(steps):
+            loop._step()
+        fastest = min(fastest, time.perf_counter() - start)
+    return steps / fastest
+
+
+if __name__ == '__main__':
+    print(f'{"tasks":>6} {"steps/s":>10}')
+    for count in TASK_COUNTS:
+        print(f'{count:>6} {bench(count):>10.0f}')
@@ -0,0 +1,59 @@
+"""
+Measures the cost of one tasko Loop._step as the number of scheduled tasks grows.
+
+Time is simulated, so only the scheduler's own bookkeeping is measured. Every task
+runs at between 1 and 10 Hz and the clock advances by 1 ms per step, so most tasks
+are asleep during any given step (the common case on the satellite). One extra task
+yields on every step so the loop never idles.
+
+Run from the repository root:
+    python3 benchmarks/loop_step.py
+"""
+import sys
+import time
+
+sys.path.insert(0, './frame')
+
+from tasko.loop import Loop, set_time_provider, _yield_once  # noqa: E402
+
+TASK_COUNTS = [10, 50, 100, 250, 500, 1000]
+STEPS = 5000
+TICK_NANOS = 1000000  # 1 ms of simulated time per step
+
+
+def bench(task_count):
+    now = 0
+
+    def nanos():
+        return now
+
+    set_time_provider(nanos)
+    try:
+        loop = Loop()
+
+        async def noop():
+            pass
+
+        async def busy():
+            while True:
+                await _yield_once()
+
+        for i in range(task_count):
+            loop.schedule(1 + i % 10, noop, i % 4)
+        loop.add_task(busy(), 255)
+
+        start = time.perf_counter()
+        for _ in range(STEPS):
+            loop._step()
+            now += TICK_NANOS
+        elapsed = time.perf_counter() - start
+    finally:
+        set_time_provider(time.monotonic_ns)
+
+    return elapsed / STEPS * 1e6
+
+
+if __name__ == '__main__':
+    print(f'{"tasks":>6} {"us/step":>10}')
+    for count in TASK_COUNTS:
+        print(f'{count:>6} {bench(count):>10.2f}')
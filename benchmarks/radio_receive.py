@@ -0,0 +1,100 @@
+"""
+Compares the two ways the radio driver can wait for a packet, on the emulated radio:
+polling rx_done() on every loop step, and sleeping until DIO0 signals it (use_dio0()).
+
+A 100 Hz radio task listens for packets, which arrive every 0.1 to 0.4 s, while a 10 Hz
+task stands in for the rest of the flight software. Reported per mode:
+    radio %    share of the time the radio task ran
+    idle %     share of the time the loop slept (the processor could sleep)
+    steps/s    loop steps, i.e. how often the scheduler ran
+    late ms    mean lateness of the 10 Hz task
+    rx ms      mean and worst time from a packet arriving to receive() returning it
+
+Polling never idles, so each mode runs in a fresh interpreter on the real clock.
+
+Run from the repository root:
+    python3 benchmarks/radio_receive.py
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+
+DURATION = 5
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODES = ['poll', 'dio0']
+
+
+def measure(mode):
+    """Runs in the child process, prints the results as JSON"""
+    sys.path.insert(0, os.path.join(ROOT, 'drivers/emulation/lib'))
+    sys.path.insert(0, os.path.join(ROOT, 'frame'))
+    import time
+    import tasko
+    from radio_driver import Radio, _Packet
+
+    random.seed(1)
+    radio = Radio()
+    if mode == 'dio0':
+        radio.use_dio0(radio.dio0)
+    loop = tasko.get_loop()
+    sent = {}
+    latencies = []
+
+    async def listen():
+        packet = await radio.receive()
+        if packet is not None:
+            latencies.append(time.monotonic_ns() - sent.pop(bytes(packet)))
+
+    async def ground():
+        for i in range(1000000):
+            await tasko.sleep(0.1 + 0.3 * random.random())
+            data = i.to_bytes(4, 'big')
+            sent[data] = time.monotonic_ns()
+            radio.test.push_rx_queue(_Packet(data))
+
+    async def work():
+        sum(range(1000))
+
+    loop.enable_profiling()
+    loop.schedule(100, listen, 0).name = 'radio'
+    loop.schedule(10, work, 5).name = 'work'
+    loop.add_task(ground(), 1)
+    steps = 0
+    end = time.monotonic_ns() + DURATION * 1000000000
+    while time.monotonic_ns() < end:
+        loop._step()
+        steps += 1
+
+    stats = loop.stats
+    total = stats.total_nanos()
+    work = stats.tasks['work']
+    print(json.dumps({
+        'radio': stats.tasks['radio'].total_nanos / total,
+        'idle': stats.idle_nanos / total,
+        'steps': steps / DURATION,
+        'late_ms': work.total_late_nanos / max(work.runs, 1) / 1000000,
+        'rx_ms': sum(latencies) / max(len(latencies), 1) / 1000000,
+        'rx_max_ms': max(latencies, default=0) / 1000000,
+        'received': len(latencies),
+    }))
+
+
+def run(mode):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    if '--child' in sys.argv:
+        measure(sys.argv[sys.argv.index('--child') + 1])
+        sys.exit(0)
+
+    print(f'{"mode":<6} {"radio %":>8} {"idle %":>8} {"steps/s":>9} {"late ms":>8} '
+          f'{"rx ms":>7} {"max":>7} {"packets":>8}')
+    for mode in MODES:
+        r = run(mode)
+        print(f'{mode:<6} {100 * r["radio"]:>8.1f} {100 * r["idle"]:>8.1f} {r["steps"]:>9.0f} {r["late_ms"]:>8.2f} '
+              f'{r["rx_ms"]:>7.2f} {r["rx_max_ms"]:>7.2f} {r["received"]:>8}')
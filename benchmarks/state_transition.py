@@ -0,0 +1,93 @@
+"""
+Measures what a StateMachine.switch_to between the flight software's states costs:
+the time the transition takes (fastest of the repeats), the memory it allocates
+at its peak, and how many task iterations run on the next loop step because the
+transition (re)started them.
+
+Tasks do nothing and time is simulated, so only the rescheduling is measured.
+
+Run from the repository root:
+    python3 benchmarks/state_transition.py
+"""
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, './drivers/emulation')
+sys.path.insert(0, './drivers/emulation/lib')
+sys.path.insert(0, './applications/flight')
+sys.path.insert(0, './frame')
+
+import tasko  # noqa: E402
+from tasko.loop import set_time_provider, set_sleep_provider  # noqa: E402
+from state_machine import StateMachine  # noqa: E402
+from lib.state_machine_utils import compile_config  # noqa: E402
+from config import config  # noqa: E402
+
+TRANSITIONS = [('Normal', 'Safe'), ('Safe', 'Normal'), ('Normal', 'Deployment'), ('Deployment', 'Normal')]
+REPEATS = 200
+
+runs = 0
+
+
+class Task:
+    async def _run(self):
+        global runs
+        runs += 1
+
+
+def bench():
+    now = 0
+
+    def sleep(seconds):
+        nonlocal now
+        now += round(seconds * 1000000000)
+
+    set_time_provider(lambda: now)
+    set_sleep_provider(sleep)
+
+    task_names = {name for state in config.values() for name in state['Tasks']}
+    function_names = {name for state in config.values()
+                      for name in state.get('EnterFunctions', []) + state.get('ExitFunctions', [])}
+    task_map = {name: Task for name in task_names}
+    compiled = compile_config(config, task_map, {name: lambda *args: None for name in function_names})
+
+    machine = StateMachine()
+    machine.load(compiled, task_map)
+    machine.state = TRANSITIONS[0][0]
+    machine.state_id = compiled.states.index(machine.state)
+    machine.switch_to(machine.state, force=True)
+
+    loop = tasko.get_loop()
+
+    def transition(source, destination, traced):
+        """Returns the nanoseconds switching from source to destination took, the bytes it allocated
+        (if traced, which slows it down) and the number of task runs on the next step"""
+        machine.switch_to(source, force=True)
+        loop._step()
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter_ns()
+        machine.switch_to(destination, force=True)
+        nanos = time.perf_counter_ns() - start
+        allocated = 0
+        if traced:
+            allocated = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        before = runs
+        loop._step()
+        return nanos, allocated, runs - before
+
+    results = []
+    for source, destination in TRANSITIONS:
+        fastest = min(transition(source, destination, False)[0] for _ in range(REPEATS))
+        traced = [transition(source, destination, True) for _ in range(REPEATS)]
+        results.append((f'{source}->{destination}', fastest / 1000,
+                        sum(t[1] for t in traced) / REPEATS, sum(t[2] for t in traced) / REPEATS))
+    return results
+
+
+if __name__ == '__main__':
+    print(f'{"transition":<22} {"us":>8} {"bytes":>8} {"runs":>6}')
+    for name, us, allocated, started_runs in bench():
+        print(f'{name:<22} {us:>8.1f} {allocated:>8.0f} {started_runs:>6.1f}')
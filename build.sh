@@ -17,8 +17,14 @@ cp -r frame build
 cp -r $1/* build
 cp -r $2/* build
 
-# extraneous file removal
 cd build
+
+# validate the state machine config once here, instead of on the board at every boot
+cp ../buildtools/compile_config.py .
+PYTHONDONTWRITEBYTECODE=1 python3 compile_config.py || exit 1
+rm compile_config.py
+
+# extraneous file removal
 find . -type d -name __pycache__ -exec rm -r {} \+
 rm -f README.md
 cd - 
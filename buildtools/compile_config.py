@@ -0,0 +1,81 @@
+"""
+Validates the state machine config of the build and writes it as compiled_config.py,
+so the board can skip validating and compiling config.py at every boot.
+
+Run by build.sh from within the build directory. Exits with an error if the config
+is invalid. If StateMachineConfig can't be imported on this computer (e.g. its tasks
+need the hardware), nothing is written and the board compiles the config at boot.
+"""
+import sys
+
+sys.path.insert(0, './lib')
+
+from lib.state_machine_utils import compile_config  # noqa: E402
+
+OUTPUT = 'compiled_config.py'
+
+
+def function_names(compiled):
+    """The transition functions used, grouped by module, checking they can be imported back"""
+    modules = {}
+    for functions in compiled.enter_functions + compiled.exit_functions:
+        for fn in functions:
+            module = sys.modules.get(fn.__module__)
+            if getattr(module, fn.__name__, None) is not fn:
+                raise ValueError(f'Transition function {fn} can not be imported from its module')
+            modules.setdefault(fn.__module__, set()).add(fn.__name__)
+    return modules
+
+
+def source(compiled):
+    modules = function_names(compiled)
+
+    def functions(per_state):
+        return '(' + ''.join('(' + ''.join(f'{fn.__name__}, ' for fn in fns) + '), ' for fns in per_state) + ')'
+
+    lines = [
+        '# Generated from config.py by buildtools/compile_config.py, do not edit.',
+        '# Rebuild after changing config.py, or delete this file to compile config.py at boot instead.',
+        'from lib.state_machine_utils import CompiledConfig',
+    ]
+    for module, names in sorted(modules.items()):
+        lines.append(f'from {module} import {", ".join(sorted(names))}')
+    lines += [
+        '',
+        'compiled = CompiledConfig(',
+        f'    {compiled.states!r},',
+        f'    {compiled.steps_to!r},',
+        f'    {functions(compiled.enter_functions)},',
+        f'    {functions(compiled.exit_functions)},',
+        f'    {compiled.idle_slack!r},',
+        '    (',
+    ]
+    for state, specs in zip(compiled.states, compiled.tasks):
+        lines.append(f'        {specs!r},  # {state}')
+    lines += [
+        '    ),',
+        ')',
+        '',
+    ]
+    return '\n'.join(lines)
+
+
+def main():
+    try:
+        from StateMachineConfig import config, TaskMap, TransitionFunctionMap
+    except ImportError as e:
+        print(f'Not compiling the state machine config, StateMachineConfig can not be imported here: {e}')
+        return
+    try:
+        compiled = compile_config(config, TaskMap, TransitionFunctionMap)
+        text = source(compiled)
+    except ValueError as e:
+        print(f'Invalid state machine config: {e}')
+        sys.exit(1)
+    with open(OUTPUT, 'w') as f:
+        f.write(text)
+    print(f'Compiled the state machine config to {OUTPUT}')
+
+
+if __name__ == '__main__':
+    main()
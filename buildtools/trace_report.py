@@ -0,0 +1,127 @@
+"""
+Turns a tasko trace dumped by the satellite (see frame/tasko/trace.py) into
+per-task CPU utilization, a timeline and a Chrome trace.
+
+Usage, from the repository root:
+    python3 buildtools/trace_report.py 00012.trace
+    python3 buildtools/trace_report.py 00012.trace --timeline --chrome 00012.json
+
+Open the Chrome trace in chrome://tracing or https://ui.perfetto.dev
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frame'))
+
+from tasko.trace import load, RUN, YIELD, SLEEP, SUSPEND, RESUME, IDLE  # noqa: E402
+
+# what a task (or the loop) does after each event, until its next event
+# the loop waking or a task finishing starts nothing
+_STATES = {
+    RUN: 'running',
+    YIELD: 'runnable',
+    SLEEP: 'sleeping',
+    SUSPEND: 'suspended',
+    RESUME: 'runnable',
+    IDLE: 'idle',
+}
+
+
+def slices(events):
+    """
+    Pairs up the events into what each task was doing, as
+    (task name, state, start nanos, end nanos) tuples in order of their start.
+    The states are those of _STATES.
+    Events without a partner, at either end of the trace, are dropped.
+    """
+    result = []
+    started = {}   # task name -> (state, start nanos) of its open slice
+    for nanos, name, event in events:
+        opened = started.pop(name, None)
+        if opened is not None:
+            result.append((name, opened[0], opened[1], nanos))
+        state = _STATES.get(event)
+        if state is not None:
+            started[name] = (state, nanos)
+    result.sort(key=lambda s: s[2])
+    return result
+
+
+def utilization(events, trace_slices):
+    """Per-task (runs, cpu nanos, longest run nanos) and the span of the trace in nanos"""
+    span = events[-1][0] - events[0][0] if events else 0
+    tasks = {}
+    for name, state, start, end in trace_slices:
+        if state not in ('running', 'idle'):
+            continue
+        runs, cpu, longest = tasks.get(name, (0, 0, 0))
+        tasks[name] = (runs + 1, cpu + end - start, max(longest, end - start))
+    return tasks, span
+
+
+def chrome_trace(trace_slices):
+    """The slices as a Chrome trace event format object, one thread per task"""
+    tids = {'loop': 0}
+    trace_events = []
+    for name, state, start, end in trace_slices:
+        if name not in tids:
+            tids[name] = len(tids)
+        trace_events.append({
+            'name': name if state == 'running' else state,
+            'cat': state,
+            'ph': 'X',
+            'pid': 1,
+            'tid': tids[name],
+            'ts': start / 1000,
+            'dur': (end - start) / 1000,
+        })
+    for name, tid in tids.items():
+        trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': name}})
+    return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+
+def report(events, trace_slices, out=sys.stdout):
+    tasks, span = utilization(events, trace_slices)
+    print(f'{len(events)} events over {span / 1e6:.1f} ms', file=out)
+    print(f'{"task":<16} {"runs":>7} {"cpu ms":>10} {"cpu %":>7} {"mean us":>9} {"max us":>9}', file=out)
+    busy = 0
+    for name, (runs, cpu, longest) in sorted(tasks.items(), key=lambda t: -t[1][1]):
+        label = 'idle' if name == 'loop' else name
+        if name != 'loop':
+            busy += cpu
+        percent = 100 * cpu / span if span else 0
+        print(f'{label:<16} {runs:>7} {cpu / 1e6:>10.2f} {percent:>7.1f} '
+              f'{cpu / runs / 1e3:>9.0f} {longest / 1e3:>9.0f}', file=out)
+    if span:
+        idle = tasks.get('loop', (0, 0, 0))[1]
+        print(f'{"loop overhead":<16} {"":>7} {(span - busy - idle) / 1e6:>10.2f} '
+              f'{100 * (span - busy - idle) / span:>7.1f}', file=out)
+
+
+def timeline(events, trace_slices, out=sys.stdout):
+    origin = events[0][0] if events else 0
+    for name, state, start, end in trace_slices:
+        print(f'{(start - origin) / 1e6:>12.3f} ms  {name:<16} {state:<10} {(end - start) / 1e3:>10.0f} us', file=out)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Summarize a tasko trace dumped by the satellite')
+    parser.add_argument('trace', help='trace file, e.g. /sd/logs/trace/00012.trace')
+    parser.add_argument('--timeline', action='store_true', help='print every slice in order')
+    parser.add_argument('--chrome', metavar='JSON', help='write a Chrome trace for chrome://tracing or Perfetto')
+    args = parser.parse_args(args)
+
+    events = load(args.trace)
+    trace_slices = slices(events)
+    report(events, trace_slices)
+    if args.timeline:
+        timeline(events, trace_slices)
+    if args.chrome:
+        with open(args.chrome, 'w') as f:
+            json.dump(chrome_trace(trace_slices), f)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -6,13 +6,24 @@ from lib.bitflags import bitFlag, multiByte, nvm
 from lib.radio_driver import Radio
 from lib.camera_driver import Camera
 from lib.sd import SD
+import lib.boot_profile as boot_profile
+from lib.snapshot import Snapshot
+from lib.sampler import Sampler
 import random
 import os
+import sys
 try:
     from ulab.numpy import array
 except ImportError:
     from numpy import array
 
+# Set PYCUBED_VIRTUAL_TIME=1 to run on a simulated clock that skips over idle time,
+# and PYCUBED_RUN_FOR=<seconds> to stop the emulation after that much (simulated) time.
+if os.getenv('PYCUBED_VIRTUAL_TIME'):
+    from tasko import virtual_time
+    virtual_time.enable()
+    print('Running on virtual time')
+
 class Burnwire:
     def __init__(self):
         pass
@@ -66,6 +77,11 @@ class _Satellite:
     LOW_TEMP = -40
     # Low battery voltage threshold
     LOW_VOLTAGE = 4.0
+    # IMU and sun sensor readings are reused for this many seconds (see imu_snapshot and sun_snapshot)
+    SENSOR_MAX_AGE = 0.05
+    # The battery voltage is sampled in the background every BATTERY_SAMPLE_INTERVAL seconds (see battery)
+    BATTERY_SAMPLE_INTERVAL = 1
+    BATTERY_SAMPLE_PRIORITY = 2
 
     cam_pin = pin()
 
@@ -74,10 +90,11 @@ class _Satellite:
         self.task = None
         self.scheduled_tasks = {}
 
-        self.sdcard = SD()
-        self.radio = Radio()
-        self.burnwire1 = Burnwire()
-        self.camera = Camera()
+        self.sdcard = boot_profile.timed_device('sdcard', SD)
+        self.radio = boot_profile.timed_device('radio', Radio)
+        self.radio.use_dio0(self.radio.dio0)
+        self.burnwire1 = boot_profile.timed_device('burnwire1', Burnwire)
+        self.camera = boot_profile.timed_device('camera', Camera)
 
         self.data_cache = {}
 
@@ -93,6 +110,11 @@ class _Satellite:
         self._imu_temperature = 20
         self._luxp = array([3.0, 1.0, 2.0])
         self._luxn = array([2.0, 4.0, 7.0])
+        self.imu_snapshot = Snapshot(self._read_imu, self.SENSOR_MAX_AGE)
+        self.sun_snapshot = Snapshot(self._read_sun, self.SENSOR_MAX_AGE)
+        self.battery = Sampler(self._read_battery_voltage)
+        sampling = tasko.schedule(1 / self.BATTERY_SAMPLE_INTERVAL, self.battery.run, self.BATTERY_SAMPLE_PRIORITY)
+        sampling.name = 'battery'
 
         # debug utilities
         self.sim = False
@@ -101,23 +123,37 @@ class _Satellite:
         builtins.open = self.sdcard.custom_open
         os.mkdir = self.sdcard.custom_mkdir
 
+    def _read_imu(self):
+        """ (acceleration, magnetic, gyro), see the pycubedmini driver """
+        reader.read(self)
+        return (self._accel, self._mag, self._gyro)
+
+    def _read_sun(self):
+        """ lux of the sun sensors (+x, +y, +z, -x, -y, -z), None for a failing sensor """
+        lux = []
+        for name in ('sun_xp', 'sun_yp', 'sun_zp', 'sun_xn', 'sun_yn', 'sun_zn'):
+            try:
+                lux.append(getattr(self, name).lux)
+            except Exception as e:
+                print(f'[ERROR][Reading {name}] {e}')
+                self.reset_device(name)
+                lux.append(None)
+        return tuple(lux)
+
     @property
     def acceleration(self):
         """ return the accelerometer reading from the IMU """
-        reader.read(self)
-        return self._accel
+        return self.imu_snapshot.values()[0]
 
     @property
     def magnetic(self):
         """ return the magnetometer reading from the IMU """
-        reader.read(self)
-        return self._mag
+        return self.imu_snapshot.values()[1]
 
     @property
     def gyro(self):
         """ return the gyroscope reading from the IMU """
-        reader.read(self)
-        return self._gyro
+        return self.imu_snapshot.values()[2]
 
     @property
     def temperature_imu(self):
@@ -140,6 +176,10 @@ class _Satellite:
 
     @property
     def battery_voltage(self):
+        """ the battery voltage, filtered over the samples taken in the background (see the pycubedmini driver) """
+        return self.battery.latest()
+
+    def _read_battery_voltage(self):
         reader.read(self)
         random_offset = - 0.5 + random.random() if self.randomize_voltage else 0
         return self.LOW_VOLTAGE + 0.01 + random_offset
@@ -155,10 +195,11 @@ class _Satellite:
 
     @property
     def sun_vector(self):
-        """returns the sun pointing vector in the body frame"""
-        return array([self._luxp[0] - self._luxn[0],
-                      self._luxp[1] - self._luxn[1],
-                      self._luxp[2] - self._luxn[2]])
+        """returns the sun pointing vector in the body frame, None if a sun sensor can't be read"""
+        xp, yp, zp, xn, yn, zn = self.sun_snapshot.values()
+        if None in (xp, yp, zp, xn, yn, zn):
+            return None
+        return array([xp - xn, yp - yn, zp - zn])
 
     @property
     def micro(self):
@@ -206,11 +247,12 @@ class _Satellite:
 
             # set the burnwire's dutycycle; begins the burn
             burnwire.duty_cycle = int(dutycycle * (0xFFFF))
-            await tasko.sleep(duration)  # wait for given duration
-
-            # set burnwire's dutycycle back to 0; ends the burn
-            burnwire.duty_cycle = 0
-            self.RGB = (0, 0, 0)
+            try:
+                await tasko.sleep(duration)  # wait for given duration
+            finally:
+                # set burnwire's dutycycle back to 0; ends the burn (also if the burn is canceled)
+                burnwire.duty_cycle = 0
+                self.RGB = (0, 0, 0)
 
             self._deployA = True  # sets deployment variable to true
             return True
@@ -218,6 +260,14 @@ class _Satellite:
             print('[ERROR][Burning]', e)
             return False
 
+    def device_stats(self):
+        """ per device health, see the pycubedmini driver, emulated devices are always healthy """
+        return {name: (True, 1, 0, 0, 0.0) for name in ('sdcard', 'radio', 'burnwire1', 'camera')}
+
+    def reset_device(self, name):
+        """ called when using a device raised an error, emulated devices are not initialized again """
+        pass
+
     def clear_nvm(self):
         """ clear all non volatile memory """
         for i in range(len(nvm)):
@@ -231,5 +281,20 @@ class _Satellite:
         """ set all devices into normal power modes """
         pass
 
+    def idle(self, seconds):
+        """ called by the task loop when it has nothing to do, the hardware sleeps here instead """
+        time.sleep(seconds)
+
 
+async def _end_emulation(seconds):
+    print(f'Stopping emulation after {seconds}s')
+    sys.exit(0)
+
+
+boot_profile.mark('driver imports')
 cubesat = _Satellite()
+boot_profile.mark('devices')
+
+if os.getenv('PYCUBED_RUN_FOR'):
+    run_for = float(os.getenv('PYCUBED_RUN_FOR'))
+    tasko.run_later(run_for, _end_emulation(run_for), 0)
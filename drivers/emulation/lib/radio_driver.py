@@ -1,6 +1,16 @@
 import asyncio
 import queue
 import random
+import time
+import tasko
+from tasko.sync import Interrupt
+
+async def _sleep(seconds):
+    """Sleep on whichever loop is driving the radio: tasko in the emulation, asyncio in the unit tests"""
+    if tasko.get_loop()._current is not None:
+        await tasko.sleep(seconds)
+    else:
+        await asyncio.sleep(seconds)
 
 class _Packet:
     """A packet with a bytearray ofdata and probability of sucessful reception"""
@@ -16,6 +26,12 @@ class _Packet:
         else:
             return None
 
+class _DIO0:
+    """The radio's DIO0 pin as a countio.Counter of its rising edges: one for every packet received"""
+
+    def __init__(self):
+        self.count = 0
+
 class RadioDebug:
 
     def __init__(self, radio):
@@ -25,6 +41,7 @@ class RadioDebug:
     def push_rx_queue(self, packet):
         """Debug function to push a packet into the rx queue (fifo)"""
         self.radio._rx_queue.put(packet)
+        self.radio.dio0.count += 1
 
     def reset(self):
         self.clear_rx_queue()
@@ -54,15 +71,43 @@ class Radio:
         self._last_rssi = -147.0
         self._frequency_error = 123.45
 
+        self.receive_timeout = 0.5
+        self.dio0 = _DIO0()
+        self.dio0_interrupt = None
+
         self.test = RadioDebug(self)
 
     def listen(self):
         self.listening = True
 
+    def use_dio0(self, counter):
+        """Wait for received packets on DIO0 like the hardware driver, rather than polling rx_done()"""
+        self.dio0_interrupt = Interrupt(counter)
+
+    def rx_done(self):
+        return not self._rx_queue.empty()
+
     async def receive(self, *, keep_listening=True, with_header=False, with_ack=False, timeout=None, debug=False):
-        rx_time = self._rx_time_bias + (random.random() - 0.5) * self._rx_time_dev
-        await asyncio.sleep(rx_time)
-        if self._rx_queue.empty():
+        if tasko.get_loop()._current is None:
+            # unit tests on asyncio, the packet takes rx_time to arrive
+            rx_time = self._rx_time_bias + (random.random() - 0.5) * self._rx_time_dev
+            await _sleep(rx_time)
+            if self._rx_queue.empty():
+                return None
+            return self._rx_queue.get().observe()
+
+        if timeout is None:
+            timeout = self.receive_timeout
+        if self.dio0_interrupt is not None:
+            received = await self.dio0_interrupt.wait_until(self.rx_done, timeout)
+        else:
+            # polls every step like the hardware driver without use_dio0(),
+            # which never idles the loop so it needs the real clock
+            end = time.monotonic() + timeout
+            while not self.rx_done() and time.monotonic() < end:
+                await tasko.sleep(0)
+            received = self.rx_done()
+        if not received:
             return None
         return self._rx_queue.get().observe()
 
@@ -79,7 +124,7 @@ class Radio:
 
     async def send(self, packet, destination=0x00, keep_listening=True):
         tx_time = self._tx_time_bias + (random.random() - 0.5) * self._tx_time_dev
-        await asyncio.sleep(tx_time)
+        await _sleep(tx_time)
         self.test.last_tx_packet = packet
         return None
 
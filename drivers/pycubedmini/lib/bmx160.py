@@ -364,6 +364,16 @@ class BMX160:
     def read_all(self):
         return self.read_bytes(BMX160_MAG_DATA_ADDR, 20, self._BUFFER)
 
+    def read_motion(self):
+        """ accel (m/s^2), mag (uT) and gyro (deg/s) from a single burst read, see read_all """
+        buf = self.read_all()
+        mag = struct.unpack_from('<hhh', buf, 0)
+        gyro = struct.unpack_from('<hhh', buf, 8)
+        accel = struct.unpack_from('<hhh', buf, 14)
+        return (tuple(x * self.ACC_SCALAR for x in accel),
+                tuple(x * self.MAG_SCALAR for x in mag),
+                tuple(x * self.GYR_SCALAR for x in gyro))
+
     # synonymous
     # @property
     # def error_status(self):
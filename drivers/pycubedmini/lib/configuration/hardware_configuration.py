@@ -7,6 +7,10 @@ HARDWARE_VERSION = "B3/03"      # April 2024
 # HARDWARE_VERSION = "B1/02"    # Oct 2022
 # HARDWARE_VERSION = "B1/01"    # Aug 2022
 
+# Set to bring up only the critical devices (radio, IMU) before the scheduler starts,
+# and the others in background tasks that retry them with backoff (see pycubed.py)
+DEFERRED_INIT = False
+
 SUN_TYPE_TSL2561 = 1
 SUN_TYPE_OPT3001 = 2
 SUN_TYPE_OPT4001 = 3
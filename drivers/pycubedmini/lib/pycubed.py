@@ -34,18 +34,42 @@ import time
 import tasko
 from ulab.numpy import array, dot
 import supervisor
+import lib.boot_profile as boot_profile
+from lib.snapshot import Snapshot
+from lib.sampler import Sampler
+try:
+    import alarm
+except ImportError:
+    alarm = None
+try:
+    import countio
+except ImportError:
+    countio = None
 
 class device:
     """
     Based on the code from: https://docs.python.org/3/howto/descriptor.html#properties
     Attempts to return the appropriate hardware device.
-    If this fails, it will attempt to reinitialize the hardware.
-    If this fails again, it will raise an exception.
+    If this fails, it will attempt to reinitialize the hardware, but only after a backoff:
+    until then the device is None without trying, so a dead device doesn't stall every access.
+    The backoff starts at RETRY_SECONDS and doubles with every failure in a row, up to RETRY_MAX_SECONDS.
     """
 
+    RETRY_SECONDS = 1
+    RETRY_MAX_SECONDS = 300
+
     def __init__(self, fget=None):
         self.fget = fget
         self._device = None
+        self._name = fget.__name__ if fget is not None else None
+        # number of times initializing the device was tried, and how long the successful try took
+        self.attempts = 0
+        self.init_nanos = None
+        # health: failed inits (and resets) in a row, the errors reported with reset(),
+        # and the time.monotonic_ns() before which the device is not initialized again
+        self.failures = 0
+        self.errors = 0
+        self.retry_nanos = 0
 
     def __get__(self, instance, owner=None):
         if instance is None:
@@ -55,9 +79,40 @@ class device:
 
         if self._device is not None:
             return self._device
+        elif self.failures and time.monotonic_ns() < self.retry_nanos:
+            return None
         else:
-            self._device = self.fget(instance)
-            return self._device
+            return self.init(instance)
+
+    def init(self, instance):
+        """ Try to initialize the device, returns it or None if that failed """
+        start = time.monotonic_ns()
+        self._device = self.fget(instance)
+        end = time.monotonic_ns()
+        self.attempts += 1
+        if self._device is not None:
+            self.init_nanos = end - start
+            self.failures = 0
+        else:
+            self._backoff(end)
+        boot_profile.record_device(self._name, end - start, self._device is not None)
+        return self._device
+
+    def reset(self):
+        """ Drop the device after it raised an error, it is initialized again after the backoff """
+        self._device = None
+        self.errors += 1
+        self._backoff(time.monotonic_ns())
+
+    def _backoff(self, now):
+        self.failures += 1
+        seconds = min(self.RETRY_SECONDS << min(self.failures - 1, 16), self.RETRY_MAX_SECONDS)
+        self.retry_nanos = now + seconds * 1000000000
+
+    def health(self):
+        """ (initialized, init attempts, failures in a row, errors, milliseconds the successful init took or None) """
+        return (self._device is not None, self.attempts, self.failures, self.errors,
+                self.init_nanos / 1000000 if self.init_nanos is not None else None)
 
 
 """
@@ -91,6 +146,26 @@ class _Satellite:
     HIGH_TEMP = 125
     # Min operating temp on specsheet for ATSAMD51J19A (Celsius)
     LOW_TEMP = -40
+    # Shorter idles are not worth the light sleep entry/exit time (seconds)
+    LIGHT_SLEEP_MIN = 0.05
+    # IMU and sun sensor readings are reused for this many seconds (see imu_snapshot and sun_snapshot)
+    SENSOR_MAX_AGE = 0.05
+    # The battery voltage is sampled in the background every BATTERY_SAMPLE_INTERVAL seconds,
+    # averaging BATTERY_READS reads of the ADC, and filtered over the samples (see battery)
+    BATTERY_SAMPLE_INTERVAL = 1
+    BATTERY_READS = 4
+    BATTERY_SAMPLE_PRIORITY = 2
+
+    # Initialized first, before the scheduler starts (NVM is available before any device)
+    CRITICAL_DEVICES = ('radio', 'imu')
+    # Initialized after those, in background tasks if hw_config.DEFERRED_INIT is set
+    DEFERRED_DEVICES = ('uart_camera', 'i2c1', 'i2c2', 'i2c3', 'spi', 'sdcard', 'vfs', 'neopixel', 'rtc',
+                        'sun_xn', 'sun_yn', 'sun_zn', 'sun_xp', 'sun_yp', 'sun_zp', 'current_sensor',
+                        'drv_x', 'drv_y', 'drv_z', 'burnwire1', 'camera')
+    # A device that fails to initialize in the background is retried after its backoff
+    # (see device), up to this many times
+    DEVICE_INIT_ATTEMPTS = 8
+    DEVICE_INIT_PRIORITY = 200
 
     def __new__(cls):
         """
@@ -105,35 +180,49 @@ class _Satellite:
     def __init__(self):
         """ Big init routine as the whole board is brought up. """
         self.BOOTTIME = int(time.monotonic())  # get monotonic time at initialization
+        # set by radio() when DIO0 is counted, idle() wakes on it
+        self._dio0_interrupt = None
         self.micro = microcontroller
         self.c_boot += 1  # increment boot count (can only do this after self.micro is set up)
         self.micro.on_next_reset(self.micro.RunMode.NORMAL)  # make sure it always resets in normal mode
         self._vbatt = analogio.AnalogIn(board.BATTERY)  # Battery voltage
-
-        # To force initialization of hardware
-        self.uart_camera
-        self.i2c1
-        self.i2c2
-        self.i2c3
-        self.spi
-        self.sdcard
-        self.vfs
-        self.neopixel
-        self.imu
-        self.rtc
-        self.radio
-        self.sun_xn
-        self.sun_yn
-        self.sun_zn
-        self.sun_xp
-        self.sun_yp
-        self.sun_zp
-        self.current_sensor
-        self.drv_x
-        self.drv_y
-        self.drv_z
-        self.burnwire1
-        self.camera
+        self.battery = Sampler(self._read_battery_voltage)
+        sampling = tasko.schedule(1 / self.BATTERY_SAMPLE_INTERVAL, self.battery.run, self.BATTERY_SAMPLE_PRIORITY)
+        sampling.name = 'battery'
+        self.imu_snapshot = Snapshot(self._read_imu, self.SENSOR_MAX_AGE)
+        self.sun_snapshot = Snapshot(self._read_sun, self.SENSOR_MAX_AGE)
+
+        # To force initialization of hardware, the critical devices first
+        for name in self.CRITICAL_DEVICES:
+            getattr(self, name)
+        for name in self.DEFERRED_DEVICES:
+            if getattr(hw_config, 'DEFERRED_INIT', False):
+                tasko.add_task(self._init_later(name), self.DEVICE_INIT_PRIORITY)
+            else:
+                getattr(self, name)
+
+    async def _init_later(self, name):
+        """ Initialize a device once the scheduler runs, retrying after its backoff if it fails.
+        Accessing the device before then initializes it right away, as without DEFERRED_INIT """
+        descriptor = getattr(_Satellite, name)
+        while descriptor.attempts < self.DEVICE_INIT_ATTEMPTS:
+            if getattr(self, name) is not None:
+                return
+            await tasko.sleep(max(descriptor.retry_nanos - time.monotonic_ns(), 0) / 1000000000)
+        print(f'[ERROR][Initializing {name}] giving up after {self.DEVICE_INIT_ATTEMPTS} attempts')
+
+    def device_stats(self):
+        """ Per device: whether it is initialized, the number of attempts to initialize it,
+        the failed attempts (and resets) in a row, the errors reported with reset_device
+        and how many milliseconds the successful init took (None if none did) """
+        stats = {}
+        for name in self.CRITICAL_DEVICES + self.DEFERRED_DEVICES:
+            stats[name] = getattr(_Satellite, name).health()
+        return stats
+
+    def reset_device(self, name):
+        """ Call when using a device raised an error, so it is initialized again (after a backoff) """
+        getattr(_Satellite, name).reset()
 
     @device
     def uart_camera(self):
@@ -249,8 +338,12 @@ class _Satellite:
         try:
             self._rf_cs = digitalio.DigitalInOut(board.RF_CS)
             self._rf_rst = digitalio.DigitalInOut(board.RF_RST)
-            self.radio_DIO0 = digitalio.DigitalInOut(board.RF_IO0)
-            self.radio_DIO0.switch_to_input()
+            if countio is None:
+                self.radio_DIO0 = digitalio.DigitalInOut(board.RF_IO0)
+                self.radio_DIO0.switch_to_input()
+            else:
+                # counts the rx done edges, so receiving sleeps until one instead of polling the radio
+                self.radio_DIO0 = countio.Counter(board.RF_IO0, edge=countio.Edge.RISE)
             self.radio_DIO1 = digitalio.DigitalInOut(board.RF_IO1)
             self.radio_DIO1.switch_to_input()
             self._rf_cs.switch_to_output(value=True)
@@ -268,7 +361,11 @@ class _Satellite:
             radio.coding_rate = rf_config.CODING_RATE
             radio.signal_bandwidth = rf_config.SIGNAL_BANDWIDTH
 
-            radio.dio0 = self.radio_DIO0
+            if countio is None:
+                radio.dio0 = self.radio_DIO0
+            else:
+                radio.use_dio0(self.radio_DIO0)
+                self._dio0_interrupt = radio.dio0_interrupt
 
             radio.tx_power = rf_config.TX_POWER
             radio.preamble_length = rf_config.PREAMBLE_LENGTH
@@ -499,20 +596,53 @@ class _Satellite:
     def imuToBodyFrame(self, vec):
         return dot(hw_config.R_IMU2BODY, array(vec))
 
+    def _read_imu(self):
+        """ (acceleration, magnetic, gyro) in the body frame, read from the IMU in one go
+        if it supports that, or None without an IMU """
+        imu = self.imu
+        if not imu:
+            return None
+        try:
+            if hasattr(imu, 'read_motion'):
+                accel, mag, gyro = imu.read_motion()
+            else:
+                accel, mag, gyro = imu.accel, imu.mag, imu.gyro
+        except Exception as e:
+            print(f'[ERROR][Reading IMU] {e}')
+            self.reset_device('imu')
+            return None
+        return (self.imuToBodyFrame(accel), self.imuToBodyFrame(mag), self.imuToBodyFrame(gyro))
+
+    def _read_sun(self):
+        """ lux of the sun sensors (+x, +y, +z, -x, -y, -z), None for a missing or failing sensor """
+        lux = []
+        for name in ('sun_xp', 'sun_yp', 'sun_zp', 'sun_xn', 'sun_yn', 'sun_zn'):
+            sensor = getattr(self, name)
+            try:
+                lux.append(sensor.lux if sensor else None)
+            except Exception as e:
+                print(f'[ERROR][Reading {name}] {e}')
+                self.reset_device(name)
+                lux.append(None)
+        return tuple(lux)
+
     @property
     def acceleration(self):
         """ return the accelerometer reading from the IMU in m/s^2 """
-        return self.imuToBodyFrame(self.imu.accel) if self.imu else None
+        readings = self.imu_snapshot.values()
+        return readings[0] if readings else None
 
     @property
     def magnetic(self):
         """ return the magnetometer reading from the IMU in µT """
-        return self.imuToBodyFrame(self.imu.mag) if self.imu else None
+        readings = self.imu_snapshot.values()
+        return readings[1] if readings else None
 
     @property
     def gyro(self):
         """ return the gyroscope reading from the IMU in deg/s """
-        return self.imuToBodyFrame(self.imu.gyro) if self.imu else None
+        readings = self.imu_snapshot.values()
+        return readings[2] if readings else None
 
     @property
     def temperature_imu(self):
@@ -538,11 +668,18 @@ class _Satellite:
     @property
     def battery_voltage(self):
         """
-        Return the battery voltage
+        Return the battery voltage, filtered over the recent samples taken in the background
+        (see battery and _read_battery_voltage). The time of the last sample is battery.nanos,
+        the recent minimum, maximum and trend (volts per second) battery.min(), battery.max() and battery.trend()
+        """
+        return self.battery.latest()
+
+    def _read_battery_voltage(self):
+        """
+        Read the battery voltage
         _cubesat._vbatt.value converts the analog value of the
-        board.BATTERY pin to a digital one. We read this value 50
-        times and then later average it to get as close as possible
-        to a reliable battery voltage value
+        board.BATTERY pin to a digital one. We read this value a few
+        times and average it, the battery sampler filters further
         """
 
         # Handle an issue with the hardware where the 3V3 bus is
@@ -559,25 +696,24 @@ class _Satellite:
         # initialize vbat
         vbat = 0
 
-        # get the battery value 50 times
-        for _ in range(50):
+        for _ in range(self.BATTERY_READS):
             # 65536 = 2^16, number of increments we can have to voltage
             vbat += self._vbatt.value * vref / 65536
 
-        # vbat / 50 = average of all battery voltage values read
+        # average of the battery voltage values read
         # 100k/100k voltage divider
-        voltage = (vbat / 50) * (100 + 100) / 100
+        voltage = (vbat / self.BATTERY_READS) * (100 + 100) / 100
 
         # volts
         return voltage
 
     @property
     def sun_vector(self):
-        """Returns the sun pointing vector in the body frame"""
-        return array(
-            [self.sun_xp.lux - self.sun_xn.lux,
-                self.sun_yp.lux - self.sun_yn.lux,
-                self.sun_zp.lux - self.sun_zn.lux])
+        """Returns the sun pointing vector in the body frame, None if a sun sensor can't be read"""
+        xp, yp, zp, xn, yn, zn = self.sun_snapshot.values()
+        if None in (xp, yp, zp, xn, yn, zn):
+            return None
+        return array([xp - xn, yp - yn, zp - zn])
 
     async def burn(self, dutycycle=0.0031, duration=3):
         """
@@ -597,11 +733,12 @@ class _Satellite:
 
             # set the burnwire's dutycycle; begins the burn
             burnwire.duty_cycle = int(dutycycle * (0xFFFF))
-            await tasko.sleep(duration)  # wait for given duration
-
-            # set burnwire's dutycycle back to 0; ends the burn
-            burnwire.duty_cycle = 0
-            self.RGB = (0, 0, 0)
+            try:
+                await tasko.sleep(duration)  # wait for given duration
+            finally:
+                # set burnwire's dutycycle back to 0; ends the burn (also if the burn is canceled)
+                burnwire.duty_cycle = 0
+                self.RGB = (0, 0, 0)
 
             self.f_burn = True
             return True
@@ -617,7 +754,14 @@ class _Satellite:
     @property
     def battery_current(self):
         """ return the current_sensor current reading in milliamps """
-        return self.current_sensor.current if self.current_sensor else None
+        if not self.current_sensor:
+            return None
+        try:
+            return self.current_sensor.current
+        except Exception as e:
+            print(f'[ERROR][Reading current] {e}')
+            self.reset_device('current_sensor')
+            return None
 
     @RGB.setter
     def RGB(self, v):
@@ -695,6 +839,39 @@ class _Satellite:
         if self.sun_zp:
             self.sun_zp.enabled = True
 
+    @property
+    def idle_wakes_on_interrupts(self):
+        """ whether idle() returns once a packet is received, so the task loop doesn't poll DIO0 while idle.
+        Idles shorter than LIGHT_SLEEP_MIN still sleep through it """
+        return alarm is not None and self._dio0_interrupt is not None
+
+    def idle(self, seconds):
+        """ called by the task loop when it has nothing to do for up to seconds.
+        Light sleeps through longer idles, RAM and pin states are kept while the core is stopped.
+        A rising edge of the radio's DIO0 (a packet was received) ends the light sleep early """
+        if alarm is None or seconds < self.LIGHT_SLEEP_MIN:
+            time.sleep(seconds)
+            return
+        time_alarm = alarm.time.TimeAlarm(monotonic_time=time.monotonic() + seconds)
+        interrupt = self._dio0_interrupt
+        if interrupt is None:
+            alarm.light_sleep_until_alarms(time_alarm)
+            return
+        # the counter holds the pin, so it is handed to a pin alarm for the sleep
+        # and counted on after it, with the edge that woke the sleep
+        count = interrupt.counter.count
+        interrupt.counter.deinit()
+        woke = None
+        try:
+            woke = alarm.light_sleep_until_alarms(
+                time_alarm, alarm.pin.PinAlarm(board.RF_IO0, value=True, edge=True))
+        finally:
+            counter = countio.Counter(board.RF_IO0, edge=countio.Edge.RISE)
+            counter.count = count + (1 if isinstance(woke, alarm.pin.PinAlarm) else 0)
+            self.radio_DIO0 = interrupt.counter = counter
+
 
+boot_profile.mark('driver imports')
 # initialize Satellite as cubesat
 cubesat = _Satellite()
+boot_profile.mark('devices')
@@ -20,6 +20,7 @@ import time
 import adafruit_bus_device.spi_device as spidev
 from micropython import const
 import tasko
+from tasko.sync import Interrupt
 
 HAS_SUPERVISOR = False
 
@@ -389,6 +390,8 @@ class RFM9x:
         """The amount of time to poll for a received packet.
            If no packet is received, the returned packet will be None
         """
+        self.dio0_interrupt = None
+        """Set by use_dio0(), None while receiving polls the IRQ flags"""
         self.xmit_timeout = 2.0
         """The amount of time to wait for the HW to transmit the packet.
            This is mainly used to prevent a hang due to a HW issue
@@ -712,6 +715,12 @@ class RFM9x:
         """Receive status"""
         return (self._read_u8(_RH_RF95_REG_3F_IRQ_FLAGS_2) & 0b0100) >> 2
 
+    def use_dio0(self, counter):
+        """Wait for received packets on the DIO0 pin rather than polling the IRQ flags over SPI.
+           counter counts the rising edges of DIO0, e.g. a countio.Counter
+        """
+        self.dio0_interrupt = Interrupt(counter)
+
     def crc_ok(self):
         """crc status"""
         return (self._read_u8(_RH_RF95_REG_3F_IRQ_FLAGS_2) & 0b0010) >> 1
@@ -905,7 +914,15 @@ class RFM9x:
                     print("RFM9X: RX timed out")
                 break
 
-            await tasko.sleep(0)
+            if self.dio0_interrupt is None:
+                await tasko.sleep(0)
+            else:
+                # sleep until DIO0 signals a packet, at most until the timeout
+                if HAS_SUPERVISOR:
+                    elapsed = ticks_diff(supervisor.ticks_ms(), start) / 1000
+                else:
+                    elapsed = time.monotonic() - start
+                await self.dio0_interrupt.wait_until(self.rx_done, timeout - elapsed)
 
         # Exit
         if keep_listening:
@@ -17,6 +17,7 @@ import time
 import adafruit_bus_device.spi_device as spidev
 from micropython import const
 import tasko
+from tasko.sync import Interrupt
 
 HAS_SUPERVISOR = False
 
@@ -342,6 +343,8 @@ class RFM9x:
         """The amount of time to poll for a received packet.
            If no packet is received, the returned packet will be None
         """
+        self.dio0_interrupt = None
+        """Set by use_dio0(), None while receiving polls the IRQ flags"""
         self.xmit_timeout = 2.0
         """The amount of time to wait for the HW to transmit the packet.
            This is mainly used to prevent a hang due to a HW issue
@@ -695,6 +698,12 @@ class RFM9x:
         """Receive status"""
         return (self._read_u8(_RH_RF95_REG_12_IRQ_FLAGS) & 0x40) >> 6
 
+    def use_dio0(self, counter) -> None:
+        """Wait for received packets on the DIO0 pin rather than polling the IRQ flags over SPI.
+           counter counts the rising edges of DIO0, e.g. a countio.Counter
+        """
+        self.dio0_interrupt = Interrupt(counter)
+
     def crc_error(self) -> bool:
         """crc status"""
         return (self._read_u8(_RH_RF95_REG_12_IRQ_FLAGS) & 0x20) >> 5
@@ -864,14 +873,16 @@ class RFM9x:
         if timeout is None:
             timeout = self.receive_timeout
         if timeout is not None:
-            # Wait for the payload_ready signal.  This is not ideal and will
-            # surely miss or overflow the FIFO when packets aren't read fast
-            # enough, however it's the best that can be done from Python without
-            # interrupt supports.
+            # Wait for the payload_ready signal.  Without use_dio0() this polls
+            # the IRQ flags, which will surely miss or overflow the FIFO when
+            # packets aren't read fast enough.
             # Make sure we are listening for packets.
             self.listen()
             timed_out = False
-            if HAS_SUPERVISOR:
+            if self.dio0_interrupt is not None:
+                # sleep until DIO0 signals rx done
+                timed_out = not await self.dio0_interrupt.wait_until(self.rx_done, timeout)
+            elif HAS_SUPERVISOR:
                 start = supervisor.ticks_ms()
                 while not timed_out and not self.rx_done():
                     if ticks_diff(supervisor.ticks_ms(), start) >= timeout * 1000:
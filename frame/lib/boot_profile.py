@@ -0,0 +1,94 @@
+"""
+Timestamps the phases of the boot, from main.py starting to the first tasks being scheduled,
+and how long each device took to initialize.
+
+main.py imports this first, so the times are relative to that. Phases are marked with mark()
+as they end, devices are recorded with timed_device(). finish() ends the boot, devices
+initialized after that (e.g. retried later by a task) are not recorded.
+"""
+import time
+
+# bound now, so the boot is measured on the real clock even if a simulated one is set up later
+_nanos = time.monotonic_ns
+
+start_nanos = _nanos()
+# (phase name, nanoseconds from start_nanos to the end of the phase)
+phases = []
+# (device name, nanoseconds its init took, whether it initialized)
+devices = []
+# nanoseconds from start_nanos to finish(), None while booting
+boot_nanos = None
+
+
+def mark(phase):
+    """Record that a phase of the boot ended now"""
+    if boot_nanos is None:
+        phases.append((phase, _nanos() - start_nanos))
+
+
+def timed_device(name, init, *args):
+    """
+    Initialize a device with init(*args), recording how long it took while booting.
+    A device is initialized if init returns something other than None, its time includes
+    the devices it initialized first (e.g. the SD card its SPI bus).
+    """
+    if boot_nanos is not None:
+        return init(*args)
+    start = _nanos()
+    device = init(*args)
+    record_device(name, _nanos() - start, device is not None)
+    return device
+
+
+def record_device(name, nanos, ok):
+    """Record a device init that was timed elsewhere"""
+    if boot_nanos is None:
+        devices.append((name, nanos, ok))
+
+
+def finish(phase='scheduled'):
+    """Mark the last phase and end the boot"""
+    global boot_nanos
+    mark(phase)
+    boot_nanos = _nanos() - start_nanos
+
+
+def failed_devices():
+    """Names of the devices whose last init while booting failed"""
+    status = {}
+    for name, _, ok in devices:
+        status[name] = ok
+    return sorted(name for name, ok in status.items() if not ok)
+
+
+def report():
+    """
+    The boot as a dict: total milliseconds (None while booting),
+    milliseconds each phase took and each device init took, and the failed devices
+    """
+    phase_ms = []
+    previous = 0
+    for name, nanos in phases:
+        phase_ms.append([name, (nanos - previous) / 1000000])
+        previous = nanos
+    return {
+        'total_ms': boot_nanos / 1000000 if boot_nanos is not None else None,
+        'phases': phase_ms,
+        'devices': [[name, nanos / 1000000, ok] for name, nanos, ok in devices],
+        'failed': failed_devices(),
+    }
+
+
+def save(directory, name):
+    """Write report() as JSON to directory/name, making the directory if needed"""
+    import json
+    import os
+    path = ''
+    for part in directory.strip('/').split('/'):
+        path += '/' + part
+        try:
+            os.mkdir(path)
+        except OSError:
+            pass
+    with open(f'{path}/{name}', 'w') as f:
+        json.dump(report(), f)
@@ -0,0 +1,95 @@
+"""
+A slowly changing analog value (e.g. the battery voltage) sampled in the background,
+so reading it is O(1) instead of averaging many blocking reads every time.
+"""
+import time
+from array import array
+
+# sample times are kept in milliseconds modulo 2**32, recent samples are less than that apart
+_MILLIS_MASK = 0xffffffff
+
+
+class Sampler:
+    """
+    Filters the samples of read() with an exponential moving average, and keeps the last
+    samples in a ring buffer for their minimum, maximum and trend.
+    """
+
+    def __init__(self, read, size=16, alpha=0.25):
+        """
+        :param read: Returns one (raw) sample
+        :param size: Number of recent samples kept
+        :param alpha: Weight of a new sample in the moving average (1 is no filtering)
+        """
+        self.read = read
+        self.alpha = alpha
+        # reads that failed in run()
+        self.errors = 0
+        # samples, and the milliseconds they were taken at
+        self._samples = array('f', [0.0] * size)
+        self._millis = array('L', [0] * size)
+        self.reset()
+
+    def reset(self):
+        """Forget the samples, the next one starts the moving average again"""
+        self.count = 0
+        self._next = 0
+        # filtered value, and the time.monotonic_ns() of its last sample
+        self.value = None
+        self.nanos = None
+
+    def sample(self):
+        """Take a sample and return the filtered value"""
+        raw = self.read()
+        self.nanos = time.monotonic_ns()
+        if self.value is None:
+            self.value = raw
+        else:
+            self.value += self.alpha * (raw - self.value)
+        self._samples[self._next] = raw
+        self._millis[self._next] = (self.nanos // 1000000) & _MILLIS_MASK
+        self._next = (self._next + 1) % len(self._samples)
+        self.count = min(self.count + 1, len(self._samples))
+        return self.value
+
+    def latest(self):
+        """The filtered value, sampled now if there is no sample yet"""
+        if self.value is None:
+            return self.sample()
+        return self.value
+
+    def min(self):
+        """The lowest recent sample, None if there is none"""
+        return min(self._samples[:self.count]) if self.count else None
+
+    def max(self):
+        """The highest recent sample, None if there is none"""
+        return max(self._samples[:self.count]) if self.count else None
+
+    def trend(self):
+        """Change per second of the recent samples (least squares slope), 0 with less than 2 samples"""
+        n = self.count
+        if n < 2:
+            return 0.0
+        samples = self._samples
+        millis = self._millis
+        # times relative to the newest sample, so a float keeps their resolution however long the uptime
+        newest = millis[self._next - 1]
+        mean_age = sum((newest - millis[i]) & _MILLIS_MASK for i in range(n)) / n
+        mean_v = sum(samples[:n]) / n
+        covariance = 0.0
+        variance = 0.0
+        for i in range(n):
+            dt = (mean_age - ((newest - millis[i]) & _MILLIS_MASK)) / 1000
+            covariance += dt * (samples[i] - mean_v)
+            variance += dt * dt
+        return covariance / variance if variance else 0.0
+
+    async def run(self):
+        """Take a sample, for scheduling with tasko.
+        A failed read is logged and counted in errors, the samples so far are kept."""
+        try:
+            self.sample()
+        except Exception as e:
+            self.errors += 1
+            print(f'[ERROR][Sampling] {e}')
@@ -0,0 +1,95 @@
+"""
+Schedulability analysis of a state's tasks, from their configured intervals
+and the iteration times measured by the tasko profiler.
+
+Tasks are cooperative: once an iteration starts it runs until it awaits,
+so besides the tasks that run before it, a task can be held up by one
+iteration of a task that runs after it (blocking).
+"""
+from tasko.loop import POLICY_PRIORITY, POLICY_EDF
+
+# give up on a response time once it has been iterated this many times
+MAX_ITERATIONS = 100
+
+
+def _response_seconds(task, others):
+    """
+    Worst case time from a task being due to its iteration finishing under POLICY_PRIORITY,
+    or None if it can exceed the task's interval.
+    """
+    name, interval, cost, priority = task
+    blocking = max([o[2] for o in others if o[3] > priority], default=0.0)
+    interfering = [o for o in others if o[3] <= priority]
+    response = blocking + cost + sum(o[2] for o in interfering)
+    for _ in range(MAX_ITERATIONS):
+        if response > interval:
+            return None
+        # ceil without math, for the number of times each interfering task can be due in response
+        updated = blocking + cost + sum(-(-response // o[1]) * o[2] for o in interfering)
+        if updated == response:
+            return response
+        response = updated
+    return None
+
+
+def analyze(tasks, policy=POLICY_PRIORITY):
+    """
+    :param tasks: list of (name, interval seconds, iteration cost seconds, priority) tuples,
+                  the cost is None if it has not been measured
+    :param policy: the tasko scheduling policy, see Loop.set_policy()
+    :returns: dict with the total utilization, whether every measured task meets its interval, and per task:
+              its utilization (cost / interval), worst case response time (POLICY_PRIORITY only) and whether
+              it always finishes within its interval (None if not measured)
+    """
+    measured = [t for t in tasks if t[2] is not None]
+    utilization = sum(t[2] / t[1] for t in measured)
+    rows = []
+    for task in tasks:
+        name, interval, cost, priority = task
+        row = {'name': name, 'interval': interval, 'cost': cost, 'priority': priority,
+               'utilization': None, 'response': None, 'ok': None}
+        rows.append(row)
+        if cost is None:
+            continue
+        row['utilization'] = cost / interval
+        others = [t for t in measured if t is not task]
+        if policy == POLICY_EDF:
+            # density test: the load, plus the longest iteration of a task due later
+            blocking = max([o[2] for o in others if o[1] > interval], default=0.0)
+            row['ok'] = utilization + blocking / interval <= 1
+        else:
+            row['response'] = _response_seconds(task, others)
+            row['ok'] = row['response'] is not None
+    return {
+        'policy': policy,
+        'utilization': utilization,
+        'schedulable': all(row['ok'] is not False for row in rows),
+        'tasks': rows,
+    }
+
+
+def state_report(state_machine, loop):
+    """
+    Analyze the current state of the state machine, with the worst iteration times measured
+    while the loop was profiling (see Loop.enable_profiling())
+    """
+    tasks = []
+    for name, interval, priority, _, _, _ in state_machine.compiled.tasks[state_machine.state_id]:
+        stats = loop.stats.tasks.get(name) if loop.stats is not None else None
+        cost = stats.max_nanos / 1e9 if stats is not None and stats.runs else None
+        tasks.append((name, interval, cost, priority))
+    return analyze(tasks, loop.policy)
+
+
+def format_report(report):
+    lines = [f"policy {report['policy']}, utilization {report['utilization'] * 100:.1f}%, "
+             f"{'schedulable' if report['schedulable'] else 'NOT schedulable'}"]
+    for row in report['tasks']:
+        if row['cost'] is None:
+            lines.append(f"{row['name']}: not measured")
+            continue
+        line = f"{row['name']}: {row['cost'] * 1000:.1f}ms every {row['interval']}s ({row['utilization'] * 100:.1f}%)"
+        if row['response'] is not None:
+            line += f", response {row['response'] * 1000:.1f}ms"
+        lines.append(line + ('' if row['ok'] else ', misses its interval'))
+    return '\n'.join(lines)
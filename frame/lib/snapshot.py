@@ -0,0 +1,43 @@
+"""
+Sensor readings shared by everything that reads them within a time window,
+so a sensor is read once per window however many tasks use its values.
+"""
+import time
+
+
+class Snapshot:
+    """
+    The latest reading of a sensor and the time.monotonic_ns() it was taken at.
+    get() reads the sensor again only once the reading is older than max_age seconds.
+    """
+
+    def __init__(self, read, max_age):
+        """
+        :param read: Reads all the values of the sensor in one go, and returns them
+        :param max_age: Seconds a reading is reused for
+        """
+        self.read = read
+        self.max_age = max_age
+        self._max_age_nanos = int(max_age * 1000000000)
+        # (nanos, values)
+        self.sample = None
+
+    def get(self, max_age=None):
+        """
+        The (time.monotonic_ns() of the reading, values read) of a reading at most max_age seconds old
+        (the snapshot's max_age by default), the sensor is read now if there is none.
+        """
+        now = time.monotonic_ns()
+        max_age_nanos = self._max_age_nanos if max_age is None else int(max_age * 1000000000)
+        sample = self.sample
+        if sample is None or now - sample[0] > max_age_nanos:
+            sample = self.sample = (now, self.read())
+        return sample
+
+    def values(self, max_age=None):
+        """Only the values of get()"""
+        return self.get(max_age)[1]
+
+    def invalidate(self):
+        """Read the sensor again on the next get(), e.g. after changing what it measures"""
+        self.sample = None
@@ -1,3 +1,6 @@
+from tasko.loop import CATCH_UP_POLICIES, CATCH_UP_RESET, POLICIES
+
+
 def typecheck_props(state_name, task_name, props):
     # using isinstance makes bools be considered ints.
     if type(props['Interval']) == int:
@@ -16,6 +19,89 @@ def typecheck_props(state_name, task_name, props):
         raise ValueError(
             f'{state_name}->Tasks->{task_name}->ScheduleLater should be bool not {type(props["ScheduleLater"])}')
 
+    if type(props['Slack']) is int:
+        props['Slack'] = float(props['Slack'])
+    if type(props['Slack']) is not float or props['Slack'] < 0:
+        raise ValueError(
+            f'{state_name}->Tasks->{task_name}->Slack should be a non-negative int or float not {props["Slack"]}')
+
+    if props['CatchUp'] not in CATCH_UP_POLICIES:
+        raise ValueError(
+            f'{state_name}->Tasks->{task_name}->CatchUp should be one of {CATCH_UP_POLICIES} not {props["CatchUp"]}')
+
+
+def validate_policy(policy, aging):
+    """Validates the optional SchedulingPolicy and PriorityAging of StateMachineConfig"""
+    if policy not in POLICIES:
+        raise ValueError(f'SchedulingPolicy should be one of {POLICIES} not {policy}')
+    if type(aging) not in (int, float) or aging < 0:
+        raise ValueError(f'PriorityAging should be a non-negative int or float not {aging}')
+
+
+class CompiledConfig:
+    """
+    A validated config as tables indexed by state id, the position of the state name in `states`.
+
+    states: the state names, sorted
+    steps_to: per state, a bitmask of the ids of the states it can step to
+    enter_functions, exit_functions: per state, a tuple of the transition functions to call
+    idle_slack: per state, its IdleSlack
+    tasks: per state, a tuple of (name, interval, priority, schedule later, catch up, slack) task specs
+    """
+
+    def __init__(self, states, steps_to, enter_functions, exit_functions, idle_slack, tasks):
+        self.states = states
+        self.steps_to = steps_to
+        self.enter_functions = enter_functions
+        self.exit_functions = exit_functions
+        self.idle_slack = idle_slack
+        self.tasks = tasks
+
+    def reachable_tasks(self, state_id):
+        """The names of the tasks of a state and of every state it can (eventually) step to"""
+        reachable = 1 << state_id
+        pending = reachable
+        while pending:
+            steps_to = 0
+            for i in range(len(self.states)):
+                if pending >> i & 1:
+                    steps_to |= self.steps_to[i]
+            pending = steps_to & ~reachable
+            reachable |= steps_to
+        return {spec[0] for i, specs in enumerate(self.tasks) if reachable >> i & 1 for spec in specs}
+
+
+def compile_config(config, TaskMap, TransitionFunctionMap):
+    """Validates the config (see validate_config) and compiles it into a CompiledConfig"""
+    validate_config(config, TaskMap, TransitionFunctionMap)
+    states = tuple(sorted(config))
+    ids = {name: i for i, name in enumerate(states)}
+
+    def functions(state_name, key):
+        for name in config[state_name][key]:
+            if name not in TransitionFunctionMap:
+                raise ValueError(f'{state_name}->{key} uses {name} but the function {name} is not defined')
+        return tuple(TransitionFunctionMap[name] for name in config[state_name][key])
+
+    steps_to = []
+    for state_name in states:
+        mask = 0
+        for next_state in config[state_name]['StepsTo']:
+            mask |= 1 << ids[next_state]
+        steps_to.append(mask)
+
+    return CompiledConfig(
+        states,
+        tuple(steps_to),
+        tuple(functions(state_name, 'EnterFunctions') for state_name in states),
+        tuple(functions(state_name, 'ExitFunctions') for state_name in states),
+        tuple(config[state_name]['IdleSlack'] for state_name in states),
+        tuple(
+            tuple((name, props['Interval'], props['Priority'], props['ScheduleLater'], props['CatchUp'], props['Slack'])
+                  for name, props in config[state_name]['Tasks'].items())
+            for state_name in states),
+    )
+
 
 def validate_config(config, TaskMap, TransitionFunctionMap):
     """Validates that the config file is well formed"""
@@ -32,6 +118,10 @@ def validate_config(config, TaskMap, TransitionFunctionMap):
                 raise ValueError(f'{state_name}->Tasks->{task_name}->Priority not defined')
             if 'ScheduleLater' not in props:
                 props['ScheduleLater'] = False  # default to false
+            if 'CatchUp' not in props:
+                props['CatchUp'] = CATCH_UP_RESET
+            if 'Slack' not in props:
+                props['Slack'] = 0.0
             typecheck_props(state_name, task_name, props)
         if 'StepsTo' not in state:
             raise ValueError(
@@ -58,7 +148,14 @@ def validate_config(config, TaskMap, TransitionFunctionMap):
         prop = state['ExitFunctions']
         if not isinstance(prop, list):
             raise ValueError(f'{state_name}->ExitFunctions should be an array not {type(prop)}')
-        valid_keys = {'Tasks', 'StepsTo', 'EnterFunctions', 'ExitFunctions'}
+        if 'IdleSlack' not in state:
+            state['IdleSlack'] = 0.0
+        if type(state['IdleSlack']) is int:
+            state['IdleSlack'] = float(state['IdleSlack'])
+        if type(state['IdleSlack']) is not float or state['IdleSlack'] < 0:
+            raise ValueError(f'{state_name}->IdleSlack should be a non-negative int or float not {state["IdleSlack"]}')
+
+        valid_keys = {'Tasks', 'StepsTo', 'EnterFunctions', 'ExitFunctions', 'IdleSlack'}
         for key in state.keys():
             if key not in valid_keys:
                 raise ValueError(f'{state_name}->{key} should not be defined, choose one of {valid_keys}')
@@ -6,6 +6,9 @@ class Task:
     Stores the task name and color.
     """
 
+    # number of errors raised by main_task
+    errors = 0
+
     def __init__(self):
         """
         Initialize the Task
@@ -28,6 +31,7 @@ class Task:
         try:
             await self.main_task()
         except Exception as e:
+            self.errors += 1
             await self.handle_error(e)
 
     async def handle_error(self, error):
@@ -2,11 +2,15 @@ import sys
 if '/lib' not in sys.path:
     sys.path.insert(0, './lib')
 
+# first, so the boot is timed from here
+import lib.boot_profile as boot_profile
 import traceback
 from pycubed import cubesat
 from state_machine import state_machine
 from config import initial
 
+boot_profile.mark('imports')
+
 
 print('Running...')
 try:
@@ -1,14 +1,21 @@
+import sys
+import gc
 import tasko
 from pycubed import cubesat
 
-from lib.state_machine_utils import validate_config
+from tasko.loop import POLICY_PRIORITY
+from lib.state_machine_utils import compile_config, validate_policy
+import lib.boot_profile as boot_profile
 
 
 class StateMachine:
     """Singleton State Machine Class"""
 
     def __init__(self):
-        pass
+        self.task_map = {}
+        self.tasks = {}
+        self.scheduled_tasks = {}
+        self.release_tasks = False
 
     def start(self, start_state: str):
         """Starts the state machine
@@ -17,29 +24,93 @@ class StateMachine:
         :param start_state: The state to start the state machine in
         :type start_state: str
         """
-        from StateMachineConfig import config, TaskMap, TransitionFunctionMap
+        import StateMachineConfig
+        from StateMachineConfig import TaskMap
+
+        try:
+            # written by build.sh, the config validated and compiled ahead of time
+            from compiled_config import compiled
+        except ImportError:
+            from StateMachineConfig import config, TransitionFunctionMap
+            compiled = compile_config(config, TaskMap, TransitionFunctionMap)
+
+        # optional, how the loop orders runnable tasks, see tasko.Loop.set_policy()
+        policy = getattr(StateMachineConfig, 'SchedulingPolicy', POLICY_PRIORITY)
+        aging = getattr(StateMachineConfig, 'PriorityAging', 0)
+        validate_policy(policy, aging)
+        tasko.get_loop().set_policy(policy, aging)
+        boot_profile.mark('config')
+
+        # optional, drop tasks given by name once no state reachable from the current one uses them
+        self.load(compiled, TaskMap, getattr(StateMachineConfig, 'ReleaseUnreachableTasks', False))
+
+        # let the board sleep when there is nothing to do, through the interrupt polls if it wakes on them
+        if hasattr(cubesat, 'idle'):
+            tasko.get_loop().set_idle(cubesat.idle, getattr(cubesat, 'idle_wakes_on_interrupts', False))
 
-        self.config = config
-        self.transition_function_map = TransitionFunctionMap
-        validate_config(config, TaskMap, TransitionFunctionMap)
+        self.state = start_state
+        self.state_id = self.state_ids[start_state]
+        self.switch_to(start_state, force=True)
+        boot_profile.mark('tasks')
 
-        self.states = list(config.keys())
-        self.states.sort()
+        # at the lowest priority, so writing it to the SD card doesn't hold up the first tasks
+        tasko.add_task(self._save_boot_report(), 255)
+        boot_profile.finish()
+        tasko.run()
 
-        # init task objects
-        self.tasks = {key: task() for key, task in TaskMap.items()}
+    async def _save_boot_report(self):
+        """Writes the boot report (see lib.boot_profile) to /sd/logs/boot/"""
+        if not cubesat.sdcard:
+            return
+        try:
+            boot_profile.save('/sd/logs/boot', f'{cubesat.c_boot:05}.json')
+        except Exception as e:
+            print(f'[ERROR][Saving boot report] {e}')
 
-        # set scheduled tasks to none
+    def load(self, compiled, task_map, release_tasks=False):
+        """
+        Use a compiled config (see lib.state_machine_utils.compile_config) and the tasks of TaskMap.
+        Tasks given as classes are constructed now, tasks given by name ('module.class')
+        are imported and constructed when a state first needs them.
+        """
+        self.compiled = compiled
+        self.states = compiled.states
+        self.state_ids = {name: i for i, name in enumerate(compiled.states)}
+        self.task_map = task_map
+        self.tasks = {key: task() for key, task in task_map.items() if not isinstance(task, str)}
+        self.release_tasks = release_tasks
         self.scheduled_tasks = {}
-
-        self.state = start_state
-        self.switch_to(start_state, force=True)
-        tasko.run()
+        # the spec each scheduled task was scheduled with
+        self.scheduled_specs = {}
+
+    def _task(self, task_name):
+        """The task object of task_name, imported and constructed the first time it is needed"""
+        task = self.tasks.get(task_name)
+        if task is None:
+            task_class = self.task_map[task_name]
+            if isinstance(task_class, str):
+                # 'module.attribute', e.g. 'Tasks.radio.task'
+                module_name, attribute = task_class.rsplit('.', 1)
+                __import__(module_name)
+                task_class = getattr(sys.modules[module_name], attribute)
+            task = self.tasks[task_name] = task_class()
+        return task
+
+    def _release_unreachable(self):
+        """Drop the tasks given by name that no state reachable from the current one uses, and their modules"""
+        needed = self.compiled.reachable_tasks(self.state_id)
+        released = [name for name in self.tasks if name not in needed and isinstance(self.task_map.get(name), str)]
+        for name in released:
+            del self.tasks[name]
+            sys.modules.pop(self.task_map[name].rsplit('.', 1)[0], None)
+        if released:
+            gc.collect()
 
     def stop_all(self):
-        """Stops all running tasko processes"""
+        """Stops all running tasko processes, interrupting any that are in the middle of running
+        (except for the task calling this, which finishes its current run)"""
         for _, task in self.scheduled_tasks.items():
-            task.stop()
+            task.cancel()
 
     def switch_to(self, state_name: str, force=False):
         """Switches the state of the cubesat to the new state
@@ -49,40 +120,65 @@ class StateMachine:
         :type state_name: str
         """
 
+        state_id = self.state_ids[state_name]
+        compiled = self.compiled
+
         # prevent (or allow forced) illegal transitions
-        if not (state_name in self.config[self.state]['StepsTo'] or force):
+        if not (compiled.steps_to[self.state_id] >> state_id & 1 or force):
             raise ValueError(
                 f'You cannot transition from {self.state} to {state_name}')
 
         self.previous_state = self.state
 
         # execute transition functions
-        if self.state != state_name:
-            for fn in self.config[self.state]['ExitFunctions']:
-                fn = self.transition_function_map[fn]
+        if self.state_id != state_id:
+            for fn in compiled.exit_functions[self.state_id]:
                 fn(self.state, state_name, cubesat)
-            for fn in self.config[state_name]['EnterFunctions']:
-                fn = self.transition_function_map[fn]
+            for fn in compiled.enter_functions[state_id]:
                 fn(self.state, state_name, cubesat)
 
-        # reschedule tasks
-        self.stop_all()
+        # reschedule tasks: tasks of both states keep running on their current schedule,
+        # with their new config applied in place (a shorter interval brings the next run forward),
+        # only the others are stopped or started. A task that is scheduled later in one state
+        # but not the other is restarted, as the new state schedules it.
+        previous_tasks = self.scheduled_tasks
+        previous_specs = self.scheduled_specs
         self.scheduled_tasks = {}
+        self.scheduled_specs = {}
         self.state = state_name
-        state_config = self.config[state_name]
-
-        for task_name, props in state_config['Tasks'].items():
-            if props['ScheduleLater']:
-                schedule = tasko.schedule_later
+        self.state_id = state_id
+        tasko.get_loop().set_idle_slack(compiled.idle_slack[state_id])
+
+        for spec in compiled.tasks[state_id]:
+            task_name, interval, priority, schedule_later, catch_up, slack = spec
+            scheduled = previous_tasks.get(task_name)
+            if scheduled is not None and schedule_later != previous_specs[task_name][3]:
+                scheduled.cancel()
+                scheduled = None
+            if scheduled is None:
+                if schedule_later:
+                    schedule = tasko.schedule_later
+                else:
+                    schedule = tasko.schedule
+                scheduled = schedule(1 / interval, self._task(task_name)._run, priority)
+                scheduled.name = task_name
             else:
-                schedule = tasko.schedule
-
-            frequency = 1 / props['Interval']
-            priority = props['Priority']
-            task_fn = self.tasks[task_name]._run
-
-            self.scheduled_tasks[task_name] = schedule(
-                frequency, task_fn, priority)
+                previous = previous_specs[task_name]
+                if interval != previous[1]:
+                    scheduled.change_rate(1 / interval)
+                if priority != previous[2]:
+                    scheduled.change_priority(priority)
+            scheduled.catch_up = catch_up
+            scheduled.set_slack(slack)
+            self.scheduled_tasks[task_name] = scheduled
+            self.scheduled_specs[task_name] = spec
+
+        for task_name, task in previous_tasks.items():
+            if task_name not in self.scheduled_tasks:
+                task.cancel()
+
+        if self.release_tasks:
+            self._release_unreachable()
 
 
 state_machine = StateMachine()
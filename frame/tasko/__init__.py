@@ -33,5 +33,6 @@ schedule = get_loop().schedule
 schedule_later = get_loop().schedule_later
 sleep = get_loop().sleep
 suspend = get_loop().suspend
+wait_for = get_loop().wait_for
 
 run = get_loop().run
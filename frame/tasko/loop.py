@@ -1,6 +1,9 @@
 import time
 
+from .trace import Trace, RUN, YIELD, SLEEP, SUSPEND, DONE, RESUME, IDLE, WAKE
+
 _monotonic_ns = time.monotonic_ns
+_sleep = time.sleep
 
 
 def set_time_provider(monotonic_ns):
@@ -8,18 +11,24 @@ def set_time_provider(monotonic_ns):
     _monotonic_ns = monotonic_ns
 
 
-def _yield_once():
-    """await the return value of this function to yield the processor"""
+def set_sleep_provider(sleep):
+    """Replace the blocking sleep(seconds) the loop uses when nothing is runnable"""
+    global _sleep
+    _sleep = sleep
+
+
+class _CallMeNextTime:
+    def __await__(self):
+        # This is inside the scheduler where we know generator yield is the
+        #   implementation of task switching in CircuitPython.  This throws
+        #   control back out through user code and up to the scheduler's
+        #   __iter__ stack which will see that we've suspended _current.
+        # Don't yield in async methods; only await unless you're making a library.
+        yield
 
-    class _CallMeNextTime:
-        def __await__(self):
-            # This is inside the scheduler where we know generator yield is the
-            #   implementation of task switching in CircuitPython.  This throws
-            #   control back out through user code and up to the scheduler's
-            #   __iter__ stack which will see that we've suspended _current.
-            # Don't yield in async methods; only await unless you're making a library.
-            yield
 
+def _yield_once():
+    """await the return value of this function to yield the processor"""
     return _CallMeNextTime()
 
 
@@ -27,6 +36,63 @@ def _get_future_nanos(seconds_in_future):
     return _monotonic_ns() + int(seconds_in_future * 1000000000)
 
 
+# Min-heap helpers, based on CPython's heapq (which is not available on every CircuitPython build)
+# https://github.com/python/cpython/blob/3.10/Lib/heapq.py
+# Heap entries are tuples whose last element is never compared, so every entry
+# carries a unique sequence number just before it.
+
+def _heappush(heap, item):
+    """Push item onto heap, maintaining the heap invariant."""
+    heap.append(item)
+    _siftdown(heap, 0, len(heap) - 1)
+
+
+def _heappop(heap):
+    """Pop the smallest item off the heap, maintaining the heap invariant."""
+    lastelt = heap.pop()    # raises appropriate IndexError if heap is empty
+    if heap:
+        returnitem = heap[0]
+        heap[0] = lastelt
+        _siftup(heap, 0)
+        return returnitem
+    return lastelt
+
+
+def _siftdown(heap, startpos, pos):
+    newitem = heap[pos]
+    # Follow the path to the root, moving parents down until finding a place newitem fits.
+    while pos > startpos:
+        parentpos = (pos - 1) >> 1
+        parent = heap[parentpos]
+        if newitem < parent:
+            heap[pos] = parent
+            pos = parentpos
+            continue
+        break
+    heap[pos] = newitem
+
+
+def _siftup(heap, pos):
+    endpos = len(heap)
+    startpos = pos
+    newitem = heap[pos]
+    # Bubble up the smaller child until hitting a leaf.
+    childpos = 2 * pos + 1    # leftmost child position
+    while childpos < endpos:
+        # Set childpos to index of smaller child.
+        rightpos = childpos + 1
+        if rightpos < endpos and not heap[childpos] < heap[rightpos]:
+            childpos = rightpos
+        # Move the smaller child up.
+        heap[pos] = heap[childpos]
+        pos = childpos
+        childpos = 2 * pos + 1
+    # The leaf at pos is empty now.  Put newitem there, and bubble it up
+    # to its final resting place (by sifting its parents down).
+    heap[pos] = newitem
+    _siftdown(heap, startpos, pos)
+
+
 class Sleeper:
     def __init__(self, resume_nanos, task):
         self.task = task
@@ -40,7 +106,7 @@ class Sleeper:
 
     def __repr__(self):
         return "{{Sleeper remaining: {:.2f}, task: {} }}".format(
-            (self.resume_nanos() - _monotonic_ns()) , self.task
+            (self.resume_nanos() - _monotonic_ns()), self.task
         )
 
     __str__ = __repr__
@@ -51,6 +117,21 @@ class Task:
         # Added a priority level
         self.coroutine = coroutine
         self.priority = priority
+        # Identifies the task in traces
+        self.name = getattr(coroutine, '__name__', 'task')
+        # Time spent executing this task, only counted while the loop is profiling
+        self.cpu_nanos = 0
+        # How late this task may be woken so that it shares a wakeup with other sleepers
+        self.slack_nanos = 0
+        # The Sleeper this task is waiting on, older sleepers for it are stale
+        self.sleeper = None
+        # Identifies the current Loop.suspend() while suspended, None otherwise
+        self.suspension = None
+        # When the current iteration of a scheduled task should be done, used by POLICY_EDF
+        self.deadline_nanos = None
+        # TaskCanceledException will be thrown into the coroutine when it next runs
+        self.canceled = False
+        self.done = False
 
     def priority_sort(self):
         return self.priority
@@ -61,27 +142,101 @@ class Task:
     __str__ = __repr__
 
 
+# What a ScheduledTask does when it falls behind its schedule
+CATCH_UP_RESET = 'reset'      # run again right away, then continue the schedule from that run
+CATCH_UP_SKIP = 'skip'        # drop the missed windows, wait for the next window on the original schedule
+CATCH_UP_BURST = 'burst'      # run back to back until caught up (at most BURST_LIMIT missed windows)
+CATCH_UP_BACKOFF = 'backoff'  # double the interval (up to MAX_BACKOFF times), halve it again once on time
+CATCH_UP_POLICIES = (CATCH_UP_RESET, CATCH_UP_SKIP, CATCH_UP_BURST, CATCH_UP_BACKOFF)
+
+# The order runnable tasks run in, see Loop.set_policy()
+POLICY_PRIORITY = 'priority'  # lowest priority first
+POLICY_EDF = 'edf'            # earliest deadline first
+POLICIES = (POLICY_PRIORITY, POLICY_EDF)
+
+
 class ScheduledTask:
+    """
+    Deadline accounting, all times in nanoseconds:
+
+    missed_windows: whole intervals that went by without the task starting
+    max_skew_nanos: the latest an iteration started after its target time
+    lag_nanos: the sum of how late each iteration started
+    """
+
+    BURST_LIMIT = 8
+    MAX_BACKOFF = 16
+
     def change_rate(self, hz):
-        ### Update the task rate to a new frequency ###
+        """
+        Update the task rate to a new frequency. A task waiting for its next run at the old rate
+        runs one interval at the new rate after its last start instead (or now, if that went by)
+        when that is sooner.
+        """
         self._nanoseconds_per_invocation = (1 / hz) * 1000000000
+        self.backoff = 1
+        task = self._task
+        if self._running or task is None or task.sleeper is None or self._start_nanos is None:
+            return
+        # not in the past, that would count as missed windows
+        target_run_nanos = max(self._start_nanos + self._nanoseconds_per_invocation, _monotonic_ns())
+        if target_run_nanos < task.sleeper.resume_nanos():
+            self._target_run_nanos = target_run_nanos
+            task.deadline_nanos = target_run_nanos + self._nanoseconds_per_invocation
+            self._loop._move_sleeper(task, target_run_nanos)
+
+    def change_priority(self, priority):
+        """Update the task priority, it applies from the next time the task is queued"""
+        self._priority = priority
+        if self._task is not None:
+            self._task.priority = priority
+
+    def set_slack(self, seconds):
+        """Allow the task to run up to seconds late, so its wakeups can be shared with other tasks"""
+        self._slack_nanos = int(seconds * 1000000000)
+        if self._task is not None:
+            self._task.slack_nanos = self._slack_nanos
 
     def stop(self):
-        ### Stop the task (does not interrupt a currently running task) ###
+        """Stop the task (does not interrupt a currently running task)"""
+        self._stop = True
+
+    def cancel(self):
+        """
+        Stop the task, interrupting it with TaskCanceledException if it is in the middle of an iteration.
+        A task cannot interrupt itself, so a task canceling its own ScheduledTask is only stopped.
+        """
         self._stop = True
+        if self._scheduled_to_run and self._task is not self._loop._current:
+            self._loop.cancel(self._task)
+
+    @property
+    def name(self):
+        """Statistics and traces are recorded under this name"""
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        self._name = name
+        if self._task is not None:
+            self._task.name = name
 
     def start(self):
-        ### Schedule the task (if it's not already scheduled) ###
+        """Schedule the task (if it's not already scheduled)"""
         self._stop = False
         if not self._scheduled_to_run:
             # Don't double-up the task if it's still in the run list!
             # print("Added task to loop._task")
-            self._loop.add_task(self._run_at_fixed_rate(), self._priority)
+            self._task = self._loop.add_task(self._run_at_fixed_rate(), self._priority)
+            self._task.slack_nanos = self._slack_nanos
+            self._task.name = self._name
 
     def __init__(
         self, loop, hz, forward_async_fn, priority, forward_args, forward_kwargs
     ):
         self._loop = loop
+        self._task = None
+        self.name = getattr(forward_async_fn, '__name__', 'task')
         self._forward_async_fn = forward_async_fn
         self._forward_args = forward_args
         self._forward_kwargs = forward_kwargs
@@ -90,11 +245,46 @@ class ScheduledTask:
         self._running = False
         self._scheduled_to_run = False
         self._priority = priority
+        self._slack_nanos = 0
+        # when the last iteration started, and when the next one should
+        self._start_nanos = None
+        self._target_run_nanos = None
+        self.catch_up = CATCH_UP_RESET
+        # current interval multiplier of the backoff policy
+        self.backoff = 1
+        self.missed_windows = 0
+        self.max_skew_nanos = 0
+        self.lag_nanos = 0
+
+    def _catch_up(self, target_run_nanos, now_nanos):
+        """
+        Accounts for the windows missed by a task that is behind schedule
+        and returns when it should run next according to its catch up policy.
+        """
+        interval = self._nanoseconds_per_invocation * self.backoff
+        # windows that ended before the task could start
+        behind = int((now_nanos - target_run_nanos) // interval)
+
+        if self.catch_up == CATCH_UP_SKIP:
+            self.missed_windows += behind + 1
+            return target_run_nanos + (behind + 1) * interval
+        if self.catch_up == CATCH_UP_BURST:
+            if behind > self.BURST_LIMIT:
+                self.missed_windows += behind - self.BURST_LIMIT
+                return target_run_nanos + (behind - self.BURST_LIMIT) * interval
+            return target_run_nanos
+        if self.catch_up == CATCH_UP_BACKOFF:
+            self.backoff = min(self.backoff * 2, self.MAX_BACKOFF)
+        self.missed_windows += behind
+        return now_nanos
 
     async def _run_at_fixed_rate(self):
         self._scheduled_to_run = True
         try:
-            target_run_nanos = _monotonic_ns()
+            # when the task should have started, skew is measured against it even if the
+            # catch up policy moved the next run
+            deadline_nanos = target_run_nanos = _monotonic_ns()
+            self._task.deadline_nanos = deadline_nanos + self._nanoseconds_per_invocation
             while True:
                 if self._stop:
                     return  # Check before running
@@ -102,7 +292,17 @@ class ScheduledTask:
                 iteration = self._forward_async_fn(
                     *self._forward_args, **self._forward_kwargs
                 )
-                self._loop._debug("  iteration ", iteration)
+
+                start_nanos = self._start_nanos = _monotonic_ns()
+                skew_nanos = start_nanos - deadline_nanos
+                if skew_nanos > 0:
+                    self.lag_nanos += skew_nanos
+                    if skew_nanos > self.max_skew_nanos:
+                        self.max_skew_nanos = skew_nanos
+
+                stats = self._loop.stats
+                if stats is not None:
+                    start_cpu_nanos = self._loop._cpu_nanos(self._task, start_nanos)
 
                 self._running = True
                 try:
@@ -110,36 +310,155 @@ class ScheduledTask:
                 finally:
                     self._running = False
 
+                if stats is not None:
+                    end_nanos = _monotonic_ns()
+                    stats.task(self.name).record(
+                        self._loop._cpu_nanos(self._task, end_nanos) - start_cpu_nanos,
+                        skew_nanos,
+                        end_nanos - start_nanos > self._nanoseconds_per_invocation)
+
                 if self._stop:
                     return  # Check before waiting
 
                 # Try to reschedule for the next window without skew. If we're falling behind,
-                # just go as fast as possible & schedule to run "now." If we catch back up again
-                # we'll return to seconds_per_invocation without doing a bunch of catchup runs.
-                target_run_nanos = target_run_nanos + self._nanoseconds_per_invocation
+                # the catch up policy decides when to run next.
+                target_run_nanos = target_run_nanos + self._nanoseconds_per_invocation * self.backoff
+                deadline_nanos = target_run_nanos
+                self._task.deadline_nanos = deadline_nanos + self._nanoseconds_per_invocation * self.backoff
                 # print('target_run_nanos is ', target_run_nanos)
                 now_nanos = _monotonic_ns()
                 if now_nanos <= target_run_nanos:
+                    if self.backoff > 1:
+                        self.backoff //= 2
                     # print("Going to put to sleep")
+                    self._target_run_nanos = target_run_nanos
                     await self._loop._sleep_until_nanos(target_run_nanos)
+                    # change_rate() may have moved the wakeup
+                    target_run_nanos = deadline_nanos = self._target_run_nanos
                 else:
-                    target_run_nanos = now_nanos
-                    # Allow other tasks a chance to run if this task is too slow.
-                    await _yield_once()
+                    target_run_nanos = self._catch_up(target_run_nanos, now_nanos)
+                    if now_nanos < target_run_nanos:
+                        deadline_nanos = target_run_nanos
+                        self._task.deadline_nanos = deadline_nanos + self._nanoseconds_per_invocation * self.backoff
+                        self._target_run_nanos = target_run_nanos
+                        await self._loop._sleep_until_nanos(target_run_nanos)
+                        target_run_nanos = deadline_nanos = self._target_run_nanos
+                    else:
+                        # Allow other tasks a chance to run if this task is too slow.
+                        await _yield_once()
         finally:
             self._scheduled_to_run = False
 
     def __repr__(self):
         hz = 1 / (self._nanoseconds_per_invocation / 1000000000)
         state = "running" if self._running else "waiting"
-        return "{{ScheduledTask {} rate: {}hz, fn: {}}}".format(
-            state, hz, self._forward_async_fn
+        return "{{ScheduledTask {} rate: {}hz, fn: {}, missed: {}, max skew: {}us}}".format(
+            state, hz, self._forward_async_fn, self.missed_windows, self.max_skew_nanos // 1000
         )
 
     __str__ = __repr__
 
 
-class TaskCanceledException(Exception):
+class TaskStats:
+    """
+    Execution statistics of one scheduled task, all times in nanoseconds.
+
+    runs: completed iterations
+    total/min/max_nanos: time spent executing an iteration (excluding time spent sleeping or suspended)
+    total/max_late_nanos: how long after its target time an iteration started
+    overruns: iterations that took longer than the task's interval
+    """
+
+    # number of recent durations kept for percentile()
+    SAMPLES = 32
+
+    def __init__(self, name):
+        self.name = name
+        self.runs = 0
+        self.total_nanos = 0
+        self.min_nanos = 0
+        self.max_nanos = 0
+        self.total_late_nanos = 0
+        self.max_late_nanos = 0
+        self.overruns = 0
+        self._recent = []
+
+    def record(self, nanos, late_nanos, overrun):
+        if self.runs == 0 or nanos < self.min_nanos:
+            self.min_nanos = nanos
+        if nanos > self.max_nanos:
+            self.max_nanos = nanos
+        if late_nanos > 0:
+            self.total_late_nanos += late_nanos
+            if late_nanos > self.max_late_nanos:
+                self.max_late_nanos = late_nanos
+        if overrun:
+            self.overruns += 1
+        if len(self._recent) < self.SAMPLES:
+            self._recent.append(nanos)
+        else:
+            self._recent[self.runs % self.SAMPLES] = nanos
+        self.runs += 1
+        self.total_nanos += nanos
+
+    def mean_nanos(self):
+        return self.total_nanos // self.runs if self.runs else 0
+
+    def percentile_nanos(self, percent):
+        """Duration below which percent of the recent iterations finished"""
+        if not self._recent:
+            return 0
+        recent = sorted(self._recent)
+        return recent[min(len(recent) - 1, len(recent) * percent // 100)]
+
+    def __repr__(self):
+        return "{{TaskStats {}: runs {}, mean {}us, p90 {}us, max {}us, max late {}us, overruns {}}}".format(
+            self.name, self.runs, self.mean_nanos() // 1000, self.percentile_nanos(90) // 1000,
+            self.max_nanos // 1000, self.max_late_nanos // 1000, self.overruns)
+
+    __str__ = __repr__
+
+
+class LoopStats:
+    """
+    Where the loop's time went since profiling was enabled, in nanoseconds.
+    Per task statistics are in `tasks`, keyed by the ScheduledTask name.
+    """
+
+    def __init__(self, start_nanos):
+        self.start_nanos = start_nanos
+        self.task_nanos = 0
+        self.idle_nanos = 0
+        # wakeups avoided by waking sleepers together, see Loop.set_idle_slack and ScheduledTask.set_slack
+        self.coalesced_wakeups = 0
+        self.tasks = {}
+
+    def task(self, name):
+        stats = self.tasks.get(name)
+        if stats is None:
+            stats = self.tasks[name] = TaskStats(name)
+        return stats
+
+    def total_nanos(self):
+        return _monotonic_ns() - self.start_nanos
+
+    def overhead_nanos(self):
+        """Time spent in the scheduler itself: neither running tasks nor idle"""
+        return self.total_nanos() - self.task_nanos - self.idle_nanos
+
+    def coalesced_per_minute(self):
+        return self.coalesced_wakeups * 60000000000 / max(self.total_nanos(), 1)
+
+
+class TaskCanceledException(BaseException):
+    """
+    Thrown into a canceled task at the point it is waiting.
+    Not an Exception, so that `except Exception` error handlers in tasks do not swallow it.
+    """
+    pass
+
+
+class TaskTimeoutException(Exception):
     pass
 
 
@@ -149,17 +468,40 @@ class Loop:
     """
 
     def __init__(self, debug=False):
+        # Runnable tasks: a min-heap of (priority, seq, Task)
         self._tasks = []
+        # Sleeping tasks: a min-heap of (resume_nanos, priority, seq, Sleeper)
         self._sleeping = []
+        # Sleepers whose time has come, reused every step: a min-heap of (priority, seq, Task)
         self._ready = []
+        # Tie breaker so equal priorities run in the order they were queued
+        self._seq = 0
         self._current = None
-        self.debug=debug
-        if debug:
-            self._debug = print
-        else:
-            self._debug = lambda *arg, **kwargs: None
+        # LoopStats while profiling, see enable_profiling()
+        self.stats = None
+        # trace.Trace while tracing, see enable_tracing()
+        self.trace = None
+        # function(seconds) called when nothing is runnable, and whether it returns on hardware signals, see set_idle()
+        self._idle_fn = None
+        self._idle_wakes_on_interrupts = False
+        # how long a wakeup may be delayed so that later sleepers are woken with it
+        self._slack_nanos = 0
+        # see set_policy(), _key is None for plain priority order
+        self.policy = POLICY_PRIORITY
+        self._aging_nanos = 0
+        self._key = None
+        self._created_nanos = _monotonic_ns()
+        self.idle_nanos = 0
+        self.wakeups = 0
+        # functions checking for hardware signals, see add_interrupt()
+        self._interrupts = []
+        self.interrupt_poll_nanos = 10000000
+        # debug logging is bound once here, see _instrument()
+        self.debug = debug
+        self._loopnum = 0
+        self._instrument()
 
-    def dbg(self):   
+    def dbg(self):
         print(f"There are {len(self._tasks)} tasks")
         print(f"There are {len(self._sleeping)} sleeping tasks")
         print(f"There are {len(self._ready)} ready tasks")
@@ -172,9 +514,183 @@ class Loop:
           scheduler.add_task( my_async_method() )
         :param awaitable_task:  The coroutine to be concurrently driven to completion.
         """
-        self._debug("adding task ", awaitable_task)
+        if self.debug:
+            print("adding task ", awaitable_task)
         # Added a priority parameter
-        self._tasks.append(Task(awaitable_task, priority))
+        task = Task(awaitable_task, priority)
+        self._enqueue(task)
+        return task
+
+    def enable_profiling(self, enabled=True):
+        """
+        Start (or stop) recording where the loop spends its time, see `stats`.
+
+        The profiled code paths are only swapped in while profiling, so a loop that
+        is not profiling runs exactly the same code as one without a profiler.
+        """
+        if enabled:
+            self.stats = LoopStats(_monotonic_ns())
+            self._slice_start_nanos = self.stats.start_nanos
+        else:
+            self.stats = None
+        self._instrument()
+
+    def enable_tracing(self, enabled=True, capacity=2048):
+        """
+        Start recording an execution trace of the loop in a fresh ring buffer of capacity events,
+        or stop recording. See `trace` and tasko/trace.py.
+
+        Like profiling, the tracing code paths are only swapped in while tracing.
+        """
+        if enabled:
+            self.trace = Trace(capacity)
+        else:
+            self.trace = None
+        self._instrument()
+
+    def _instrument(self):
+        """
+        Binds the debug, profiling and tracing versions of the hot code paths on this loop when they are enabled.
+        The plain versions don't check whether they should log or measure anything.
+        """
+        for name in ('_step', '_run_task', '_idle'):
+            self.__dict__.pop(name, None)
+        if self.debug:
+            self._step = self._step_debug
+            self._run_task = self._run_task_debug
+            self._idle = self._idle_debug
+        if self.stats is not None:
+            # wraps the debug versions when debugging too
+            self._run_task_unprofiled = self._run_task
+            self._idle_unprofiled = self._idle
+            self._run_task = self._run_task_profiled
+            self._idle = self._idle_profiled
+        if self.trace is not None:
+            # outermost, so the trace also covers the other instrumentation
+            self._run_task_untraced = self._run_task
+            self._idle_untraced = self._idle
+            self._run_task = self._run_task_traced
+            self._idle = self._idle_traced
+        if self._interrupts:
+            self._step_uninterrupted = self._step
+            self._idle_uninterrupted = self._idle
+            self._step = self._step_interrupts
+            self._idle = self._idle_interrupts
+
+    def add_interrupt(self, check, poll_seconds=None):
+        """
+        Call check() at the start of every step, and every poll_seconds while idle, so it can wake
+        the tasks waiting for a hardware signal (e.g. set a tasko.sync.Event when a pin's edge counter
+        went up). An idle loop returns as soon as a check made a task runnable.
+        An idle function that wakes on the signals itself is not cut into poll_seconds, see set_idle().
+
+        CircuitPython doesn't call Python code from interrupts, this is how their edges reach tasks.
+        Only loops with checks pay for them.
+        """
+        if poll_seconds is not None:
+            self.interrupt_poll_nanos = int(poll_seconds * 1000000000)
+        self._interrupts.append(check)
+        self._instrument()
+
+    def remove_interrupt(self, check):
+        """Stop calling a check added with add_interrupt()"""
+        self._interrupts.remove(check)
+        self._instrument()
+
+    def _check_interrupts(self):
+        for check in self._interrupts:
+            check()
+
+    def _step_interrupts(self):
+        self._check_interrupts()
+        self._step_uninterrupted()
+
+    def _idle_interrupts(self, sleep_nanos):
+        # Idle in slices, the sleep ends early once a signal made a task runnable.
+        # Checked first too, for the signals that came while the tasks ran.
+        # An idle function that returns on the signals gets the whole time, so it can sleep deeply.
+        end_nanos = _monotonic_ns() + sleep_nanos
+        while True:
+            self._check_interrupts()
+            if self._tasks:
+                return
+            if self._idle_wakes_on_interrupts:
+                self._idle_uninterrupted(sleep_nanos)
+            else:
+                self._idle_uninterrupted(min(sleep_nanos, self.interrupt_poll_nanos))
+            sleep_nanos = end_nanos - _monotonic_ns()
+            if sleep_nanos <= 0:
+                self._check_interrupts()
+                return
+
+    def set_policy(self, policy, aging_seconds=0):
+        """
+        Choose the order runnable tasks are run in.
+        Every task that is runnable at the start of a step still runs during that step,
+        the policy decides which of them run first.
+
+        POLICY_PRIORITY: lowest priority first. With aging_seconds, a task gains one priority level for every
+                         aging_seconds it has been runnable, so higher priority tasks can't keep holding it back.
+        POLICY_EDF: earliest deadline first. A scheduled task is due at the end of its current interval,
+                    other tasks are due as soon as they are runnable. aging_seconds is not used.
+
+        Tasks that are already runnable keep their place.
+        """
+        assert policy in POLICIES, "unknown scheduling policy {}".format(policy)
+        self.policy = policy
+        self._aging_nanos = int(aging_seconds * 1000000000)
+        if policy == POLICY_EDF:
+            self._key = self._deadline_key
+        elif self._aging_nanos > 0:
+            self._key = self._aged_priority_key
+        else:
+            self._key = None
+        # like _instrument(), plain priority order runs the plain version
+        self.__dict__.pop('_enqueue', None)
+        if self._key is not None:
+            self._enqueue = self._enqueue_keyed
+
+    def _deadline_key(self, task, ready_nanos):
+        deadline_nanos = task.deadline_nanos
+        return ready_nanos if deadline_nanos is None else deadline_nanos
+
+    def _aged_priority_key(self, task, ready_nanos):
+        # Comparing priority - waited / aging between tasks is the same as comparing
+        # priority + ready / aging, which doesn't change while the task waits.
+        return task.priority + (ready_nanos - self._created_nanos) / self._aging_nanos
+
+    def set_idle(self, idle, wakes_on_interrupts=False):
+        """
+        Replace what the loop does when nothing is runnable.
+
+        :param idle: function(seconds) that waits for up to seconds, e.g. by putting the processor to sleep.
+                     It may return early, the loop will simply idle again. None restores the default sleep.
+        :param wakes_on_interrupts: Whether idle returns once the hardware signals checked by add_interrupt()
+                                    fire, so the loop doesn't cut its idles into interrupt poll slices.
+        """
+        self._idle_fn = idle
+        self._idle_wakes_on_interrupts = wakes_on_interrupts and idle is not None
+
+    def set_idle_slack(self, seconds):
+        """
+        Allow a sleeping task to be woken up to seconds late, so that tasks due shortly after it
+        are woken at the same time. Fewer, longer idles let the processor sleep more deeply.
+        """
+        self._slack_nanos = int(seconds * 1000000000)
+
+    def idle_fraction(self):
+        """Fraction of the time since the loop was created that it spent idle"""
+        elapsed_nanos = _monotonic_ns() - self._created_nanos
+        return self.idle_nanos / elapsed_nanos if elapsed_nanos > 0 else 0
+
+    def _enqueue(self, task):
+        """Queue a task to run on the next step"""
+        self._seq += 1
+        _heappush(self._tasks, (task.priority, self._seq, task))
+
+    def _enqueue_keyed(self, task):
+        self._seq += 1
+        _heappush(self._tasks, (self._key(task, _monotonic_ns()), self._seq, task))
 
     async def sleep(self, seconds):
         """
@@ -218,13 +734,65 @@ class Loop:
             self._current is not None
         ), "You can only suspend the current task if you are running the event loop."
         suspended = self._current
+        if suspended.canceled:
+            # Canceled itself, stay runnable so the cancellation is delivered right away
+            return _yield_once(), lambda: None
+        suspension = suspended.suspension = object()
 
         def resume():
-            self._tasks.append(suspended)
+            # Only the first call does anything, and nothing at all if the task was canceled meanwhile
+            if suspended.suspension is suspension:
+                suspended.suspension = None
+                if self.trace is not None:
+                    self.trace.record(RESUME, suspended.name, _monotonic_ns())
+                self._enqueue(suspended)
 
         self._current = None
         return _yield_once(), resume
 
+    def cancel(self, task: Task):
+        """
+        Cancel a task: TaskCanceledException is thrown into its coroutine where it is waiting
+        (sleeping, suspended or yielding), the next time the loop steps. Does nothing if the task finished.
+        A task canceling itself gets the exception at its next await.
+        """
+        if task.done or task.canceled:
+            return
+        task.canceled = True
+        if task.sleeper is not None:
+            # leave the sleeper in the heap, it is skipped once it is due
+            task.sleeper = None
+            self._enqueue(task)
+        elif task.suspension is not None:
+            task.suspension = None
+            self._enqueue(task)
+
+    async def wait_for(self, awaitable, timeout_seconds):
+        """
+        From within a coroutine, await awaitable but give up after timeout_seconds.
+
+        :raises TaskTimeoutException: if awaitable took too long, it is interrupted with TaskCanceledException
+        """
+        task = self._current
+        assert task is not None, "You can only wait from within a task"
+        timed_out = False
+
+        async def watchdog():
+            nonlocal timed_out
+            await self._sleep_until_nanos(_get_future_nanos(timeout_seconds))
+            timed_out = True
+            self.cancel(task)
+
+        watchdog_task = self.add_task(watchdog(), task.priority)
+        try:
+            return await awaitable
+        except TaskCanceledException:
+            if timed_out:
+                raise TaskTimeoutException()
+            raise
+        finally:
+            self.cancel(watchdog_task)
+
     def schedule(self, hz: float, coroutine_function, priority, *args, **kwargs):
         """
         Describe how often a method should be called.
@@ -289,75 +857,118 @@ class Loop:
         assert (
             self._current is None
         ), "Loop can only be advanced by 1 stack frame at a time."
-        self._loopnum = 0
         while self._tasks or self._sleeping:
-            self._debug(
-                "[{}] ---- sleeping: {}, active: {}".format(
-                    self._loopnum, len(self._sleeping), len(self._tasks)
-                )
-            )
             self._step()
-            self._debug("\n")
-            self._loopnum += 1
-        # while self._tasks or self._sleeping:
-        # self._step()
-        self._debug("Loop completed", self._tasks, self._sleeping)
-
-    def _step(self):
-        self._debug("  stepping over ", len(self._tasks), " tasks")
-
-        # Sort tasks by priority
-        self._tasks.sort(key=Task.priority_sort)
-
-        for _ in range(len(self._tasks)):
-            task = self._tasks.pop(0)
-            self._run_task(task)
-
-        if self.debug:
-            self._debug("  sleeping list (unsorted):")
-            for i in self._sleeping:
-                self._debug("    {}".format(i))
-
-        #Create the ready list based on whichever tasks are ready to be executed
-        self._ready = [x for x in self._sleeping if x.resume_nanos() <= _monotonic_ns()]
-        #Sort the ready tasks based on priority
-        self._ready.sort(key=lambda x: x.task.priority)
-
         if self.debug:
-            self._debug("  ready list (sorted)")
-            for i in self._ready:
-                self._debug("    {}".format(i))
+            print("Loop completed", self._tasks, self._sleeping)
 
+    def _step_debug(self):
+        print("[{}] ---- sleeping: {}, active: {}".format(self._loopnum, len(self._sleeping), len(self._tasks)))
+        print("  sleeping heap:")
+        for i in self._sleeping:
+            print("    {}".format(i[3]))
+        Loop._step(self)
+        print("\n")
+        self._loopnum += 1
 
-        #Run the ready tasks, and simultaneously remove them from the _sleeping and _ready lists
-        for i in range(len(self._ready)):
-            ready_task = self._ready.pop(0)
-            self._sleeping.remove(ready_task)
-            self._run_task(ready_task.task)
+    def _step(self):
+        # Run every task that was runnable when the step started, in priority order.
+        # Tasks that yield are queued on a fresh heap, so they run again next step.
+        tasks = self._tasks
+        self._tasks = []
+        while tasks:
+            self._run_task(_heappop(tasks)[2])
+
+        # Only the sleepers at the top of the heap can be due, so this costs
+        # O(log n) per woken task instead of a scan over every sleeper.
+        now = _monotonic_ns()
+        sleeping = self._sleeping
+        ready = self._ready
+        key = self._key
+        while sleeping and sleeping[0][0] <= now:
+            resume_nanos, priority, seq, sleeper = _heappop(sleeping)
+            task = sleeper.task
+            if task.sleeper is sleeper:
+                task.sleeper = None
+                _heappush(ready, (priority if key is None else key(task, resume_nanos), seq, task))
+
+        # Run the ready tasks in priority order
+        while ready:
+            self._run_task(_heappop(ready)[2])
+
+        # Don't wake up for canceled sleepers
+        while sleeping and sleeping[0][3].task.sleeper is not sleeping[0][3]:
+            _heappop(sleeping)
 
         if len(self._tasks) == 0 and len(self._sleeping) > 0:
+            sleep_nanos = self._coalesce() - _monotonic_ns()
 
-            #Sort the sleeper list only when we need to, i.e, only
-            #when there are no active tasks, and the system needs to
-            #ACTUALLY sleep.
+            if sleep_nanos > 0:
+                self._idle(sleep_nanos)
 
-            self._sleeping.sort(key=Sleeper.resume_nanos)
-            next_sleeper = self._sleeping[0]
-            sleep_nanos = next_sleeper.resume_nanos() - _monotonic_ns()
+    def _coalesce(self):
+        """
+        When to wake up next. Rather than waking for the first sleeper, wake for the
+        latest sleeper due before the slack of every sleeper woken with it runs out,
+        so they share a single wakeup.
+        """
+        first = self._sleeping[0]
+        wake_nanos = first[0]
+        limit_nanos = wake_nanos + max(first[3].task.slack_nanos, self._slack_nanos)
+        if limit_nanos == wake_nanos:
+            return wake_nanos
+
+        # Walk the heap in order, only as far as the limit: the children of an entry are
+        # never due before it, so the frontier holds just the entries that could be next.
+        sleeping = self._sleeping
+        coalesced = 0
+        frontier = [(wake_nanos, first[2], 0)]
+        while frontier:
+            resume_nanos, _, i = _heappop(frontier)
+            if resume_nanos > limit_nanos:
+                break
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(sleeping) and sleeping[child][0] <= limit_nanos:
+                    _heappush(frontier, (sleeping[child][0], sleeping[child][2], child))
+            sleeper = sleeping[i][3]
+            if sleeper.task.sleeper is not sleeper:
+                # canceled, it won't wake anything
+                continue
+            if resume_nanos > wake_nanos:
+                coalesced += 1
+                wake_nanos = resume_nanos
+            limit_nanos = min(limit_nanos, resume_nanos + max(sleeper.task.slack_nanos, self._slack_nanos))
+
+        if self.stats is not None:
+            self.stats.coalesced_wakeups += coalesced
+        return wake_nanos
+
+    def _idle(self, sleep_nanos):
+        # Give control to the system, there's nothing to be done right now,
+        # and nothing else is scheduled to run for this long.
+        # This is the real sleep. If/when interrupts are implemented this will likely need to change.
+        sleep_seconds = sleep_nanos / 1000000000.0
+        start_nanos = _monotonic_ns()
+        if self._idle_fn is None:
+            _sleep(sleep_seconds)
+        else:
+            self._idle_fn(sleep_seconds)
+        self.idle_nanos += _monotonic_ns() - start_nanos
+        self.wakeups += 1
 
-            if sleep_nanos > 0:
-                # Give control to the system, there's nothing to be done right now,
-                # and nothing else is scheduled to run for this long.
-                # This is the real sleep. If/when interrupts are implemented this will likely need to change.
-                sleep_seconds = sleep_nanos / 1000000000.0
-                self._debug(
-                    "  No active tasks.  Sleeping for ",
-                    sleep_seconds,
-                    "s. \n",
-                    self._sleeping,
-                )
+    def _idle_debug(self, sleep_nanos):
+        print("  No active tasks.  Sleeping for ", sleep_nanos / 1000000000.0, "s. \n", self._sleeping)
+        Loop._idle(self, sleep_nanos)
+
+    def _idle_profiled(self, sleep_nanos):
+        idle_nanos = self.idle_nanos
+        self._idle_unprofiled(sleep_nanos)
+        self.stats.idle_nanos += self.idle_nanos - idle_nanos
 
-                time.sleep(sleep_seconds)
+    def _idle_traced(self, sleep_nanos):
+        self.trace.record(IDLE, 'loop', _monotonic_ns())
+        self._idle_untraced(sleep_nanos)
+        self.trace.record(WAKE, 'loop', _monotonic_ns())
 
     def _run_task(self, task: Task):
         """
@@ -366,30 +977,79 @@ class Loop:
 
         self._current = task
         try:
-
-            task.coroutine.send(None)
-            self._debug("  current", self._current)
+            if task.canceled:
+                task.canceled = False
+                task.coroutine.throw(TaskCanceledException())
+            else:
+                task.coroutine.send(None)
             # Sleep gate here, in case the current task suspended.
             # If a sleeping task re-suspends it will have already put itself in the sleeping queue.
             if self._current is not None:
-                self._tasks.append(task)
+                self._enqueue(task)
         except StopIteration:
             # This task is all done.
-            self._debug("  task complete")
-            pass
+            task.done = True
+        except TaskCanceledException:
+            task.done = True
         finally:
             self._current = None
 
+    def _run_task_debug(self, task: Task):
+        print("  running", task)
+        Loop._run_task(self, task)
+        if task.done:
+            print("  task complete")
+        elif task.sleeper is not None:
+            print("  sleeping", task.sleeper)
+        elif task.suspension is not None:
+            print("  suspended")
+
+    def _run_task_profiled(self, task: Task):
+        self._slice_start_nanos = start_nanos = _monotonic_ns()
+        self._run_task_unprofiled(task)
+        nanos = _monotonic_ns() - start_nanos
+        task.cpu_nanos += nanos
+        self.stats.task_nanos += nanos
+
+    def _cpu_nanos(self, task, now_nanos):
+        """Time spent executing task so far, including the slice it is currently running"""
+        return task.cpu_nanos + now_nanos - self._slice_start_nanos
+
+    def _run_task_traced(self, task: Task):
+        trace = self.trace
+        trace.record(RUN, task.name, _monotonic_ns())
+        self._run_task_untraced(task)
+        if task.done:
+            event = DONE
+        elif task.sleeper is not None:
+            event = SLEEP
+        elif task.suspension is not None:
+            event = SUSPEND
+        else:
+            event = YIELD
+        trace.record(event, task.name, _monotonic_ns())
+
+    def _move_sleeper(self, task, resume_nanos):
+        """Wake a sleeping task at resume_nanos instead, its previous sleeper goes stale"""
+        self._seq += 1
+        task.sleeper = Sleeper(resume_nanos, task)
+        _heappush(self._sleeping, (resume_nanos, task.priority, self._seq, task.sleeper))
+
     async def _sleep_until_nanos(self, target_run_nanos):
         """
         From within a coroutine, sleeps until the target time.monotonic_ns
         Returns the thing to await
         """
         assert self._current is not None, "You can only sleep from within a task"
-        self._sleeping.append(Sleeper(target_run_nanos, self._current))
-        self._debug("  sleeping ", self._current)
+        task = self._current
+        if task.canceled:
+            # Canceled itself, stay runnable so the cancellation is delivered right away
+            await _yield_once()
+            return
+        self._seq += 1
+        task.sleeper = Sleeper(target_run_nanos, task)
+        _heappush(self._sleeping, (target_run_nanos, task.priority, self._seq, task.sleeper))
         self._current = None
         # Pretty subtle here.  This yields once, then it continues next time the task scheduler executes it.
         # The async function is parked at this point.
         await _yield_once()
-
@@ -1,4 +1,5 @@
 import tasko
+from .loop import TaskCanceledException
 
 
 class ManagedResource:
@@ -37,7 +38,15 @@ class ManagedResource:
             self._ownership_queue.append(resume_fn)
             # This leverages the suspend() feature in tasko; this current coroutine is not considered again until
             # the owning job is complete and __aexit__s below.  This keeps waiting handles as cheap as possible.
-            await await_handle
+            try:
+                await await_handle
+            except TaskCanceledException:
+                if resume_fn in self._ownership_queue:
+                    self._ownership_queue.remove(resume_fn)
+                else:
+                    # Ownership was already handed to this task, pass it on.
+                    self._hand_over()
+                raise
         self._owned = True
         self._on_acquire(*args, **kwargs)
         return self._resource
@@ -45,6 +54,9 @@ class ManagedResource:
     async def _aexit(self, args, kwargs):
         assert self._owned, 'Exited from a context where a managed resource was not owned'
         self._on_release(*args, **kwargs)
+        self._hand_over()
+
+    def _hand_over(self):
         if len(self._ownership_queue) > 0:
             resume_fn = self._ownership_queue.pop(0)
             # Note that the awaiter has already passed the ownership check.
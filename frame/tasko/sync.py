@@ -0,0 +1,225 @@
+"""
+Primitives for waking tasks when something happens, rather than polling for it.
+
+Waiting tasks are suspended (see Loop.suspend) so they cost nothing until they are
+resumed, and the loop can sleep until the next scheduled task while they wait.
+Waiters are woken in the order they started waiting.
+
+Use:
+    from tasko.sync import Event, Queue, Semaphore, Lock
+
+    packets = Queue(maxsize=4)
+
+    async def producer():
+        await packets.put(packet)
+
+    async def consumer():
+        packet = await packets.get()
+"""
+import tasko
+from . import loop as _loop
+from .loop import TaskCanceledException, TaskTimeoutException
+
+
+class QueueEmptyException(Exception):
+    pass
+
+
+class QueueFullException(Exception):
+    pass
+
+
+async def _wait(loop, waiters, hand_over=None):
+    """
+    Suspends the current task until the resumer appended to waiters is called.
+    If the task is canceled after it was resumed, hand_over() passes on whatever it was woken for.
+    """
+    await_handle, resume_fn = loop.suspend()
+    waiters.append(resume_fn)
+    try:
+        await await_handle
+    except TaskCanceledException:
+        if resume_fn in waiters:
+            waiters.remove(resume_fn)
+        elif hand_over is not None:
+            hand_over()
+        raise
+
+
+class Event:
+    """
+    A flag that tasks can wait on. Once set, waiting returns immediately until the event is cleared.
+    """
+    def __init__(self, loop=tasko.get_loop()):
+        self._loop = loop
+        self._set = False
+        self._waiters = []
+
+    def is_set(self):
+        return self._set
+
+    def set(self):
+        """Sets the flag and wakes every waiting task (can be called from outside a task)"""
+        self._set = True
+        waiters = self._waiters
+        self._waiters = []
+        for resume_fn in waiters:
+            resume_fn()
+
+    def clear(self):
+        self._set = False
+
+    async def wait(self):
+        if not self._set:
+            await _wait(self._loop, self._waiters)
+        return True
+
+
+class Interrupt(Event):
+    """
+    An Event set when a hardware signal fires, so tasks wait for a pin instead of polling a device.
+
+    counter counts the signals, e.g. a countio.Counter of a pin's rising edges. The loop checks it
+    at every step and while idle (see Loop.add_interrupt), setting the event when it went up.
+    """
+    def __init__(self, counter, loop=tasko.get_loop()):
+        super().__init__(loop)
+        self.counter = counter
+        self._count = counter.count
+        loop.add_interrupt(self.check)
+
+    def check(self):
+        count = self.counter.count
+        if count != self._count:
+            self._count = count
+            self.set()
+
+    def clear(self):
+        """Clears the flag and forgets the signals so far"""
+        self._count = self.counter.count
+        super().clear()
+
+    def close(self):
+        """Stop checking the counter"""
+        self._loop.remove_interrupt(self.check)
+
+    async def wait_until(self, condition, timeout):
+        """
+        Waits until condition() is true for up to timeout seconds, calling it only when the signal fired.
+        Returns whether it became true.
+        """
+        end_nanos = _loop._get_future_nanos(timeout)
+        while True:
+            # cleared first, so a signal while checking wakes the wait below
+            self.clear()
+            if condition():
+                return True
+            remaining = end_nanos - _loop._monotonic_ns()
+            if remaining <= 0:
+                return False
+            try:
+                await self._loop.wait_for(self.wait(), remaining / 1000000000)
+            except TaskTimeoutException:
+                return condition()
+
+
+class Queue:
+    """
+    A first in, first out queue. get() waits until there is an item,
+    put() waits until there is room when a maxsize is given.
+    """
+    def __init__(self, maxsize=0, loop=tasko.get_loop()):
+        """
+        :param maxsize: The maximum number of items in the queue, 0 means unbounded
+        """
+        self._loop = loop
+        self.maxsize = maxsize
+        self._items = []
+        self._getters = []
+        self._putters = []
+
+    def qsize(self):
+        return len(self._items)
+
+    def empty(self):
+        return len(self._items) == 0
+
+    def full(self):
+        return 0 < self.maxsize <= len(self._items)
+
+    def put_nowait(self, item):
+        """Adds an item without waiting, raising QueueFullException if there is no room"""
+        if self.full():
+            raise QueueFullException()
+        self._items.append(item)
+        self._wake_getter()
+
+    def get_nowait(self):
+        """Removes and returns an item without waiting, raising QueueEmptyException if there is none"""
+        if self.empty():
+            raise QueueEmptyException()
+        item = self._items.pop(0)
+        self._wake_putter()
+        return item
+
+    def _wake_getter(self):
+        if len(self._getters) > 0 and not self.empty():
+            self._getters.pop(0)()
+
+    def _wake_putter(self):
+        if len(self._putters) > 0 and not self.full():
+            self._putters.pop(0)()
+
+    async def put(self, item):
+        # Another task may take the freed slot before this one resumes, so check again
+        while self.full():
+            await _wait(self._loop, self._putters, self._wake_putter)
+        self.put_nowait(item)
+
+    async def get(self):
+        while self.empty():
+            await _wait(self._loop, self._getters, self._wake_getter)
+        return self.get_nowait()
+
+
+class Semaphore:
+    """
+    Limits how many tasks can hold it at the same time. Use with `async with semaphore:`
+    """
+    def __init__(self, value=1, loop=tasko.get_loop()):
+        self._loop = loop
+        self._value = value
+        self._waiters = []
+
+    def locked(self):
+        return self._value == 0
+
+    async def acquire(self):
+        if self._value > 0 and len(self._waiters) == 0:
+            self._value -= 1
+        else:
+            # release() hands its permit straight to the first waiter, so nobody can barge in front of it
+            await _wait(self._loop, self._waiters, self.release)
+        return True
+
+    def release(self):
+        if len(self._waiters) > 0:
+            self._waiters.pop(0)()
+        else:
+            self._value += 1
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class Lock(Semaphore):
+    """A semaphore that only one task can hold at a time"""
+    def __init__(self, loop=tasko.get_loop()):
+        super().__init__(1, loop=loop)
+
+    def release(self):
+        assert self.locked(), 'Released a lock that was not held'
+        super().release()
@@ -72,9 +72,9 @@ class TestManagedSpi(TestCase):
                 await YieldOne()
 
         # Add the top level application coroutines
-        loop.add_task(read_sdcard())
-        loop.add_task(read_sensor())
-        loop.add_task(update_screen())
+        loop.add_task(read_sdcard(), 0)
+        loop.add_task(read_sensor(), 0)
+        loop.add_task(update_screen(), 0)
 
         # would just use tasko.add_task() and tasko.run() but for test let's manually step it through
         # loop.run()
@@ -0,0 +1,268 @@
+import time
+from unittest import TestCase
+
+from tasko import Loop
+from tasko.loop import set_time_provider, set_sleep_provider, _yield_once, TaskCanceledException, TaskTimeoutException
+from tasko.managed_resource import ManagedResource
+from tasko.sync import Lock, Queue
+
+
+class TestCancel(TestCase):
+    def setUp(self):
+        self.now = 0
+        set_time_provider(lambda: self.now)
+        set_sleep_provider(self.sleep)
+
+    def tearDown(self):
+        set_time_provider(time.monotonic_ns)
+        set_sleep_provider(time.sleep)
+
+    def sleep(self, seconds):
+        self.now += round(seconds * 1000000000)
+
+    def test_cancel_sleeping(self):
+        loop = Loop()
+        events = []
+
+        async def sleeper():
+            try:
+                await loop.sleep(10)
+                events.append('woke')
+            except TaskCanceledException:
+                events.append('canceled')
+                raise
+
+        async def busy():
+            while True:
+                await _yield_once()
+
+        task = loop.add_task(sleeper(), 0)
+        busy_task = loop.add_task(busy(), 1)
+        loop._step()
+        loop.cancel(task)
+        loop.cancel(busy_task)
+        loop._step()
+        self.assertEqual(['canceled'], events)
+        self.assertTrue(task.done)
+        self.assertEqual([], loop._sleeping, 'the stale sleeper should be dropped')
+        self.assertEqual(0, self.now, 'should not idle until the stale sleeper is due')
+
+        # canceling a finished task does nothing
+        loop.cancel(task)
+        self.assertEqual([], loop._tasks)
+
+    def test_cancel_runnable(self):
+        loop = Loop()
+        steps = []
+
+        async def busy():
+            while True:
+                steps.append(len(steps))
+                await _yield_once()
+
+        task = loop.add_task(busy(), 0)
+        loop._step()
+        loop._step()
+        loop.cancel(task)
+        loop._step()
+        loop._step()
+        self.assertEqual([0, 1], steps)
+        self.assertTrue(task.done)
+
+    def test_cancel_self(self):
+        loop = Loop()
+        events = []
+
+        async def quitter():
+            loop.cancel(task)
+            events.append('still running')
+            try:
+                await loop.sleep(10)
+            except TaskCanceledException:
+                events.append('canceled')
+
+        task = loop.add_task(quitter(), 0)
+        loop._step()
+        loop._step()
+        self.assertEqual(['still running', 'canceled'], events)
+        self.assertEqual(0, self.now)
+
+    def test_not_caught_as_exception(self):
+        loop = Loop()
+        events = []
+
+        async def careless():
+            try:
+                await loop.sleep(10)
+            except Exception:
+                events.append('swallowed')
+            events.append('continued')
+
+        task = loop.add_task(careless(), 0)
+        loop._step()
+        loop.cancel(task)
+        loop._step()
+        self.assertEqual([], events)
+
+    def test_cancel_scheduled(self):
+        loop = Loop()
+        runs = []
+
+        async def slow():
+            runs.append('start')
+            await loop.sleep(10)
+            runs.append('end')
+
+        scheduled = loop.schedule(1, slow, 0)
+        loop._step()
+        scheduled.cancel()
+        loop._step()
+        self.assertEqual(['start'], runs)
+        self.assertFalse(scheduled._scheduled_to_run)
+
+        scheduled.start()
+        loop._step()
+        self.assertEqual(['start', 'start'], runs, 'should be able to start a canceled task again')
+
+    def test_cancel_suspended_lock_waiter(self):
+        loop = Loop()
+        lock = Lock(loop=loop)
+        order = []
+
+        async def worker(name):
+            async with lock:
+                order.append(name)
+                await _yield_once()
+
+        loop.add_task(worker('a'), 0)
+        b = loop.add_task(worker('b'), 0)
+        loop.add_task(worker('c'), 0)
+        loop._step()
+        loop.cancel(b)
+        for _ in range(5):
+            loop._step()
+        self.assertEqual(['a', 'c'], order)
+        self.assertFalse(lock.locked())
+
+    def test_cancel_after_handed_lock(self):
+        loop = Loop()
+        lock = Lock(loop=loop)
+        order = []
+
+        async def worker(name):
+            async with lock:
+                order.append(name)
+                await _yield_once()
+                if name == 'a':
+                    # hands the lock to b, which is canceled before it can run
+                    lock.release()
+                    loop.cancel(b)
+                    await lock.acquire()
+
+        loop.add_task(worker('a'), 0)
+        b = loop.add_task(worker('b'), 0)
+        loop.add_task(worker('c'), 0)
+        for _ in range(6):
+            loop._step()
+        self.assertEqual(['a', 'c'], order, 'the lock should be passed on to c')
+        self.assertFalse(lock.locked())
+
+    def test_cancel_queue_getter(self):
+        loop = Loop()
+        queue = Queue(loop=loop)
+        received = []
+
+        async def getter(name):
+            received.append((name, await queue.get()))
+
+        a = loop.add_task(getter('a'), 0)
+        loop.add_task(getter('b'), 0)
+        loop._step()
+        queue.put_nowait(1)  # wakes a
+        loop.cancel(a)
+        loop._step()
+        loop._step()
+        self.assertEqual([('b', 1)], received)
+
+    def test_cancel_managed_resource_waiter(self):
+        loop = Loop()
+        owners = []
+        resource = ManagedResource('bus', on_acquire=lambda name: owners.append(name), loop=loop)
+
+        async def user(name):
+            async with resource.handle(name=name):
+                await _yield_once()
+
+        loop.add_task(user('a'), 0)
+        b = loop.add_task(user('b'), 0)
+        loop.add_task(user('c'), 0)
+        loop._step()
+        loop.cancel(b)
+        for _ in range(5):
+            loop._step()
+        self.assertEqual(['a', 'c'], owners)
+        self.assertFalse(resource._owned)
+
+    def test_stale_resume(self):
+        loop = Loop()
+        resumers = []
+        events = []
+
+        async def waiter():
+            await_handle, resume = loop.suspend()
+            resumers.append(resume)
+            try:
+                await await_handle
+            except TaskCanceledException:
+                events.append('canceled')
+                raise
+
+        task = loop.add_task(waiter(), 0)
+        loop._step()
+        loop.cancel(task)
+        resumers[0]()
+        loop._step()
+        self.assertEqual(['canceled'], events)
+        resumers[0]()
+        self.assertEqual([], loop._tasks, 'resuming after cancel should do nothing')
+
+    def test_wait_for(self):
+        loop = Loop()
+        results = []
+
+        async def work(seconds):
+            await loop.sleep(seconds)
+            return seconds
+
+        async def caller():
+            results.append(await loop.wait_for(work(1), 2))
+            try:
+                await loop.wait_for(work(5), 2)
+            except TaskTimeoutException:
+                results.append('timeout')
+            results.append(self.now)
+
+        loop.add_task(caller(), 0)
+        for _ in range(10):
+            loop._step()
+        self.assertEqual([1, 'timeout', 3000000000], results)
+        self.assertEqual([], loop._sleeping, 'the watchdogs should be gone')
+        self.assertEqual([], loop._tasks)
+
+    def test_wait_for_canceled(self):
+        loop = Loop()
+        results = []
+
+        async def caller():
+            try:
+                await loop.wait_for(loop.sleep(5), 2)
+            except TaskCanceledException:
+                results.append('canceled')
+
+        task = loop.add_task(caller(), 0)
+        loop._step()
+        loop.cancel(task)
+        for _ in range(3):
+            loop._step()
+        self.assertEqual(['canceled'], results, 'an outside cancel is not a timeout')
+        self.assertEqual(0, self.now)
@@ -0,0 +1,89 @@
+import time
+from unittest import TestCase
+
+from tasko import Loop
+from tasko.loop import set_time_provider, set_sleep_provider
+
+
+class TestCatchUp(TestCase):
+    def setUp(self):
+        self.now = 0
+        set_time_provider(lambda: self.now)
+        set_sleep_provider(self.sleep)
+
+    def tearDown(self):
+        set_time_provider(time.monotonic_ns)
+        set_sleep_provider(time.sleep)
+
+    def sleep(self, seconds):
+        self.now += round(seconds * 1000000000)
+
+    def run_policy(self, catch_up, runs):
+        """Runs a task every 100ns whose first iteration takes 350ns, returns the start times"""
+        loop = Loop()
+        starts = []
+
+        async def work():
+            starts.append(self.now)
+            self.now += 350 if len(starts) == 1 else 10
+
+        scheduled = loop.schedule(1000000000 / 100, work, 0)
+        scheduled.catch_up = catch_up
+        while len(starts) < runs:
+            loop._step()
+        return scheduled, starts
+
+    def test_reset(self):
+        scheduled, starts = self.run_policy('reset', 4)
+        self.assertEqual([0, 350, 450, 550], starts)
+        self.assertEqual(2, scheduled.missed_windows)
+        self.assertEqual(250, scheduled.max_skew_nanos)
+        self.assertEqual(250, scheduled.lag_nanos)
+
+    def test_skip(self):
+        scheduled, starts = self.run_policy('skip', 4)
+        self.assertEqual([0, 400, 500, 600], starts, 'should stay on the original schedule')
+        self.assertEqual(3, scheduled.missed_windows)
+        self.assertEqual(0, scheduled.max_skew_nanos)
+
+    def test_burst(self):
+        scheduled, starts = self.run_policy('burst', 5)
+        self.assertEqual([0, 350, 360, 370, 400], starts, 'should run back to back until caught up')
+        self.assertEqual(0, scheduled.missed_windows)
+        self.assertEqual(250, scheduled.max_skew_nanos)
+        self.assertEqual(250 + 160 + 70, scheduled.lag_nanos)
+
+    def test_burst_limit(self):
+        loop = Loop()
+        starts = []
+
+        async def work():
+            starts.append(self.now)
+            self.now += 1500 if len(starts) == 1 else 0
+
+        scheduled = loop.schedule(1000000000 / 100, work, 0)
+        scheduled.catch_up = 'burst'
+        while len(starts) < 10:
+            loop._step()
+        self.assertEqual(14 - scheduled.BURST_LIMIT, scheduled.missed_windows)
+        self.assertEqual([1500] * (scheduled.BURST_LIMIT + 1), starts[1:])
+
+    def test_backoff(self):
+        scheduled, starts = self.run_policy('backoff', 4)
+        self.assertEqual([0, 350, 550, 650], starts, 'should wait twice as long after falling behind')
+        self.assertEqual(2, scheduled.missed_windows)
+        self.assertEqual(1, scheduled.backoff, 'should return to the normal rate once on time')
+
+    def test_backoff_limit(self):
+        loop = Loop()
+
+        async def slow():
+            self.now += 1000000
+
+        scheduled = loop.schedule(1000000000 / 100, slow, 0)
+        scheduled.catch_up = 'backoff'
+        for _ in range(10):
+            loop._step()
+        self.assertEqual(scheduled.MAX_BACKOFF, scheduled.backoff)
+        scheduled.change_rate(1)
+        self.assertEqual(1, scheduled.backoff)
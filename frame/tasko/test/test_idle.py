@@ -0,0 +1,123 @@
+import time
+from unittest import TestCase
+
+from tasko import Loop
+from tasko.loop import set_time_provider
+
+
+class TestIdle(TestCase):
+    def setUp(self):
+        self.now = 0
+        self.idles = []
+        set_time_provider(lambda: self.now)
+
+    def tearDown(self):
+        set_time_provider(time.monotonic_ns)
+
+    def idle(self, seconds):
+        nanos = round(seconds * 1000000000)
+        self.idles.append(nanos)
+        self.now += nanos
+
+    def run_tasks(self, loop, until_nanos):
+        runs = []
+
+        async def tick(name):
+            runs.append((name, self.now))
+
+        async def start_b():
+            loop.schedule(10, tick, 0, 'b')
+
+        # 10 Hz tasks, 10 ms out of phase with each other
+        loop.schedule(10, tick, 0, 'a')
+        loop.run_later(0.01, start_b(), 0)
+        while self.now < until_nanos:
+            loop._step()
+        return runs
+
+    def test_custom_idle(self):
+        loop = Loop()
+        loop.set_idle(self.idle)
+        self.run_tasks(loop, 1000000000)
+        self.assertEqual(loop.wakeups, len(self.idles))
+        self.assertEqual(sum(self.idles), loop.idle_nanos)
+        self.assertEqual([10000000, 90000000] * 10, self.idles[:20], 'should idle until each sleeper is due')
+        self.assertAlmostEqual(1, loop.idle_fraction())
+
+    def test_slack_coalesces_wakeups(self):
+        loop = Loop()
+        loop.set_idle(self.idle)
+        loop.set_idle_slack(0.02)
+        runs = self.run_tasks(loop, 1000000000)
+        self.assertEqual([10000000] + [100000000] * 9, self.idles[:10], 'both tasks should be woken together')
+        self.assertEqual(('a', 110000000), runs[2], 'a runs late, within the slack')
+        self.assertEqual(('b', 110000000), runs[3])
+
+    def test_slack_is_bounded(self):
+        loop = Loop()
+        loop.set_idle(self.idle)
+        loop.set_idle_slack(0.005)
+        self.run_tasks(loop, 1000000000)
+        self.assertEqual([10000000, 90000000] * 10, self.idles[:20], 'sleepers outside the slack are not delayed')
+
+    def run_phased(self, loop, slacks, until_nanos):
+        """Runs a 10 Hz task for each slack, the nth task is 4n ms out of phase with the first"""
+        runs = []
+
+        async def tick(name):
+            runs.append((name, self.now))
+
+        async def start(name, slack):
+            loop.schedule(10, tick, 0, name).set_slack(slack)
+
+        for i, slack in enumerate(slacks):
+            loop.run_later(0.004 * i, start(i, slack), 0)
+        while self.now < until_nanos:
+            loop._step()
+        return runs
+
+    def test_task_slack(self):
+        loop = Loop()
+        loop.set_idle(self.idle)
+        loop.enable_profiling()
+        runs = self.run_phased(loop, [0.01, 0.01, 0.01], 1000000000)
+        self.assertEqual([(0, 108000000), (1, 108000000), (2, 108000000)], runs[3:6], 'should share a wakeup')
+        self.assertEqual(2 * 10, loop.stats.coalesced_wakeups)
+
+    def test_task_slack_is_bounded_by_every_woken_task(self):
+        loop = Loop()
+        loop.set_idle(self.idle)
+        loop.enable_profiling()
+        # 1 can wait for 2, but then 0 would be late by more than its slack
+        runs = self.run_phased(loop, [0.006, 0.01, 0.01], 1000000000)
+        self.assertEqual([(0, 104000000), (1, 104000000), (2, 108000000)], runs[3:6])
+        self.assertEqual(10, loop.stats.coalesced_wakeups)
+
+    def test_no_slack(self):
+        loop = Loop()
+        loop.set_idle(self.idle)
+        runs = self.run_phased(loop, [0, 0.01, 0.01], 1000000000)
+        self.assertEqual([(0, 100000000), (1, 108000000), (2, 108000000)], runs[3:6],
+                         'tasks without slack are never delayed')
+
+    def test_canceled_sleepers_are_not_coalesced(self):
+        loop = Loop()
+        # no time passes until the sleeper is canceled
+        loop.set_idle(lambda seconds: None)
+        loop.set_idle_slack(0.02)
+        runs = []
+
+        async def tick():
+            runs.append(self.now)
+
+        async def nap():
+            await loop.sleep(0.015)
+
+        loop.run_later(0.01, tick(), 0)
+        napping = loop.add_task(nap(), 0)
+        loop._step()
+        loop.cancel(napping)
+        loop.set_idle(self.idle)
+        while not runs:
+            loop._step()
+        self.assertEqual([10000000], runs, 'the canceled sleeper would have delayed the wakeup')
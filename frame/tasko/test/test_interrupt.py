@@ -0,0 +1,141 @@
+import time
+from unittest import TestCase
+
+from tasko import Loop
+from tasko.loop import set_time_provider
+from tasko.sync import Interrupt
+
+
+class Counter:
+    """Stands in for a countio.Counter, fire() is an edge on the pin"""
+    def __init__(self):
+        self.count = 0
+
+    def fire(self):
+        self.count += 1
+
+
+class TestInterrupt(TestCase):
+    def setUp(self):
+        self.now = 0
+        self.idles = []
+        # (nanos, function) fired once the clock passes nanos
+        self.pending = []
+        set_time_provider(lambda: self.now)
+
+    def tearDown(self):
+        set_time_provider(time.monotonic_ns)
+
+    def idle(self, seconds):
+        nanos = round(seconds * 1000000000)
+        self.idles.append(nanos)
+        self.now += nanos
+        for entry in list(self.pending):
+            if entry[0] <= self.now:
+                self.pending.remove(entry)
+                entry[1]()
+
+    def test_plain_loop_has_no_checks(self):
+        loop = Loop()
+        self.assertNotIn('_step', loop.__dict__)
+        check = (lambda: None)
+        loop.add_interrupt(check)
+        self.assertEqual(loop._step_interrupts, loop._step)
+        loop.remove_interrupt(check)
+        self.assertNotIn('_step', loop.__dict__)
+        self.assertNotIn('_idle', loop.__dict__)
+
+    def test_wait_wakes_on_signal(self):
+        loop = Loop()
+        loop.set_idle(self.idle)
+        counter = Counter()
+        interrupt = Interrupt(counter, loop=loop)
+        woken = []
+
+        async def waiter():
+            await interrupt.wait()
+            woken.append(self.now)
+
+        async def tick():
+            pass
+
+        loop.schedule(1, tick, 0)
+        loop.add_task(waiter(), 0)
+        self.pending.append((35000000, counter.fire))
+        while not woken:
+            loop._step()
+        self.assertEqual([40000000], woken, 'woken at the end of the idle slice the signal fired in')
+        self.assertEqual([10000000] * 4, self.idles[:4], 'idles in slices while a check is registered')
+        interrupt.close()
+
+    def test_idle_that_wakes_on_signals_is_not_sliced(self):
+        loop = Loop()
+        counter = Counter()
+        interrupt = Interrupt(counter, loop=loop)
+        woken = []
+
+        def idle(seconds):
+            # sleeps until the signal, like a light sleep with a pin alarm
+            nanos = round(seconds * 1000000000)
+            if self.pending:
+                nanos = min(nanos, self.pending[0][0] - self.now)
+            self.idles.append(nanos)
+            self.now += nanos
+            if self.pending and self.pending[0][0] == self.now:
+                self.pending.pop(0)[1]()
+
+        async def waiter():
+            await interrupt.wait()
+            woken.append(self.now)
+
+        async def tick():
+            pass
+
+        loop.set_idle(idle, wakes_on_interrupts=True)
+        loop.schedule(1, tick, 0)
+        loop.add_task(waiter(), 0)
+        self.pending.append((35000000, counter.fire))
+        while not woken:
+            loop._step()
+        self.assertEqual([35000000], woken, 'woken by the signal')
+        self.assertEqual(35000000, self.idles[0], 'idles until the signal in one go')
+        interrupt.close()
+
+    def test_wait_until(self):
+        loop = Loop()
+        loop.set_idle(self.idle)
+        counter = Counter()
+        interrupt = Interrupt(counter, loop=loop)
+        ready = []
+        checks = []
+        results = []
+
+        def condition():
+            checks.append(self.now)
+            return bool(ready)
+
+        async def waiter():
+            results.append((await interrupt.wait_until(condition, 0.2), self.now))
+
+        def spurious():
+            counter.fire()
+
+        def done():
+            ready.append(True)
+            counter.fire()
+
+        loop.add_task(waiter(), 0)
+        self.pending.append((25000000, spurious))
+        self.pending.append((55000000, done))
+        while not results:
+            loop._step()
+        self.assertEqual([(True, 60000000)], results)
+        self.assertEqual([0, 30000000, 60000000], checks, 'condition is only checked when the signal fired')
+
+        # times out without a signal
+        ready.clear()
+        loop.add_task(waiter(), 0)
+        while len(results) < 2:
+            loop._step()
+        self.assertEqual((False, 260000000), results[1])
+        interrupt.close()
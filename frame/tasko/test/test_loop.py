@@ -13,7 +13,7 @@ class TestLoop(TestCase):
         async def foo():
             nonlocal ran
             ran = True
-        loop.add_task(foo())
+        loop.add_task(foo(), 0)
         loop._step()
         self.assertTrue(ran)
 
@@ -25,7 +25,7 @@ class TestLoop(TestCase):
             nonlocal complete
             await loop.sleep(0.1)
             complete = True
-        loop.add_task(foo())
+        loop.add_task(foo(), 0)
         start = time.monotonic()
         while not complete and time.monotonic() - start < 1:
             loop._step()
@@ -45,7 +45,7 @@ class TestLoop(TestCase):
             async def foo():
                 nonlocal run_count
                 run_count += 1
-            scheduled_task = loop.schedule(1000000000, foo)
+            scheduled_task = loop.schedule(1000000000, foo, 0)
 
             now = 2
             self.assertEqual(0, run_count, 'did not run before step')
@@ -96,7 +96,7 @@ class TestLoop(TestCase):
 
             counters.append(0)
 
-            loop.schedule(3 * (i + 1) + 5, f, i)
+            loop.schedule(3 * (i + 1) + 5, f, 0, i)
 
         start = time.monotonic()
         while time.monotonic() - start < duration:
@@ -127,8 +127,8 @@ class TestLoop(TestCase):
             nonlocal control_ticks
             control_ticks = control_ticks + 1
 
-        loop.schedule(100, control_ticker)
-        loop.schedule_later(10, deferred_task)
+        loop.schedule(100, control_ticker, 0)
+        loop.schedule_later(10, deferred_task, 0)
 
         while True:
             loop._step()
@@ -148,7 +148,7 @@ class TestLoop(TestCase):
                 count = count + 1
                 await _yield_once()  # For testing
 
-        loop.run_later(seconds_to_delay=0.1, awaitable_task=run_later())
+        loop.run_later(seconds_to_delay=0.1, awaitable_task=run_later(), priority=0)
 
         self.assertEqual(0, count, 'count should not increment upon coroutine instantiation')
         loop._step()
@@ -157,3 +157,49 @@ class TestLoop(TestCase):
         time.sleep(0.1)  # Make sure enough time has passed for step to pick up the task
         loop._step()
         self.assertEqual(1, count, 'count should increment once per step')
+
+    def test_priority_order(self):
+        loop = Loop()
+        order = []
+
+        async def foo(name):
+            order.append(name)
+
+        loop.add_task(foo('low'), 10)
+        loop.add_task(foo('high'), 0)
+        loop.add_task(foo('mid-first'), 5)
+        loop.add_task(foo('mid-second'), 5)
+        loop._step()
+        self.assertEqual(['high', 'mid-first', 'mid-second', 'low'], order)
+
+    def test_sleepers_wake_in_priority_order(self):
+        now = 0
+
+        def nanos():
+            return now
+
+        set_time_provider(nanos)
+        try:
+            loop = Loop()
+            order = []
+
+            async def foo(name, seconds):
+                await loop.sleep(seconds)
+                order.append(name)
+
+            loop.add_task(foo('late', 3e-9), 0)
+            loop.add_task(foo('low', 1e-9), 9)
+            loop.add_task(foo('high', 2e-9), 1)
+            loop._step()
+            self.assertEqual([], order, 'everyone is asleep')
+
+            now = 2
+            loop._step()
+            self.assertEqual(['high', 'low'], order, 'due sleepers ran by priority, not by deadline')
+
+            now = 3
+            loop._step()
+            self.assertEqual(['high', 'low', 'late'], order)
+            self.assertEqual([], loop._sleeping)
+        finally:
+            set_time_provider(time.monotonic_ns)
@@ -39,8 +39,8 @@ class TestManagedResource(TestCase):
                 self.assertTrue(spi.active_cs is not None)
             await YieldOne()                     # after context
 
-        loop.add_task(test_fn(handle_cs1))
-        loop.add_task(test_fn(handle_cs2))
+        loop.add_task(test_fn(handle_cs1), 0)
+        loop.add_task(test_fn(handle_cs2), 0)
 
         loop._step()  # 1 Enter fn      2 Enter fn
         loop._step()  # 1 acquire-work  2 suspend
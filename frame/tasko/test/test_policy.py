@@ -0,0 +1,74 @@
+import time
+from unittest import TestCase
+
+from tasko import Loop
+from tasko.loop import set_time_provider, set_sleep_provider, _yield_once, POLICY_PRIORITY, POLICY_EDF
+
+
+class TestPolicy(TestCase):
+    def setUp(self):
+        self.now = 0
+        set_time_provider(lambda: self.now)
+        set_sleep_provider(self.sleep)
+
+    def tearDown(self):
+        set_time_provider(time.monotonic_ns)
+        set_sleep_provider(time.sleep)
+
+    def sleep(self, seconds):
+        self.now += round(seconds * 1000000000)
+
+    def run_rates(self, loop):
+        """A 1 Hz task with a better priority than a 10 Hz task, returns the order they ran in at 1 s"""
+        runs = []
+
+        async def tick(name):
+            runs.append((name, self.now))
+
+        loop.schedule(1, tick, 0, 'slow')
+        loop.schedule(10, tick, 1, 'fast')
+        while self.now <= 1000000000:
+            loop._step()
+        return [name for name, at in runs if at == 1000000000]
+
+    def test_priority(self):
+        self.assertEqual(['slow', 'fast'], self.run_rates(Loop()))
+
+    def test_edf(self):
+        loop = Loop()
+        loop.set_policy(POLICY_EDF)
+        self.assertEqual(['fast', 'slow'], self.run_rates(loop), 'fast is due at 1.1 s, slow at 2 s')
+
+    def run_blocked(self, loop):
+        """A task hogs the loop while a task due at 1 s and a better priority task due at 8 s wait"""
+        runs = []
+
+        async def hog():
+            await _yield_once()
+            self.now += 10000000000
+
+        async def tick(name, seconds):
+            await loop.sleep(seconds)
+            runs.append(name)
+
+        loop.add_task(tick('early', 1), 5)
+        loop.add_task(tick('late', 8), 0)
+        loop.add_task(hog(), 1)
+        for _ in range(3):
+            loop._step()
+        return runs
+
+    def test_priority_without_aging(self):
+        self.assertEqual(['late', 'early'], self.run_blocked(Loop()))
+
+    def test_priority_aging(self):
+        loop = Loop()
+        loop.set_policy(POLICY_PRIORITY, aging_seconds=1)
+        self.assertEqual(['early', 'late'], self.run_blocked(loop),
+                         'waiting 7 s longer should outweigh 5 priority levels')
+
+        loop.set_policy(POLICY_PRIORITY)
+        self.assertIsNone(loop._key, 'plain priority order should not compute keys')
+
+    def test_unknown_policy(self):
+        self.assertRaises(AssertionError, Loop().set_policy, 'fifo')
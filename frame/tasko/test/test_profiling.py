@@ -0,0 +1,113 @@
+import contextlib
+import io
+import time
+from unittest import TestCase
+
+from tasko import Loop
+from tasko.loop import set_time_provider
+
+
+class TestProfiling(TestCase):
+    def setUp(self):
+        self.now = 0
+        set_time_provider(lambda: self.now)
+
+    def tearDown(self):
+        set_time_provider(time.monotonic_ns)
+
+    def test_disabled_by_default(self):
+        loop = Loop()
+        self.assertIsNone(loop.stats)
+        self.assertNotIn('_run_task', loop.__dict__)
+
+        async def foo():
+            pass
+        loop.schedule(1, foo, 0)
+        loop._step()
+        self.assertIsNone(loop.stats)
+
+    def test_task_stats(self):
+        loop = Loop()
+        loop.enable_profiling()
+
+        async def work(nanos):
+            self.now += nanos
+
+        scheduled = loop.schedule(1000000000 / 100, work, 0, 30)  # every 100ns, takes 30ns
+        scheduled.name = 'worker'
+
+        loop._step()
+        self.now = 120  # 20ns late
+        loop._step()
+        scheduled.change_rate(1000000000 / 10)  # every 10ns, but takes 30ns
+        # 10ns after the last start went by while it ran, so the next run is brought forward to now, on time
+        loop._step()
+
+        stats = loop.stats.tasks['worker']
+        self.assertEqual(3, stats.runs)
+        self.assertEqual(90, stats.total_nanos)
+        self.assertEqual(30, stats.min_nanos)
+        self.assertEqual(30, stats.max_nanos)
+        self.assertEqual(30, stats.mean_nanos())
+        self.assertEqual(30, stats.percentile_nanos(90))
+        self.assertEqual(20, stats.max_late_nanos)
+        self.assertEqual(1, stats.overruns)
+        self.assertEqual(90, loop.stats.task_nanos)
+
+    def test_percentile(self):
+        loop = Loop()
+        loop.enable_profiling()
+        stats = loop.stats.task('t')
+        for nanos in range(100):
+            stats.record(nanos, 0, False)
+        self.assertEqual(0, stats.min_nanos)
+        self.assertEqual(99, stats.max_nanos)
+        # only the most recent samples are kept for percentiles
+        self.assertEqual(100 - stats.SAMPLES, min(stats._recent))
+        self.assertEqual(96, stats.percentile_nanos(90))
+
+    def test_idle_and_overhead(self):
+        loop = Loop()
+        loop.enable_profiling()
+
+        def sleep(seconds):
+            self.now += int(seconds * 1000000000)
+
+        async def foo():
+            self.now += 100
+
+        from tasko import loop as loop_module
+        loop_module.set_sleep_provider(sleep)
+        try:
+            loop.schedule(1000000000 / 1000, foo, 0)
+            for _ in range(3):
+                loop._step()
+        finally:
+            loop_module.set_sleep_provider(time.sleep)
+
+        self.assertEqual(300, loop.stats.task_nanos)
+        self.assertEqual(loop.stats.total_nanos() - 300, loop.stats.idle_nanos)
+        self.assertEqual(0, loop.stats.overhead_nanos())
+
+        loop.enable_profiling(False)
+        self.assertIsNone(loop.stats)
+        self.assertNotIn('_run_task', loop.__dict__)
+
+    def test_debug_is_bound_at_construction(self):
+        self.assertNotIn('_step', Loop().__dict__)
+
+        loop = Loop(debug=True)
+        output = io.StringIO()
+
+        async def foo():
+            self.now += 10
+
+        with contextlib.redirect_stdout(output):
+            loop.add_task(foo(), 0)
+            loop.enable_profiling()
+            loop._step()
+            loop.enable_profiling(False)
+            loop._step()
+        self.assertIn('running', output.getvalue())
+        self.assertIn('task complete', output.getvalue())
+        self.assertEqual(loop._run_task_debug, loop._run_task, 'should still debug once profiling stops')
@@ -0,0 +1,115 @@
+from unittest import TestCase
+
+from tasko import Loop
+from tasko.loop import _yield_once
+from tasko.sync import Event, Queue, Semaphore, Lock, QueueEmptyException, QueueFullException
+
+
+class TestSync(TestCase):
+    def test_event(self):
+        loop = Loop()
+        event = Event(loop=loop)
+        woken = []
+
+        async def waiter(name):
+            await event.wait()
+            woken.append(name)
+
+        loop.add_task(waiter('a'), 0)
+        loop.add_task(waiter('b'), 1)
+        for _ in range(3):
+            loop._step()
+        self.assertEqual([], woken)
+        self.assertEqual(0, len(loop._tasks), 'waiting tasks should not be polled')
+
+        event.set()
+        loop._step()
+        self.assertEqual(['a', 'b'], woken)
+
+        # already set, so waiting does not suspend
+        loop.add_task(waiter('c'), 0)
+        loop._step()
+        self.assertEqual(['a', 'b', 'c'], woken)
+
+        event.clear()
+        self.assertFalse(event.is_set())
+
+    def test_queue(self):
+        loop = Loop()
+        queue = Queue(maxsize=2, loop=loop)
+        received = []
+        sent = []
+
+        async def producer():
+            for i in range(5):
+                await queue.put(i)
+                sent.append(i)
+
+        async def consumer():
+            while True:
+                received.append(await queue.get())
+                await _yield_once()
+                await _yield_once()
+
+        loop.add_task(consumer(), 0)
+        loop._step()
+        self.assertEqual([], received)
+
+        loop.add_task(producer(), 1)
+        loop._step()
+        self.assertEqual([0, 1], sent, 'put should wait once the queue is full')
+        for _ in range(10):
+            loop._step()
+        self.assertEqual([0, 1, 2, 3, 4], sent)
+        self.assertEqual([0, 1, 2, 3, 4], received)
+        self.assertTrue(queue.empty())
+
+    def test_queue_nowait(self):
+        queue = Queue(maxsize=1, loop=Loop())
+        self.assertRaises(QueueEmptyException, queue.get_nowait)
+        queue.put_nowait('x')
+        self.assertTrue(queue.full())
+        self.assertRaises(QueueFullException, queue.put_nowait, 'y')
+        self.assertEqual('x', queue.get_nowait())
+        self.assertEqual(0, queue.qsize())
+
+    def test_semaphore(self):
+        loop = Loop()
+        semaphore = Semaphore(2, loop=loop)
+        holding = []
+        max_holding = []
+
+        async def worker(name):
+            async with semaphore:
+                holding.append(name)
+                max_holding.append(len(holding))
+                await _yield_once()
+                holding.remove(name)
+
+        for name in range(5):
+            loop.add_task(worker(name), 0)
+        for _ in range(10):
+            loop._step()
+
+        self.assertEqual(5, len(max_holding))
+        self.assertEqual(2, max(max_holding))
+        self.assertFalse(semaphore.locked())
+
+    def test_lock(self):
+        loop = Loop()
+        lock = Lock(loop=loop)
+        order = []
+
+        async def worker(name):
+            async with lock:
+                order.append(name)
+                await _yield_once()
+                order.append(name)
+
+        loop.add_task(worker('a'), 0)
+        loop.add_task(worker('b'), 0)
+        for _ in range(5):
+            loop._step()
+        self.assertEqual(['a', 'a', 'b', 'b'], order)
+        self.assertFalse(lock.locked())
+        self.assertRaises(AssertionError, lock.release)
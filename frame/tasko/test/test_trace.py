@@ -0,0 +1,91 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from tasko import Loop
+from tasko.loop import set_time_provider, set_sleep_provider, _yield_once
+from tasko.trace import Trace, load, RUN, YIELD, SLEEP, SUSPEND, DONE, RESUME, IDLE, WAKE
+
+
+class TestTrace(TestCase):
+    def setUp(self):
+        self.now = 0
+        set_time_provider(lambda: self.now)
+        set_sleep_provider(self.sleep)
+
+    def tearDown(self):
+        set_time_provider(time.monotonic_ns)
+        set_sleep_provider(time.sleep)
+
+    def sleep(self, seconds):
+        self.now += round(seconds * 1000000000)
+
+    def test_ring_buffer(self):
+        trace = Trace(capacity=3)
+        for i in range(5):
+            trace.record(RUN, f'task{i % 2}', i)
+        self.assertEqual(5, trace.count)
+        self.assertEqual([(2, 'task0', RUN), (3, 'task1', RUN), (4, 'task0', RUN)], list(trace.events()),
+                         'only the newest events are kept')
+
+    def test_dump_and_load(self):
+        trace = Trace(capacity=4)
+        for i in range(6):
+            trace.record(i % 8, f'task{i}', i * 1000)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'loop.trace')
+            trace.dump(path)
+            self.assertEqual(list(trace.events()), load(path))
+
+    def test_records_loop(self):
+        loop = Loop()
+        loop.enable_tracing()
+        resumers = []
+
+        async def sleeper():
+            await loop.sleep(1)
+
+        async def waiter():
+            await_handle, resume = loop.suspend()
+            resumers.append(resume)
+            await await_handle
+
+        async def busy():
+            await _yield_once()
+            resumers[0]()
+
+        loop.add_task(sleeper(), 0)
+        loop.add_task(waiter(), 1)
+        loop.add_task(busy(), 2)
+        for _ in range(4):
+            loop._step()
+
+        self.assertEqual([
+            (0, 'sleeper', RUN), (0, 'sleeper', SLEEP),
+            (0, 'waiter', RUN), (0, 'waiter', SUSPEND),
+            (0, 'busy', RUN), (0, 'busy', YIELD),
+            (0, 'busy', RUN), (0, 'waiter', RESUME), (0, 'busy', DONE),
+            (0, 'waiter', RUN), (0, 'waiter', DONE),
+            (0, 'loop', IDLE), (1000000000, 'loop', WAKE),
+            (1000000000, 'sleeper', RUN), (1000000000, 'sleeper', DONE),
+        ], list(loop.trace.events()))
+
+    def test_scheduled_task_name(self):
+        loop = Loop()
+        loop.enable_tracing()
+
+        async def tick():
+            pass
+
+        loop.schedule(1, tick, 0).name = 'tick_task'
+        loop._step()
+        self.assertEqual([(0, 'tick_task', RUN), (0, 'tick_task', SLEEP)], list(loop.trace.events())[:2])
+
+    def test_disable(self):
+        loop = Loop()
+        loop.enable_tracing()
+        loop.enable_tracing(False)
+        self.assertIsNone(loop.trace)
+        self.assertNotIn('_run_task', loop.__dict__, 'the plain code path should be restored')
+        self.assertNotIn('_idle', loop.__dict__)
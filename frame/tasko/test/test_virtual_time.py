@@ -0,0 +1,47 @@
+import time
+from unittest import TestCase
+
+from tasko import Loop, virtual_time
+
+
+class TestVirtualTime(TestCase):
+    def tearDown(self):
+        virtual_time.disable()
+
+    def test_loop_jumps_to_next_deadline(self):
+        clock = virtual_time.enable(virtual_time.VirtualClock(0))
+        loop = Loop()
+        runs = []
+
+        async def daily():
+            runs.append(clock.monotonic())
+
+        loop.schedule(1 / (24 * 60 * 60), daily, 0)
+
+        real_start = time.perf_counter()  # not patched by virtual_time
+        while len(runs) < 8:
+            loop._step()
+
+        self.assertLess(time.perf_counter() - real_start, 1, 'a week of simulated time should not take real time')
+        self.assertEqual([day * 24 * 60 * 60.0 for day in range(8)], runs)
+
+    def test_time_module_follows_clock(self):
+        clock = virtual_time.enable(virtual_time.VirtualClock(5000000000, epoch=1000))
+        self.assertEqual(5, time.monotonic())
+        self.assertEqual(5000000000, time.monotonic_ns())
+        self.assertEqual(1005, time.time())
+
+        time.sleep(60)
+        self.assertEqual(65, clock.monotonic())
+        self.assertEqual(tuple(clock._localtime(1065)), tuple(time.localtime()))
+
+        virtual_time.disable()
+        self.assertNotEqual(clock.sleep, time.sleep)
+        self.assertFalse(virtual_time.enabled())
+
+    def test_sleep_rounds_up(self):
+        clock = virtual_time.VirtualClock(0)
+        clock.sleep(1e-10)
+        self.assertEqual(1, clock.nanos, 'sleeping must always reach the deadline')
+        clock.sleep(0)
+        self.assertEqual(1, clock.nanos)
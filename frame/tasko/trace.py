@@ -0,0 +1,105 @@
+"""
+Compact binary trace of what the loop is doing, for finding out where its time goes.
+
+Events are kept in a fixed size ring buffer (the oldest are overwritten), each is
+a monotonic timestamp, a task id and an event type. Tasks are identified by name,
+so tasks sharing a name (e.g. wait_for watchdogs) share an id.
+
+Use:
+    loop.enable_tracing()
+    ...
+    loop.trace.dump('/sd/loop.trace')
+    loop.enable_tracing(False)
+
+buildtools/trace_report.py turns a dumped trace into timelines, CPU utilization
+and a Chrome trace (chrome://tracing or https://ui.perfetto.dev) on a computer.
+"""
+import struct
+
+# Event types
+RUN = 0      # a task starts running
+YIELD = 1    # the task stops running but is still runnable
+SLEEP = 2    # the task stops running and sleeps
+SUSPEND = 3  # the task stops running and is suspended
+DONE = 4     # the task finished or was canceled
+RESUME = 5   # a suspended task was resumed
+IDLE = 6     # the loop starts idling (task id 0)
+WAKE = 7     # the loop stops idling (task id 0)
+EVENT_NAMES = ('run', 'yield', 'sleep', 'suspend', 'done', 'resume', 'idle', 'wake')
+
+# monotonic nanoseconds, task id, event type
+_EVENT_FORMAT = '<qHB'
+_EVENT_SIZE = 11
+_MAGIC = b'TKTR'
+_VERSION = 1
+
+
+class Trace:
+    def __init__(self, capacity=2048):
+        """
+        :param capacity: The number of events kept, each takes 11 bytes
+        """
+        self.capacity = capacity
+        self._buffer = bytearray(capacity * _EVENT_SIZE)
+        # events recorded so far, including overwritten ones
+        self.count = 0
+        # task id 0 is the loop itself
+        self._names = ['loop']
+        self._ids = {'loop': 0}
+
+    def record(self, event, name, nanos):
+        task_id = self._ids.get(name)
+        if task_id is None:
+            task_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+        struct.pack_into(_EVENT_FORMAT, self._buffer, (self.count % self.capacity) * _EVENT_SIZE,
+                         nanos, task_id, event)
+        self.count += 1
+
+    def events(self):
+        """The recorded events, oldest first, as (nanos, task name, event type) tuples"""
+        first = max(0, self.count - self.capacity)
+        for i in range(first, self.count):
+            nanos, task_id, event = struct.unpack_from(_EVENT_FORMAT, self._buffer, (i % self.capacity) * _EVENT_SIZE)
+            yield nanos, self._names[task_id], event
+
+    def dump(self, path):
+        """Write the trace to a file, it can be read back with load()"""
+        with open(path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(struct.pack('<BH', _VERSION, len(self._names)))
+            for name in self._names:
+                encoded = name.encode()[:255]
+                f.write(struct.pack('<B', len(encoded)))
+                f.write(encoded)
+            kept = min(self.count, self.capacity)
+            f.write(struct.pack('<I', kept))
+            # oldest first: from the next slot to be overwritten to the end, then the start of the buffer
+            split = (self.count % self.capacity) * _EVENT_SIZE if self.count > self.capacity else 0
+            buffer = memoryview(self._buffer)
+            f.write(buffer[split:kept * _EVENT_SIZE])
+            f.write(buffer[:split])
+
+
+def load(path):
+    """Reads a dumped trace, returns a list of (nanos, task name, event type) tuples, oldest first"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != _MAGIC:
+        raise ValueError(f'{path} is not a tasko trace')
+    version, name_count = struct.unpack_from('<BH', data, 4)
+    if version != _VERSION:
+        raise ValueError(f'Unsupported trace version {version}')
+    offset = 7
+    names = []
+    for _ in range(name_count):
+        length = data[offset]
+        names.append(bytes(data[offset + 1:offset + 1 + length]).decode())
+        offset += 1 + length
+    (count,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    events = []
+    for i in range(count):
+        nanos, task_id, event = struct.unpack_from(_EVENT_FORMAT, data, offset + i * _EVENT_SIZE)
+        events.append((nanos, names[task_id], event))
+    return events
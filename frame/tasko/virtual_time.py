@@ -0,0 +1,98 @@
+"""
+Simulated clock, for running the flight software faster than real time.
+
+While enabled, sleeping never blocks: the loop's idle sleep and time.sleep move the
+clock forward instead, so the loop jumps straight to the next sleeper's deadline.
+The time module is patched too, so code reading time.time()/time.monotonic() sees
+simulated time.
+
+Only usable where the time module can be patched (CPython emulation), and only
+affects modules that look the time functions up after enable() is called
+(`import time` is fine, `from time import monotonic` must happen after enable()).
+
+Use:
+    from tasko import virtual_time
+    clock = virtual_time.enable()
+    ...
+    virtual_time.disable()
+"""
+import time
+from . import loop
+
+# Functions of the time module that are replaced by the clock's
+_PATCHED = ('monotonic', 'monotonic_ns', 'time', 'localtime', 'sleep')
+_originals = None
+
+
+class VirtualClock:
+    """
+    A clock that only advances when something sleeps (or advance() is called).
+
+    :param start_nanos: The initial monotonic time in nanoseconds
+    :param epoch: The unix time corresponding to monotonic time 0
+    """
+
+    def __init__(self, start_nanos=0, epoch=None):
+        self.nanos = start_nanos
+        if epoch is None:
+            epoch = time.time() - start_nanos / 1000000000
+        self.epoch = epoch
+        self._localtime = time.localtime
+
+    def monotonic_ns(self):
+        return self.nanos
+
+    def monotonic(self):
+        return self.nanos / 1000000000
+
+    def time(self):
+        return self.epoch + self.nanos / 1000000000
+
+    def localtime(self, secs=None):
+        return self._localtime(self.time() if secs is None else secs)
+
+    def sleep(self, seconds):
+        """Advance the clock by at least seconds, without blocking"""
+        if seconds > 0:
+            # Round up so sleeping until a deadline never lands just short of it
+            nanos = seconds * 1000000000
+            whole = int(nanos)
+            self.nanos += whole if whole == nanos else whole + 1
+
+    advance = sleep
+
+
+def enable(clock=None):
+    """
+    Switch the loop and the time module over to a simulated clock.
+
+    :param clock: The clock to use, by default a VirtualClock starting at the current monotonic time
+    :returns: The clock in use
+    """
+    global _originals
+    if _originals is None:
+        _originals = {name: getattr(time, name) for name in _PATCHED}
+    if clock is None:
+        clock = VirtualClock(_originals['monotonic_ns']())
+
+    for name in _PATCHED:
+        setattr(time, name, getattr(clock, name))
+    loop.set_time_provider(clock.monotonic_ns)
+    loop.set_sleep_provider(clock.sleep)
+    return clock
+
+
+def disable():
+    """Restore the real clock"""
+    global _originals
+    if _originals is None:
+        return
+    for name, fn in _originals.items():
+        setattr(time, name, fn)
+    _originals = None
+    loop.set_time_provider(time.monotonic_ns)
+    loop.set_sleep_provider(time.sleep)
+
+
+def enabled():
+    return _originals is not None
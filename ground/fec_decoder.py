@@ -0,0 +1,157 @@
+"""
+Ground side of the forward error corrected file downlink (see radio_utils/fec_message.py in the
+flight software): collects the chunks of each transfer, rebuilds the data chunks lost from a block
+out of its parity chunks, and lists the blocks that lost too many to be rebuilt.
+
+Use:
+    decoder = FECDecoder()
+    for packet in downlinked_packets:
+        decoder.receive(packet)
+    if decoder.complete(transfer_id):
+        decoder.write(transfer_id, 'image.jpg')
+    else:
+        uplink(RESEND_FEC_BLOCKS + decoder.resend_args(transfer_id))
+"""
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'applications', 'flight', 'lib'))
+
+from radio_utils import headers  # noqa: E402
+from radio_utils.erasure_code import EXP, LOG, coefficient, gf_inv  # noqa: E402
+from radio_utils.fec_message import FEC_HEADER, FEC_HEADER_LEN, FEC_CHUNK_LEN  # noqa: E402
+
+
+def _mul(vector, c):
+    """vector * c, byte by byte"""
+    log_c = LOG[c]
+    return bytearray(EXP[LOG[v] + log_c] for v in vector)
+
+
+def _add_mul(vector, other, c):
+    """vector += other * c, byte by byte"""
+    log_c = LOG[c]
+    for b, v in enumerate(other):
+        vector[b] ^= EXP[LOG[v] + log_c]
+
+
+def decode(chunks, n):
+    """
+    The n data chunks of a block, from the chunks received of it (index -> chunk, all padded to
+    FEC_CHUNK_LEN), rebuilding the missing ones from parity chunks. None if too few were received.
+    """
+    missing = [i for i in range(n) if i not in chunks]
+    if not missing:
+        return [chunks[i] for i in range(n)]
+    parities = sorted(i - n for i in chunks if i >= n)[:len(missing)]
+    if len(parities) < len(missing):
+        return None
+    # parity j less the data chunks received is the sum of coefficient(j, i) * chunk i over the missing i,
+    # solved for the missing chunks by Gauss-Jordan elimination
+    rows = []
+    for j in parities:
+        rhs = bytearray(chunks[n + j])
+        for i in range(n):
+            if i in chunks:
+                _add_mul(rhs, chunks[i], coefficient(j, i))
+        rows.append([[coefficient(j, i) for i in missing], rhs])
+    for col in range(len(missing)):
+        pivot = next(r for r in range(col, len(rows)) if rows[r][0][col])
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        inv = gf_inv(rows[col][0][col])
+        rows[col] = [[EXP[LOG[c] + LOG[inv]] for c in rows[col][0]], _mul(rows[col][1], inv)]
+        for r in range(len(rows)):
+            c = rows[r][0][col]
+            if r != col and c:
+                rows[r][0] = [a ^ EXP[LOG[b] + LOG[c]] for a, b in zip(rows[r][0], rows[col][0])]
+                _add_mul(rows[r][1], rows[col][1], c)
+    data = dict(chunks)
+    for col, i in enumerate(missing):
+        data[i] = bytes(rows[col][1])
+    return [data[i] for i in range(n)]
+
+
+class FECTransfer:
+    """The chunks of one transfer received so far, by block"""
+
+    def __init__(self, transfer_id, size, data, parity):
+        self.transfer_id = transfer_id
+        self.size = size
+        self.data = data
+        self.parity = parity
+        self.chunk_count = max(1, (size + FEC_CHUNK_LEN - 1) // FEC_CHUNK_LEN)
+        self.block_count = (self.chunk_count + data - 1) // data
+        # block -> {index -> chunk padded to FEC_CHUNK_LEN}
+        self.received = {}
+        # block -> its data chunks, once decoded
+        self.decoded = {}
+
+    def block_data(self, block):
+        """Number of data chunks in block"""
+        return min(self.data, self.chunk_count - block * self.data)
+
+    def receive(self, block, index, chunk):
+        if block >= self.block_count or block in self.decoded:
+            return
+        chunks = self.received.setdefault(block, {})
+        chunks[index] = bytes(chunk) + bytes(FEC_CHUNK_LEN - len(chunk))
+        n = self.block_data(block)
+        if len(chunks) >= n:
+            data = decode(chunks, n)
+            if data is not None:
+                self.decoded[block] = data
+                del self.received[block]
+
+    def failed_blocks(self):
+        """The blocks that can't be decoded from what was received"""
+        return [block for block in range(self.block_count) if block not in self.decoded]
+
+    def complete(self):
+        return len(self.decoded) == self.block_count
+
+    def file_data(self):
+        data = b''.join(b''.join(self.decoded[block]) for block in range(self.block_count))
+        return data[:self.size]
+
+
+class FECDecoder:
+    def __init__(self):
+        # transfer id -> FECTransfer
+        self.transfers = {}
+
+    def receive(self, packet):
+        """Handle a downlinked packet (header byte included), packets of other messages are ignored"""
+        if len(packet) < 1 + FEC_HEADER_LEN or packet[0] != headers.FEC_CHUNK:
+            return
+        transfer_id, block, index, data, parity, size = struct.unpack_from(FEC_HEADER, packet, 1)
+        transfer = self.transfers.get(transfer_id)
+        if transfer is None or (transfer.size, transfer.data) != (size, data):
+            # a new transfer, or a transfer id reused after the satellite rebooted
+            transfer = self.transfers[transfer_id] = FECTransfer(transfer_id, size, data, parity)
+        transfer.receive(block, index, packet[1 + FEC_HEADER_LEN:])
+
+    def failed_blocks(self, transfer_id):
+        """The blocks of a transfer to request again, None if nothing of it was received"""
+        transfer = self.transfers.get(transfer_id)
+        return None if transfer is None else transfer.failed_blocks()
+
+    def resend_args(self, transfer_id, parity=None):
+        """Arguments of the RESEND_FEC_BLOCKS command for the failed blocks of a transfer,
+        sent again with parity chunks per block (as many as before by default)"""
+        transfer = self.transfers[transfer_id]
+        parity = transfer.parity if parity is None else parity
+        blocks = transfer.failed_blocks()
+        return struct.pack(f'>HBB{len(blocks)}H', transfer_id, transfer.data, parity, *blocks)
+
+    def complete(self, transfer_id):
+        transfer = self.transfers.get(transfer_id)
+        return transfer is not None and transfer.complete()
+
+    def data(self, transfer_id):
+        """The file sent by a complete transfer"""
+        return self.transfers[transfer_id].file_data()
+
+    def write(self, transfer_id, path):
+        with open(path, 'wb') as f:
+            f.write(self.data(transfer_id))
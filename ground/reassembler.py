@@ -0,0 +1,91 @@
+"""
+Ground side of the selective-repeat file downlink (see radio_utils/windowed_message.py in the
+flight software): collects the chunks of each transfer, answers every poll with the SACK to
+uplink, and puts the file back together once every chunk arrived.
+
+Use:
+    reassembler = Reassembler()
+    for packet in downlinked_packets:
+        sack = reassembler.receive(packet)
+        if sack is not None:
+            uplink(sack)
+    if reassembler.complete(transfer_id):
+        reassembler.write(transfer_id, 'file.bin')
+"""
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'applications', 'flight', 'lib'))
+
+from radio_utils import headers  # noqa: E402
+from radio_utils.windowed_message import CHUNK_HEADER, CHUNK_HEADER_LEN, WINDOW, pack_sack  # noqa: E402
+
+
+class Transfer:
+    """The chunks of one transfer received so far"""
+
+    def __init__(self, transfer_id, count):
+        self.transfer_id = transfer_id
+        self.count = count
+        # sequence number -> data
+        self.chunks = {}
+
+    def missing(self):
+        """Sequence numbers of the chunks not received yet"""
+        return [seq for seq in range(self.count) if seq not in self.chunks]
+
+    def base(self):
+        """The first missing chunk, count once complete"""
+        for seq in range(self.count):
+            if seq not in self.chunks:
+                return seq
+        return self.count
+
+    def complete(self):
+        return len(self.chunks) == self.count
+
+    def data(self):
+        return b''.join(self.chunks[seq] for seq in range(self.count))
+
+    def sack(self):
+        """The SACK packet for the chunks received so far, header included"""
+        base = self.base()
+        received = [seq for seq in range(base, min(base + WINDOW, self.count)) if seq in self.chunks]
+        return bytes([headers.SACK]) + pack_sack(self.transfer_id, base, received)
+
+
+class Reassembler:
+    def __init__(self):
+        # transfer id -> Transfer
+        self.transfers = {}
+
+    def receive(self, packet):
+        """
+        Handle a downlinked packet (header byte included), packets of other messages are ignored.
+        Returns the SACK packet to uplink if the packet asked for one, None otherwise.
+        """
+        if len(packet) < 1 + CHUNK_HEADER_LEN or packet[0] not in (headers.WINDOW_CHUNK, headers.WINDOW_POLL):
+            return None
+        transfer_id, seq, count = struct.unpack_from(CHUNK_HEADER, packet, 1)
+        transfer = self.transfers.get(transfer_id)
+        if transfer is None or transfer.count != count:
+            # a new transfer, or a transfer id reused after the satellite rebooted
+            transfer = self.transfers[transfer_id] = Transfer(transfer_id, count)
+        if seq < count:
+            transfer.chunks[seq] = bytes(packet[1 + CHUNK_HEADER_LEN:])
+        if packet[0] == headers.WINDOW_POLL:
+            return transfer.sack()
+        return None
+
+    def complete(self, transfer_id):
+        transfer = self.transfers.get(transfer_id)
+        return transfer is not None and transfer.complete()
+
+    def data(self, transfer_id):
+        """The file sent by a complete transfer"""
+        return self.transfers[transfer_id].data()
+
+    def write(self, transfer_id, path):
+        with open(path, 'wb') as f:
+            f.write(self.data(transfer_id))
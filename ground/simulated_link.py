@@ -0,0 +1,115 @@
+"""
+A simulated radio link between the flight software's downlink messages and the ground,
+for measuring transfers without hardware. Every packet is lost with probability `loss`,
+and the time each step takes on the air is added to a simulated clock.
+
+The timings follow the radio configuration of the PyCubed-Mini (LoRa SF7 at 125 kHz,
+ACK_WAIT 1 s, ACK_RETRIES 2, RECEIVE_TIMEOUT 2 s) and the radio task:
+- stop_and_wait() sends a message with send_with_ack for every packet, as the driver does:
+  a lost packet or ack costs ACK_WAIT, and a random backoff before the retry.
+- windowed() sends a WindowedMessage. Lost polls or SACKs cost RECEIVE_TIMEOUT, the time
+  the radio task listens for the SACK.
+- fec() sends an FECMessage without acks, then the ground uplinks RESEND_FEC_BLOCKS with the
+  blocks it couldn't decode. A lost command costs RECEIVE_TIMEOUT before the ground sends it again.
+"""
+import random
+
+from reassembler import Reassembler
+from fec_decoder import FECDecoder
+from radio_utils.windowed_message import unpack_sack
+from radio_utils.fec_message import FECMessage
+
+# LoRa SF7, 125 kHz, coding rate 4/5
+BITRATE = 5470
+# preamble, LoRa and RadioHead header, CRC
+PACKET_OVERHEAD = 17
+ACK_LEN = 5
+ACK_DELAY = 0.1
+ACK_WAIT = 1.0
+ACK_RETRIES = 2
+RECEIVE_TIMEOUT = 2.0
+# switching the radio between transmitting and receiving
+TURNAROUND = 0.01
+# command header, pass-code and command code
+COMMAND_OVERHEAD = 7
+
+
+class SimulatedLink:
+    def __init__(self, loss, seed=0):
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.seconds = 0.0
+        self.packets_sent = 0
+
+    def airtime(self, length):
+        return (length + PACKET_OVERHEAD) * 8 / BITRATE
+
+    def _transmit(self, length):
+        """Send length bytes, returns whether they arrived"""
+        self.seconds += self.airtime(length)
+        self.packets_sent += 1
+        return self.random.random() >= self.loss
+
+    def stop_and_wait(self, msg, received=None):
+        """Send msg packet by packet with send_with_ack until it is done, returns the seconds it took.
+        The payloads the ground received are appended to received (duplicates included)."""
+        while not msg.done():
+            packet, _ = msg.packet()
+            acked = False
+            for _ in range(ACK_RETRIES + 1):
+                arrived = self._transmit(len(packet))
+                if arrived and received is not None:
+                    received.append(bytes(packet))
+                if arrived:
+                    self.seconds += ACK_DELAY + TURNAROUND
+                    if self._transmit(ACK_LEN):
+                        acked = True
+                        break
+                self.seconds += ACK_WAIT
+                self.seconds += ACK_WAIT + ACK_WAIT * self.random.random()
+            if acked:
+                msg.ack()
+            else:
+                msg.no_ack()
+        return self.seconds
+
+    def windowed(self, msg, reassembler=None):
+        """Send a WindowedMessage until it is done, returns the seconds it took and the ground's Reassembler"""
+        if reassembler is None:
+            reassembler = Reassembler()
+        while not msg.done():
+            packet, _ = msg.packet()
+            sack = None
+            if self._transmit(len(packet)):
+                sack = reassembler.receive(packet)
+            if msg.ready():
+                continue
+            # the radio task listens for the SACK
+            self.seconds += TURNAROUND
+            if sack is not None and self._transmit(len(sack)):
+                _, base, bitmap = unpack_sack(sack[1:])
+                msg.sack(base, bitmap)
+            else:
+                self.seconds += RECEIVE_TIMEOUT
+                msg.no_ack()
+        return self.seconds, reassembler
+
+    def fec(self, msg, decoder=None):
+        """Send an FECMessage, and the blocks the ground asks for again until it has the file.
+        Returns the seconds it took and the ground's FECDecoder"""
+        if decoder is None:
+            decoder = FECDecoder()
+        while True:
+            while not msg.done():
+                packet, _ = msg.packet()
+                if self._transmit(len(packet)):
+                    decoder.receive(packet)
+            if decoder.complete(msg.transfer_id):
+                return self.seconds, decoder
+            failed = decoder.failed_blocks(msg.transfer_id)
+            args = 4 + 2 * (len(failed) if failed is not None else msg.record.count)
+            # the radio task listens once the message is sent
+            self.seconds += TURNAROUND
+            while not self._transmit(COMMAND_OVERHEAD + args):
+                self.seconds += RECEIVE_TIMEOUT
+            msg = FECMessage(msg.path, msg.data, msg.parity, msg.priority, None, msg.record, failed)
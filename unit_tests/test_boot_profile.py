@@ -0,0 +1,59 @@
+import unittest
+import sys
+
+sys.path.insert(0, './frame')
+
+import lib.boot_profile as boot_profile  # noqa: E402
+
+
+class BootProfileTests(unittest.TestCase):
+    def setUp(self):
+        # a fixed clock, advanced by the tests
+        self.now = 0
+        self._nanos = boot_profile._nanos
+        self.state = (boot_profile.start_nanos, boot_profile.phases, boot_profile.devices, boot_profile.boot_nanos)
+        boot_profile._nanos = lambda: self.now
+        boot_profile.start_nanos = 0
+        boot_profile.phases = []
+        boot_profile.devices = []
+        boot_profile.boot_nanos = None
+
+    def tearDown(self):
+        boot_profile._nanos = self._nanos
+        (boot_profile.start_nanos, boot_profile.phases, boot_profile.devices, boot_profile.boot_nanos) = self.state
+
+    def init(self, nanos, device):
+        self.now += nanos
+        return device
+
+    def test_report(self):
+        self.now = 2000000
+        boot_profile.mark('imports')
+        self.assertEqual('bus', boot_profile.timed_device('i2c1', self.init, 3000000, 'bus'))
+        self.assertIsNone(boot_profile.timed_device('imu', self.init, 1000000, None))
+        boot_profile.mark('devices')
+        self.assertIsNone(boot_profile.report()['total_ms'])
+        self.now += 4000000
+        boot_profile.finish()
+
+        report = boot_profile.report()
+        self.assertEqual(10, report['total_ms'])
+        self.assertEqual([['imports', 2], ['devices', 4], ['scheduled', 4]], report['phases'])
+        self.assertEqual([['i2c1', 3, True], ['imu', 1, False]], report['devices'])
+        self.assertEqual(['imu'], report['failed'])
+
+    def test_after_boot(self):
+        boot_profile.finish()
+        self.assertEqual('bus', boot_profile.timed_device('i2c1', self.init, 1000000, 'bus'))
+        boot_profile.mark('late')
+        self.assertEqual([], boot_profile.devices)
+        self.assertEqual(['scheduled'], [phase for phase, _ in boot_profile.phases])
+
+    def test_retried(self):
+        boot_profile.timed_device('radio', self.init, 0, None)
+        boot_profile.timed_device('radio', self.init, 0, 'radio')
+        self.assertEqual([], boot_profile.failed_devices())
+
+
+if __name__ == '__main__':
+    unittest.main()
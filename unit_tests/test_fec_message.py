@@ -0,0 +1,166 @@
+import os
+import random
+import shutil
+import sys
+import unittest
+
+sys.path.insert(0, './drivers/emulation/lib')
+sys.path.insert(0, './drivers/emulation/')
+sys.path.insert(0, './applications/flight')
+sys.path.insert(0, './applications/flight/lib')
+sys.path.insert(0, './frame/')
+sys.path.insert(0, './ground')
+
+from radio_utils.erasure_code import encode, gf_mul
+import radio_utils.fec_message as fec_message
+from radio_utils.fec_message import FECMessage, FEC_CHUNK_LEN, FEC_HEADER_LEN
+from radio_utils.transfer_index import TransferIndex
+from radio_utils.journaled_queue import JournaledQueue
+from radio_utils.transmission_queue import transmission_queue as tq
+from radio_utils.image_queue import image_queue as iq
+import radio_utils.headers as headers
+import radio_utils.commands as cdh
+from fec_decoder import FECDecoder, decode
+from simulated_link import SimulatedLink
+
+# relative, the emulated SD card maps absolute paths to ./sd
+DIRECTORY = 'test_fec'
+JOURNAL = 'test_fec_journal'
+PATH = 'test_fec_message.bin'
+
+class Task:
+    def debug(self, msg, level=1):
+        pass
+
+class FECMessageTests(unittest.TestCase):
+
+    def setUp(self):
+        # three blocks of 8, the last one with 3 chunks, the last chunk short
+        self.data = bytes(random.Random(0).randrange(256) for _ in range(FEC_CHUNK_LEN * 19 - 100))
+        with open(PATH, 'wb') as f:
+            f.write(self.data)
+        self.index = TransferIndex(DIRECTORY)
+
+    def tearDown(self):
+        os.remove(PATH)
+        shutil.rmtree(DIRECTORY, ignore_errors=True)
+        shutil.rmtree(JOURNAL, ignore_errors=True)
+
+    def send(self, msg, decoder, lose=()):
+        """Sends every packet of msg, losing those with the given (block, index), returns how many were sent"""
+        sent = 0
+        while not msg.done():
+            pkt, with_ack = msg.packet()
+            self.assertFalse(with_ack)
+            self.assertEqual(headers.FEC_CHUNK, pkt[0])
+            if (int.from_bytes(pkt[3:5], 'big'), pkt[5]) not in lose:
+                decoder.receive(pkt)
+            sent += 1
+        return sent
+
+    def test_erasure_code(self):
+        """Tests that any data chunks of a block are rebuilt from as many parity chunks"""
+        rng = random.Random(1)
+        chunks = [bytes(rng.randrange(256) for _ in range(FEC_CHUNK_LEN)) for _ in range(10)]
+        parity = [bytearray(FEC_CHUNK_LEN) for _ in range(4)]
+        encode(chunks, parity)
+        received = dict(enumerate(chunks + [bytes(p) for p in parity]))
+        for lost in ([0], [3, 9], [0, 1, 2, 3], [2, 5, 10, 13], list(range(10, 14))):
+            kept = {i: c for i, c in received.items() if i not in lost}
+            self.assertEqual(chunks, decode(kept, 10), f'lost {lost}')
+        self.assertIsNone(decode({i: c for i, c in received.items() if i > 4}, 10))
+
+    def test_gf_mul_zero(self):
+        """Tests that multiplying by 0 gives 0, whichever operands are 0"""
+        self.assertEqual(0, gf_mul(0, 0))
+        for a in range(1, 256):
+            self.assertEqual(0, gf_mul(a, 0))
+            self.assertEqual(0, gf_mul(0, a))
+            self.assertEqual(a, gf_mul(a, 1))
+
+    def test_lossy(self):
+        """Tests that lost chunks are rebuilt, and only the blocks that lost too many are sent again"""
+        msg = FECMessage(PATH, 8, 2, index=self.index)
+        decoder = FECDecoder()
+        lose = {(0, 1), (0, 9), (1, 0), (1, 2), (1, 3), (2, 2)}
+        self.assertEqual(3 * 2 + 19, self.send(msg, decoder, lose))
+        self.assertEqual([1], decoder.failed_blocks(msg.transfer_id))
+
+        resent = FECMessage(PATH, 8, 2, index=self.index, record=msg.record, blocks=[1])
+        self.assertEqual(10, self.send(resent, decoder, lose={(1, 0)}))
+        self.assertTrue(decoder.complete(msg.transfer_id))
+        self.assertEqual(self.data, decoder.data(msg.transfer_id))
+
+    def test_parity_encoded_per_packet(self):
+        """Tests that each packet encodes at most one parity chunk, rather than the block's at once"""
+        encoded = []
+        original = fec_message.encode_parity
+
+        def encode_parity(chunks, j, p):
+            encoded.append(j)
+            original(chunks, j, p)
+
+        fec_message.encode_parity = encode_parity
+        try:
+            msg = FECMessage(PATH, 8, 2, index=None)
+            per_packet = []
+            while not msg.done():
+                encoded.clear()
+                msg.packet()
+                per_packet.append(list(encoded))
+        finally:
+            fec_message.encode_parity = original
+        block = [[]] * 8 + [[0], [1]]
+        self.assertEqual(block + block + [[]] * 3 + [[0], [1]], per_packet)
+
+    def test_simulated_link(self):
+        """Tests that the file is decoded over a lossy link"""
+        for loss in (0.0, 0.3):
+            msg = FECMessage(PATH, index=None)
+            _, decoder = SimulatedLink(loss, seed=1).fec(msg)
+            self.assertEqual(self.data, decoder.data(msg.transfer_id))
+
+    def test_commands(self):
+        """Tests requesting an image, and the blocks that failed, by command"""
+        original = cdh.fec_index
+        cdh.fec_index = self.index
+        try:
+            tq.clear()
+            iq.push(PATH)
+            self.assertTrue(cdh.commands[cdh.REQUEST_IMAGE_FEC]['has_args'], 'the block size can be given')
+            cdh.request_image_fec(Task(), bytes([8, 2]))
+            self.assertTrue(iq.empty())
+            msg = tq.pop()
+            self.assertEqual((8, 2), (msg.data, msg.parity))
+            decoder = FECDecoder()
+            self.send(msg, decoder, lose={(2, i) for i in range(5)})
+
+            cdh.resend_fec_blocks(Task(), decoder.resend_args(msg.transfer_id, parity=4))
+            resent = tq.pop()
+            self.assertEqual(([2], 4), (resent.blocks, resent.parity))
+            self.assertEqual([2], self.index.load(msg.transfer_id).missing())
+            self.send(resent, decoder)
+            self.assertEqual(self.data, decoder.data(msg.transfer_id))
+
+            cdh.resend_fec_blocks(Task(), decoder.resend_args(msg.transfer_id))
+            self.assertTrue(tq.empty())
+            self.assertIsNone(self.index.load(msg.transfer_id), 'a complete transfer is forgotten')
+        finally:
+            cdh.fec_index = original
+
+    def test_journaled(self):
+        """Tests that the blocks still to send are queued again after a reset"""
+        q = JournaledQueue([], 10)
+        q.open_journal(JOURNAL)
+        msg = FECMessage(PATH, 8, 2, index=self.index, blocks=[0, 2])
+        q.push(msg)
+        rebooted = JournaledQueue([], 10)
+        rebooted.open_journal(JOURNAL)
+        restored = rebooted.pop()
+        self.assertEqual((msg.transfer_id, [0, 2], 8, 2),
+                         (restored.transfer_id, restored.blocks, restored.data, restored.parity))
+        self.assertEqual(1 + FEC_HEADER_LEN + FEC_CHUNK_LEN, len(restored.packet()[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import shutil
+import sys
+import unittest
+
+sys.path.insert(0, './applications/flight/lib')
+
+from radio_utils.journaled_queue import JournaledQueue, COMPACT_MIN, ACK_EVERY
+from radio_utils.message import Message
+from radio_utils.memory_buffered_message import MemoryBufferedMessage
+from radio_utils.disk_buffered_message import DiskBufferedMessage
+from radio_utils.windowed_message import WindowedMessage
+from radio_utils.transfer_index import TransferIndex
+
+# relative, the emulated SD card maps absolute paths to ./sd
+DIRECTORY = 'test_tq_journal'
+TRANSFERS = 'test_tq_journal_transfers'
+PATH = 'test_journaled_queue.bin'
+
+class JournaledQueueTests(unittest.TestCase):
+
+    def setUp(self):
+        with open(PATH, 'wb') as f:
+            f.write(bytes(range(256)) * 40)
+        self.q = JournaledQueue([], 100)
+        self.q.open_journal(DIRECTORY)
+
+    def tearDown(self):
+        os.remove(PATH)
+        shutil.rmtree(DIRECTORY, ignore_errors=True)
+        shutil.rmtree(TRANSFERS, ignore_errors=True)
+
+    def rebooted(self):
+        """A queue replaying the journal, as after a reset"""
+        q = JournaledQueue([], 100)
+        q.open_journal(DIRECTORY)
+        return q
+
+    def test_replay(self):
+        """Tests that pushed messages are queued again after a reset, without the popped ones"""
+        self.q.push(Message(3, b'\x00\xffbeacon', header=0x03))
+        self.q.push(Message(9, 'popped', with_ack=True))
+        self.q.push(MemoryBufferedMessage('memory'))
+        disk = DiskBufferedMessage(PATH)
+        self.q.push(disk)
+        self.assertEqual(b'popped', self.q.pop().str)
+
+        q = self.rebooted()
+        self.assertEqual(3, q.size())
+        msgs = sorted(q.queue, key=lambda msg: msg.priority)
+        self.assertEqual((1, PATH, 0), (msgs[0].priority, msgs[0].path, msgs[0].cursor))
+        self.assertEqual((2, b'memory'), (msgs[1].priority, msgs[1].str))
+        self.assertEqual((3, b'\x00\xffbeacon', 0x03, False),
+                         (msgs[2].priority, msgs[2].str, msgs[2].header, msgs[2].with_ack))
+
+    def test_acked(self):
+        """Tests that a buffered message resumes from its last journaled ack"""
+        disk = DiskBufferedMessage(PATH)
+        self.q.push(disk)
+        writes = self.q.writes
+        while disk.cursor < ACK_EVERY + 3 * disk.packet_len:
+            disk.ack()
+            self.q.acked(disk)
+        self.assertEqual(writes + 1, self.q.writes, 'acks are journaled once every ACK_EVERY bytes')
+        self.assertEqual((ACK_EVERY // disk.packet_len + 1) * disk.packet_len, self.rebooted().peek().cursor)
+
+    def test_bounded_writes(self):
+        """Tests that compaction keeps the journal, and what is written for it, within bounds"""
+        self.q.push(Message(1, 'stays queued'))
+        events = 0
+        for i in range(500):
+            msg = Message(5, f'response {i}')
+            self.q.push(msg)
+            self.q.pop()
+            events += 2
+        self.assertLess(self.q.bytes_written, 2 * events * 40)
+        for name in os.listdir(DIRECTORY):
+            self.assertLess(os.stat(f'{DIRECTORY}/{name}')[6], 2 * COMPACT_MIN)
+        self.assertEqual([b'stays queued'], [msg.str for msg in self.rebooted().queue])
+
+    def test_cut_short(self):
+        """Tests that a journal cut short by a reset replays what was written completely"""
+        self.q.push(Message(1, 'first'))
+        self.q.push(Message(2, 'second'))
+        with open(self.q._path, 'a') as f:
+            f.write('["pop", 0')
+        self.assertEqual(2, self.rebooted().size())
+
+    def test_cut_short_compaction(self):
+        """Tests that a reset while compacting replays the previous journal file"""
+        self.q.push(Message(1, 'first'))
+        self.q.push(Message(2, 'second'))
+        self.q.pop()
+        self.q.compact()
+        # the new file has no snapshot marker
+        with open(self.q._path, 'w') as f:
+            f.write(f'["gen", {self.q._generation}]\n["push", 0, ["m", 1, "", false, 0]]\n')
+        self.assertEqual([b'first'], [msg.str for msg in self.rebooted().queue])
+
+    def test_clear(self):
+        """Tests that a cleared queue stays cleared"""
+        self.q.push(Message(1, 'cleared'))
+        self.q.clear()
+        self.assertTrue(self.rebooted().empty())
+
+    def test_windowed(self):
+        """Tests that a windowed transfer is resumed from its transfer record"""
+        index = TransferIndex(TRANSFERS)
+        msg = WindowedMessage(PATH, priority=2, index=index)
+        msg.sack(5, b'\x00')
+        self.q.push(msg)
+        self.q.push(WindowedMessage(PATH, index=None))  # not recorded, it can't be resumed
+        [resumed] = self.rebooted().queue
+        self.assertEqual((msg.transfer_id, 2, 5), (resumed.transfer_id, resumed.priority, resumed.base))
+
+        os.remove(PATH)
+        self.assertTrue(self.rebooted().empty(), 'messages that can\'t be sent anymore are dropped')
+        with open(PATH, 'wb'):
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
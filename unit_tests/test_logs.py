@@ -8,9 +8,12 @@ sys.path.insert(0, './drivers/emulation/lib')
 sys.path.insert(0, './applications/flight')
 sys.path.insert(0, './frame')
 
-from lib.logs import telemetry_packet, unpack_telemetry
+from lib.logs import telemetry_packet, unpack_telemetry, profile_packet, unpack_profile, system_packet, unpack_system
 from pycubed import cubesat
 from state_machine import state_machine
+import lib.boot_profile as boot_profile
+import tasko
+from tasko.loop import set_time_provider
 
 class TestLogs(unittest.TestCase):
 
@@ -65,8 +68,19 @@ class TestLogs(unittest.TestCase):
 
         cubesat._luxp = array([lux_xp_in, lux_yp_in, lux_zp_in])
         cubesat._luxn = array([lux_xn_in, lux_yn_in, lux_zn_in])
-
-        pkt = telemetry_packet(time_in)
+        # read the sensors again, not the readings and samples of earlier tests
+        cubesat.imu_snapshot.invalidate()
+        cubesat.sun_snapshot.invalidate()
+        cubesat.battery.reset()
+
+        boot_nanos = boot_profile.boot_nanos
+        boot_profile.boot_nanos = 12345678901
+        boot_profile.devices.append(('sun_xp', 1000, False))
+        try:
+            pkt = telemetry_packet(time_in)
+        finally:
+            boot_profile.boot_nanos = boot_nanos
+            boot_profile.devices.pop()
 
         unpacked = unpack_telemetry(pkt)
 
@@ -87,6 +101,8 @@ class TestLogs(unittest.TestCase):
         self.assertAlmostEqual(fei_in, unpacked.beacon.FEI_Hz, places=5)
         testing.assert_array_almost_equal(gyro_in, unpacked.beacon.gyro)
         testing.assert_array_almost_equal(mag_in, unpacked.beacon.mag)
+        self.assertEqual(12345, unpacked.beacon.boot_ms)
+        self.assertEqual(1, unpacked.beacon.failed_device_count)
 
         """Tests System values"""
         self.assertAlmostEqual(lux_xp_in, unpacked.system.lux_xp, places=5)
@@ -95,3 +111,66 @@ class TestLogs(unittest.TestCase):
         self.assertAlmostEqual(lux_xn_in, unpacked.system.lux_xn, places=5)
         self.assertAlmostEqual(lux_yn_in, unpacked.system.lux_yn, places=5)
         self.assertAlmostEqual(lux_zn_in, unpacked.system.lux_zn, places=5)
+
+    def test_failing_sun_sensor(self):
+        class FailingSensor:
+            @property
+            def lux(self):
+                raise OSError('I2C timeout')
+
+        reset = []
+        satellite = type(cubesat)
+        sun_xp = satellite.sun_xp
+        satellite.sun_xp = property(lambda self: FailingSensor())
+        cubesat.reset_device = reset.append
+        cubesat.sun_snapshot.invalidate()
+        try:
+            unpacked = unpack_system(system_packet())
+            self.assertIsNone(cubesat.sun_vector)
+        finally:
+            satellite.sun_xp = sun_xp
+            del cubesat.reset_device
+            cubesat.sun_snapshot.invalidate()
+
+        self.assertTrue(unpacked.lux_xp != unpacked.lux_xp, 'a failing sensor reads nan')
+        self.assertAlmostEqual(cubesat._luxp[1], unpacked.lux_yp, places=5)
+        self.assertEqual(['sun_xp'], reset)
+
+    def test_profile(self):
+        loop = tasko.get_loop()
+        self.assertEqual([], unpack_profile(profile_packet()).task_profiles)
+
+        # a fixed clock, so the profile covers exactly 10 ms
+        now = time.monotonic_ns()
+        set_time_provider(lambda: now)
+        loop.enable_profiling()
+        try:
+            loop.stats.start_nanos -= 10000000  # 10 ms
+            loop.stats.idle_nanos = 5000000
+            loop.stats.task_nanos = 4000000
+            loop.stats.coalesced_wakeups = 3
+            worker = loop.stats.task('worker')
+            for us in range(1, 11):
+                worker.record(us * 1000, 0, False)
+            worker.record(10000, 3000000, True)
+            loop.stats.task('idle').record(500, 0, False)
+
+            unpacked = unpack_profile(profile_packet())
+        finally:
+            loop.enable_profiling(False)
+            set_time_provider(time.monotonic_ns)
+
+        self.assertEqual(500, unpacked.idle_permille)
+        self.assertEqual(100, unpacked.overhead_permille)
+        self.assertEqual(18000, unpacked.coalesced_per_minute)
+        self.assertEqual(2, len(unpacked.task_profiles))
+        (worker_profile, idle_profile) = unpacked.task_profiles
+        self.assertEqual('work', worker_profile.name)
+        self.assertEqual(11, worker_profile.runs)
+        self.assertEqual(5, worker_profile.mean_us)
+        self.assertEqual(10, worker_profile.max_us)
+        self.assertEqual(3, worker_profile.max_late_ms)
+        self.assertEqual(1, worker_profile.overruns)
+        self.assertEqual(0, worker_profile.missed)
+        self.assertEqual('idle', idle_profile.name)
+        self.assertEqual(1, idle_profile.runs)
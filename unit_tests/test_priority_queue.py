@@ -79,3 +79,15 @@ class Tests(unittest.TestCase):
         self.assertEqual(4, h.pop())
         self.assertEqual(3, h.pop())
         self.assertEqual(0, h.pop())
+
+    def test_remove(self):
+        h = PriorityQueue([], 10)
+        items = [msg(p, 'x') for p in [5, 3, 5, 1, 4, 3]]
+        for item in items:
+            h.push(item)
+        h.remove(items[2])
+        self.assertTrue(isHeap(h.queue))
+        self.assertEqual(5, h.size())
+        self.assertIn(items[0], h.queue)
+        self.assertFalse(any(item is items[2] for item in h.queue), 'the item itself, not an equal one')
+        self.assertRaises(ValueError, h.remove, items[2])
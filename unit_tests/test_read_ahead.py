@@ -0,0 +1,89 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, './applications/flight/lib/')
+
+from radio_utils.read_ahead import ReadAhead, read_ahead
+from radio_utils.disk_buffered_message import DiskBufferedMessage
+import radio_utils.headers as headers
+
+packet_len = DiskBufferedMessage.packet_len
+
+class ReadAheadTests(unittest.TestCase):
+
+    def setUp(self):
+        # relative paths, the emulated SD card maps absolute ones to ./sd
+        self.paths = []
+        self.data = bytes(i % 251 for i in range(10000))
+        self.path = self.write('file', self.data)
+
+    def tearDown(self):
+        read_ahead.clear()
+        for path in self.paths:
+            os.remove(path)
+
+    def write(self, name, data):
+        path = f'test_read_ahead_{name}.bin'
+        with open(path, 'wb') as f:
+            f.write(data)
+        self.paths.append(path)
+        return path
+
+    def test_reads_blocks(self):
+        """Tests that sequential reads are served from one block read per block"""
+        cache = ReadAhead(max_files=1, block_size=1024)
+        offset = 0
+        while offset < len(self.data):
+            self.assertEqual(self.data[offset:offset + 100], bytes(cache.read(self.path, offset, 100)))
+            offset += 100
+        self.assertEqual(1, cache.opens)
+        self.assertEqual(10, cache.block_reads)
+        self.assertEqual(b'', bytes(cache.read(self.path, len(self.data), 100)))
+        # a retry of the last packet is served from the buffer
+        self.assertEqual(self.data[9900:], bytes(cache.read(self.path, 9900, 100)))
+        self.assertEqual(10, cache.block_reads)
+        cache.clear()
+
+    def test_evicts_least_recently_read(self):
+        """Tests that the least recently read file is closed for a new one"""
+        other = self.write('other', b'other')
+        third = self.write('third', b'third')
+        cache = ReadAhead(max_files=2, block_size=1024)
+        cache.read(self.path, 0, 10)
+        cache.read(other, 0, 10)
+        cache.read(self.path, 10, 10)
+        self.assertEqual(b'third', bytes(cache.read(third, 0, 10)))
+        self.assertEqual([self.path, third], [entry.path for entry in cache._files])
+        cache.close(self.path)
+        self.assertEqual([third], [entry.path for entry in cache._files])
+        cache.clear()
+        self.assertEqual([], cache._files)
+
+    def test_uncached(self):
+        """Tests that max_files 0 reads straight from the file"""
+        cache = ReadAhead(max_files=0)
+        self.assertEqual(self.data[5:15], bytes(cache.read(self.path, 5, 10)))
+        self.assertEqual([], cache._files)
+
+    def test_disk_buffered_message(self):
+        """Tests that a message is sent from the read-ahead, and closes its file when done"""
+        msg = DiskBufferedMessage(self.path)
+        received = b''
+        headers_sent = []
+        while not msg.done():
+            pkt, _ = msg.packet()
+            # a retry after a missing ack sends the same packet again
+            msg.no_ack()
+            self.assertEqual(pkt, msg.packet()[0])
+            headers_sent.append(pkt[0])
+            received += pkt[1:]
+            msg.ack()
+        self.assertEqual(self.data, received)
+        self.assertEqual(headers.DISK_BUFFERED_START, headers_sent[0])
+        self.assertEqual(headers.DISK_BUFFERED_END, headers_sent[-1])
+        self.assertEqual([], read_ahead._files, 'the file should be closed once the message is done')
+
+
+if __name__ == '__main__':
+    unittest.main()
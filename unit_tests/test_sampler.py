@@ -0,0 +1,92 @@
+import unittest
+import sys
+import time
+
+sys.path.insert(0, './frame')
+
+from lib.sampler import Sampler  # noqa: E402
+
+
+class SamplerTests(unittest.TestCase):
+    def setUp(self):
+        # a fixed clock, advanced by the tests
+        self.now = 0
+        self.monotonic_ns = time.monotonic_ns
+        time.monotonic_ns = lambda: self.now
+        self.voltages = []
+
+    def tearDown(self):
+        time.monotonic_ns = self.monotonic_ns
+
+    def read(self):
+        return self.voltages.pop(0)
+
+    def sample_every_second(self, sampler, voltages):
+        self.voltages += voltages
+        for _ in voltages:
+            self.now += 1000000000
+            sampler.sample()
+
+    def test_filter(self):
+        sampler = Sampler(self.read, size=4, alpha=0.5)
+        self.voltages.append(4.0)
+        self.assertEqual(4.0, sampler.latest(), 'sampled on the first read')
+        self.sample_every_second(sampler, [5.0, 5.0])
+        self.assertEqual(4.75, sampler.latest())
+        self.assertEqual(2000000000, sampler.nanos)
+        self.assertEqual(4.0, sampler.min())
+        self.assertEqual(5.0, sampler.max())
+
+    def test_ring(self):
+        sampler = Sampler(self.read, size=3)
+        self.assertIsNone(sampler.min())
+        self.assertEqual(0.0, sampler.trend())
+        self.sample_every_second(sampler, [3.0, 4.0, 5.0, 6.0, 7.0])
+        self.assertEqual(3, sampler.count)
+        self.assertEqual(5.0, sampler.min(), 'the oldest samples are dropped')
+        self.assertEqual(7.0, sampler.max())
+        self.assertAlmostEqual(1.0, sampler.trend(), places=5)
+
+    def test_falling_trend(self):
+        sampler = Sampler(self.read)
+        self.sample_every_second(sampler, [4.2, 4.1, 4.15, 4.0, 3.9])
+        self.assertLess(sampler.trend(), -0.05)
+
+    def test_trend_after_long_uptime(self):
+        """Tests that the trend keeps its resolution after days of uptime, and across the millisecond wrap"""
+        for start_seconds in (10000000, 2 ** 32 // 1000 - 1):
+            sampler = Sampler(self.read, size=4)
+            self.now = start_seconds * 1000000000
+            self.voltages += [4.0, 4.05, 4.1, 4.15]
+            for _ in range(4):
+                self.now += 500000000
+                sampler.sample()
+            self.assertAlmostEqual(0.1, sampler.trend(), places=3, msg=f'started at {start_seconds} s')
+
+    def test_failed_read(self):
+        """Tests that a read that raises in the background keeps the last sample rather than raising"""
+        sampler = Sampler(self.read, size=4)
+        self.sample_every_second(sampler, [4.0])
+
+        def fail():
+            raise OSError('ADC read failed')
+
+        sampler.read = fail
+        run = sampler.run()
+        with self.assertRaises(StopIteration):
+            run.send(None)
+        self.assertEqual(1, sampler.errors)
+        self.assertEqual(4.0, sampler.latest())
+        self.assertEqual(1, sampler.count)
+
+    def test_reset(self):
+        sampler = Sampler(self.read, alpha=0.1)
+        self.sample_every_second(sampler, [4.0, 4.0])
+        sampler.reset()
+        self.voltages.append(3.0)
+        self.assertEqual(3.0, sampler.latest())
+        self.assertEqual(1, sampler.count)
+
+
+if __name__ == '__main__':
+    unittest.main()
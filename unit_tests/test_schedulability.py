@@ -0,0 +1,59 @@
+import unittest
+import sys
+
+sys.path.insert(0, './frame')
+
+from lib.schedulability import analyze, format_report  # noqa: E402
+from lib.state_machine_utils import validate_policy  # noqa: E402
+from tasko.loop import POLICY_PRIORITY, POLICY_EDF  # noqa: E402
+
+TASKS = [
+    # name, interval, cost, priority
+    ('a', 1.0, 0.2, 0.0),
+    ('b', 2.0, 0.5, 1.0),
+    ('c', 4.0, 0.3, 2.0),
+]
+
+
+class SchedulabilityTests(unittest.TestCase):
+    def test_priority(self):
+        report = analyze(TASKS, POLICY_PRIORITY)
+        self.assertAlmostEqual(0.525, report['utilization'])
+        self.assertTrue(report['schedulable'])
+        responses = [row['response'] for row in report['tasks']]
+        # a is blocked by b, b is blocked by c and waits for a, c waits for a and b
+        for expected, response in zip([0.7, 1.0, 1.0], responses):
+            self.assertAlmostEqual(expected, response)
+
+    def test_priority_miss(self):
+        report = analyze([('a', 1.0, 0.6, 0.0), ('b', 2.0, 0.5, 1.0)], POLICY_PRIORITY)
+        self.assertFalse(report['schedulable'])
+        self.assertEqual([False, True], [row['ok'] for row in report['tasks']],
+                         'one iteration of b can hold a back past its interval')
+        self.assertIn('a: 600.0ms every 1.0s (60.0%), misses its interval', format_report(report))
+
+    def test_edf(self):
+        report = analyze([('a', 1.0, 0.2, 0.0), ('b', 2.0, 0.4, 1.0), ('c', 4.0, 0.2, 2.0)], POLICY_EDF)
+        self.assertAlmostEqual(0.45, report['utilization'])
+        self.assertTrue(report['schedulable'])
+        self.assertEqual([None, None, None], [row['response'] for row in report['tasks']])
+
+        report = analyze([('a', 1.0, 0.6, 0.0), ('b', 2.0, 0.5, 1.0)], POLICY_EDF)
+        self.assertFalse(report['schedulable'])
+
+    def test_not_measured(self):
+        report = analyze(TASKS + [('d', 1.0, None, 0.0)], POLICY_PRIORITY)
+        self.assertTrue(report['schedulable'])
+        self.assertIsNone(report['tasks'][3]['ok'])
+        self.assertIn('d: not measured', format_report(report))
+
+    def test_validate_policy(self):
+        validate_policy('edf', 0)
+        validate_policy('priority', 1.5)
+        self.assertRaises(ValueError, validate_policy, 'fifo', 0)
+        self.assertRaises(ValueError, validate_policy, 'priority', -1)
+        self.assertRaises(ValueError, validate_policy, 'priority', '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import sys
+import time
+
+sys.path.insert(0, './frame')
+
+from lib.snapshot import Snapshot  # noqa: E402
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        # a fixed clock, advanced by the tests
+        self.now = 0
+        self.monotonic_ns = time.monotonic_ns
+        time.monotonic_ns = lambda: self.now
+        self.reads = 0
+
+    def tearDown(self):
+        time.monotonic_ns = self.monotonic_ns
+
+    def read(self):
+        self.reads += 1
+        return (self.reads, -self.reads)
+
+    def test_reused_within_max_age(self):
+        snapshot = Snapshot(self.read, 0.05)
+        self.assertEqual((0, (1, -1)), snapshot.get())
+        self.now = 50000000
+        self.assertEqual((0, (1, -1)), snapshot.get())
+        self.assertEqual((1, -1), snapshot.values())
+        self.now = 50000001
+        self.assertEqual((50000001, (2, -2)), snapshot.get())
+        self.assertEqual(2, self.reads)
+
+    def test_max_age(self):
+        snapshot = Snapshot(self.read, 1)
+        snapshot.get()
+        self.now = 10000000
+        self.assertEqual((1, -1), snapshot.values(max_age=0.5))
+        self.assertEqual((2, -2), snapshot.values(max_age=0))
+
+    def test_invalidate(self):
+        snapshot = Snapshot(self.read, 1)
+        snapshot.get()
+        snapshot.invalidate()
+        self.assertEqual((0, (2, -2)), snapshot.get())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,18 @@
 import unittest
 import sys
+import time
+import types
 
+sys.path.insert(0, './drivers/emulation')
+sys.path.insert(0, './drivers/emulation/lib')
 sys.path.insert(0, './frame')
+sys.path.insert(0, './buildtools')
 
-from lib.state_machine_utils import validate_config
+from lib.state_machine_utils import validate_config, compile_config
+from state_machine import StateMachine
+import tasko
+from tasko.loop import set_time_provider
+from compile_config import source
 
 basicTM = {
     't1': True,
@@ -353,6 +362,104 @@ tests = [
         'Valid': False,
         'Title': 'Wrong Type For N->Tasks->t1->ScheduleLater',
     },
+    {
+        'TaskMap': basicTM,
+        'TransitionFunctionMap': basicTFM,
+        'config': {
+            'N': {
+                'Tasks': {
+                    't1': {
+                        'Interval': 10,
+                        'Priority': 3,
+                        'CatchUp': 'burst'
+                    },
+                },
+                'StepsTo': [],
+            },
+        },
+        'Valid': True,
+        'Title': 'CatchUp Policy',
+    },
+    {
+        'TaskMap': basicTM,
+        'TransitionFunctionMap': basicTFM,
+        'config': {
+            'N': {
+                'Tasks': {
+                    't1': {
+                        'Interval': 10,
+                        'Priority': 3,
+                        'CatchUp': 'sometimes'
+                    },
+                },
+                'StepsTo': [],
+            },
+        },
+        'Valid': False,
+        'Title': 'Unknown N->Tasks->t1->CatchUp policy',
+    },
+    {
+        'TaskMap': basicTM,
+        'TransitionFunctionMap': basicTFM,
+        'config': {
+            'N': {
+                'Tasks': {
+                    't1': {
+                        'Interval': 10,
+                        'Priority': 3,
+                        'Slack': 1
+                    },
+                },
+                'StepsTo': [],
+            },
+        },
+        'Valid': True,
+        'Title': 'Slack',
+    },
+    {
+        'TaskMap': basicTM,
+        'TransitionFunctionMap': basicTFM,
+        'config': {
+            'N': {
+                'Tasks': {
+                    't1': {
+                        'Interval': 10,
+                        'Priority': 3,
+                        'Slack': '1s'
+                    },
+                },
+                'StepsTo': [],
+            },
+        },
+        'Valid': False,
+        'Title': 'Wrong Type For N->Tasks->t1->Slack',
+    },
+    {
+        'TaskMap': basicTM,
+        'TransitionFunctionMap': basicTFM,
+        'config': {
+            'N': {
+                'Tasks': {},
+                'StepsTo': [],
+                'IdleSlack': 1,
+            },
+        },
+        'Valid': True,
+        'Title': 'IdleSlack',
+    },
+    {
+        'TaskMap': basicTM,
+        'TransitionFunctionMap': basicTFM,
+        'config': {
+            'N': {
+                'Tasks': {},
+                'StepsTo': [],
+                'IdleSlack': -0.5,
+            },
+        },
+        'Valid': False,
+        'Title': 'Negative N->IdleSlack',
+    },
 ]
 
 
@@ -366,3 +473,218 @@ class TestValidateConfig(unittest.TestCase):
                 self.assertTrue(not v['Valid'], msg=f'{v["Title"]} should have no error, but it raised error: {err}')
                 continue
             self.assertTrue(v['Valid'], msg=f'{v["Title"]} should have raised an error')
+
+
+class Task:
+    async def _run(self):
+        pass
+
+
+class TestSwitchTo(unittest.TestCase):
+
+    def setUp(self):
+        config = {
+            'A': {
+                'Tasks': {
+                    'shared': {'Interval': 1, 'Priority': 1},
+                    'changed': {'Interval': 1, 'Priority': 1},
+                    'only_a': {'Interval': 1, 'Priority': 1},
+                },
+                'StepsTo': ['B'],
+            },
+            'B': {
+                'Tasks': {
+                    'shared': {'Interval': 1, 'Priority': 1},
+                    'changed': {'Interval': 4, 'Priority': 2},
+                    'only_b': {'Interval': 1, 'Priority': 1},
+                },
+                'StepsTo': ['A'],
+            },
+        }
+        task_map = {name: Task for name in ['shared', 'changed', 'only_a', 'only_b']}
+        self.machine = StateMachine()
+        self.machine.load(compile_config(config, task_map, {}), task_map)
+        self.machine.state, self.machine.state_id = 'A', 0
+        self.machine.switch_to('A', force=True)
+
+    def tearDown(self):
+        self.machine.stop_all()
+        tasko.get_loop()._step()
+
+    def test_shared_tasks_keep_running(self):
+        before = self.machine.scheduled_tasks
+        self.machine.switch_to('B')
+        after = self.machine.scheduled_tasks
+
+        self.assertIs(before['shared'], after['shared'])
+        self.assertIs(before['changed'], after['changed'])
+        self.assertEqual(4000000000, after['changed']._nanoseconds_per_invocation)
+        self.assertEqual(2, after['changed']._task.priority)
+        self.assertEqual(['shared', 'changed', 'only_b'], list(after))
+        self.assertEqual('only_b', after['only_b'].name)
+        self.assertTrue(before['only_a']._stop, 'tasks not in the new state should be stopped')
+        self.assertFalse(after['shared']._stop)
+
+
+class TestSwitchRates(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.runs = {'radio': [], 'later': []}
+        set_time_provider(lambda: self.now)
+        tasko.get_loop().set_idle(self.idle)
+
+        runs = self.runs
+
+        class Radio:
+            async def _run(self):
+                runs['radio'].append(tasko.loop._monotonic_ns() / 1e9)
+
+        class Later:
+            async def _run(self):
+                runs['later'].append(tasko.loop._monotonic_ns() / 1e9)
+
+        config = {
+            'Deployment': {
+                'Tasks': {
+                    'radio': {'Interval': 30, 'Priority': 1},
+                    'later': {'Interval': 1, 'Priority': 2},
+                },
+                'StepsTo': ['Normal'],
+            },
+            'Normal': {
+                'Tasks': {
+                    'radio': {'Interval': 0.01, 'Priority': 1},
+                    'later': {'Interval': 1, 'Priority': 2, 'ScheduleLater': True},
+                },
+                'StepsTo': [],
+            },
+        }
+        task_map = {'radio': Radio, 'later': Later}
+        self.machine = StateMachine()
+        self.machine.load(compile_config(config, task_map, {}), task_map)
+        self.machine.state, self.machine.state_id = 'Deployment', 0
+
+    def tearDown(self):
+        self.machine.stop_all()
+        tasko.get_loop()._step()
+        tasko.get_loop().set_idle(None)
+        set_time_provider(time.monotonic_ns)
+
+    def idle(self, seconds):
+        self.now += round(seconds * 1000000000)
+
+    def test_shorter_interval_runs_sooner(self):
+        loop = tasko.get_loop()
+        self.machine.switch_to('Deployment', force=True)
+        loop._step()
+        self.now = 1000000000
+        before = dict(self.machine.scheduled_tasks)
+        self.machine.switch_to('Normal')
+        after = self.machine.scheduled_tasks
+        while len(self.runs['radio']) < 4:
+            loop._step()
+        self.assertEqual([0.0, 1.0, 1.01, 1.02], [round(t, 3) for t in self.runs['radio']],
+                         'radio should not wait for its deadline at the Deployment interval')
+        self.assertIs(before['radio'], after['radio'])
+
+        self.assertIsNot(before['later'], after['later'], 'a task scheduled later in the new state is restarted')
+        self.assertTrue(before['later']._stop)
+        while len(self.runs['later']) < 2:
+            loop._step()
+        self.assertEqual([0.0, 2.0], [round(t, 3) for t in self.runs['later']])
+
+
+class TestLazyTasks(unittest.TestCase):
+
+    def setUp(self):
+        # stands in for a Tasks module
+        self.module = types.ModuleType('lazy_tasks')
+        self.module.Task = Task
+        sys.modules['lazy_tasks'] = self.module
+        config = {
+            'A': {
+                'Tasks': {
+                    'shared': {'Interval': 1, 'Priority': 1},
+                    'only_a': {'Interval': 1, 'Priority': 1},
+                },
+                'StepsTo': ['B'],
+            },
+            'B': {
+                'Tasks': {
+                    'shared': {'Interval': 1, 'Priority': 1},
+                },
+                'StepsTo': [],
+            },
+        }
+        task_map = {'shared': Task, 'only_a': 'lazy_tasks.Task'}
+        self.machine = StateMachine()
+        self.machine.load(compile_config(config, task_map, {}), task_map, release_tasks=True)
+        self.machine.state, self.machine.state_id = 'A', 0
+
+    def tearDown(self):
+        sys.modules.pop('lazy_tasks', None)
+        self.machine.stop_all()
+        tasko.get_loop()._step()
+
+    def test_lazy_and_release(self):
+        self.machine.switch_to('A', force=True)
+        self.assertIsInstance(self.machine.tasks['only_a'], Task, 'should be constructed once needed')
+
+        self.machine.switch_to('B')
+        self.assertEqual(['shared'], list(self.machine.tasks), 'A can not be reached from B anymore')
+        self.assertNotIn('lazy_tasks', sys.modules)
+
+
+def enter(source, destination, cubesat):
+    pass
+
+
+def leave(source, destination, cubesat):
+    pass
+
+
+class TestCompileConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.config = {
+            'A': {
+                'Tasks': {'t1': {'Interval': 1, 'Priority': 1, 'Slack': 0.5}},
+                'StepsTo': ['B'],
+                'ExitFunctions': ['leave'],
+            },
+            'B': {
+                'Tasks': {'t2': {'Interval': 2, 'Priority': 3, 'CatchUp': 'skip'}},
+                'StepsTo': ['A', 'C'],
+                'EnterFunctions': ['enter'],
+                'IdleSlack': 0.1,
+            },
+            'C': {
+                'Tasks': {'t3': {'Interval': 3, 'Priority': 0, 'ScheduleLater': True}},
+                'StepsTo': [],
+            },
+        }
+        self.task_map = {'t1': Task, 't2': Task, 't3': Task}
+        self.functions = {'enter': enter, 'leave': leave}
+
+    def test_compile(self):
+        compiled = compile_config(self.config, self.task_map, self.functions)
+        self.assertEqual(('A', 'B', 'C'), compiled.states)
+        self.assertEqual((0b010, 0b101, 0b000), compiled.steps_to)
+        self.assertEqual(((), (enter,), ()), compiled.enter_functions)
+        self.assertEqual(((leave,), (), ()), compiled.exit_functions)
+        self.assertEqual((0.0, 0.1, 0.0), compiled.idle_slack)
+        self.assertEqual((('t2', 2.0, 3.0, False, 'skip', 0.0),), compiled.tasks[1])
+        self.assertEqual({'t1', 't2', 't3'}, compiled.reachable_tasks(0))
+        self.assertEqual({'t3'}, compiled.reachable_tasks(2))
+
+    def test_unknown_function(self):
+        self.assertRaises(ValueError, compile_config, self.config, self.task_map, {'enter': enter})
+
+    def test_generated_module(self):
+        compiled = compile_config(self.config, self.task_map, self.functions)
+        namespace = {}
+        exec(source(compiled), namespace)
+        generated = namespace['compiled']
+        for table in ['states', 'steps_to', 'enter_functions', 'exit_functions', 'idle_slack', 'tasks']:
+            self.assertEqual(getattr(compiled, table), getattr(generated, table))
@@ -0,0 +1,157 @@
+import json
+import os
+import shutil
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, './drivers/emulation/lib')
+sys.path.insert(0, './drivers/emulation/')
+sys.path.insert(0, './applications/flight')
+sys.path.insert(0, './applications/flight/lib')
+sys.path.insert(0, './frame/')
+sys.path.insert(0, './ground')
+
+from radio_utils.transfer_index import TransferIndex, TransferRecord, file_crc
+from radio_utils.windowed_message import WindowedMessage, CHUNK_LEN, WINDOW, unpack_sack
+from radio_utils.transmission_queue import transmission_queue as tq
+from radio_utils.disk_buffered_message import DiskBufferedMessage
+import radio_utils.commands as cdh
+from reassembler import Reassembler
+
+# relative, the emulated SD card maps absolute paths to ./sd
+DIRECTORY = 'test_transfers'
+PATH = 'test_transfer_index.bin'
+
+class Task:
+    def debug(self, msg, level=1):
+        pass
+
+def downlinked(msg):
+    """What a response downlinks, from the SD card or from memory"""
+    if isinstance(msg, DiskBufferedMessage):
+        with open(msg.path, 'rb') as f:
+            data = f.read()
+        os.remove(msg.path)
+        return data
+    return msg.str
+
+class TransferIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.data = bytes(i % 247 for i in range(CHUNK_LEN * (3 * WINDOW) + 11))
+        with open(PATH, 'wb') as f:
+            f.write(self.data)
+        self.index = TransferIndex(DIRECTORY)
+
+    def tearDown(self):
+        os.remove(PATH)
+        shutil.rmtree(DIRECTORY, ignore_errors=True)
+
+    def send_round(self, msg, reassembler, lose=()):
+        """Sends a round of packets, losing those with the given sequence numbers, and acks it"""
+        sack = None
+        while msg.ready():
+            pkt, _ = msg.packet()
+            if int.from_bytes(pkt[3:5], 'big') not in lose:
+                sack = reassembler.receive(pkt)
+        if sack is None:
+            msg.no_ack()
+        else:
+            msg.sack(*unpack_sack(sack[1:])[1:])
+
+    def test_record(self):
+        """Tests that a record survives packing, and lists its missing chunks"""
+        record = TransferRecord(7, '/sd/images/1.jpg', 1000, 0xdeadbeef, 12)
+        for seq in (0, 1, 2, 5, 9):
+            record.acked[seq >> 3] |= 1 << (seq & 7)
+        unpacked = TransferRecord.unpack(record.pack())
+        self.assertEqual((7, '/sd/images/1.jpg', 1000, 0xdeadbeef, 12),
+                         (unpacked.transfer_id, unpacked.path, unpacked.size, unpacked.crc, unpacked.count))
+        self.assertEqual([[3, 4], [6, 8], [10, 11]], unpacked.missing_ranges())
+        self.assertRaises(ValueError, TransferRecord.unpack, record.pack()[:-1])
+
+    def test_next_id(self):
+        """Tests that transfer ids are not reused after a reboot"""
+        self.assertEqual([0, 1], [self.index.next_id(), self.index.next_id()])
+        self.assertEqual(2, TransferIndex(DIRECTORY).next_id())
+
+    def test_resume(self):
+        """Tests that a transfer cut short resumes with only the missing chunks, from a fresh index"""
+        msg = WindowedMessage(PATH, index=self.index)
+        self.assertEqual(file_crc(PATH), self.index.load(msg.transfer_id).crc)
+        reassembler = Reassembler()
+        self.send_round(msg, reassembler, lose=(4,))
+        self.send_round(msg, reassembler, lose=(WINDOW + 1,))
+        missing = [WINDOW + 1] + list(range(WINDOW + 4, msg.count))
+        self.assertEqual(missing, self.index.load(msg.transfer_id).missing())
+
+        # rebooted
+        index = TransferIndex(DIRECTORY)
+        [record] = index.records()
+        self.assertFalse(record.changed())
+        resumed = WindowedMessage.resume(record, index=index)
+        self.assertEqual((msg.transfer_id, WINDOW + 1), (resumed.transfer_id, resumed.base))
+        sent = []
+        while not resumed.done():
+            sack = None
+            while resumed.ready():
+                pkt, _ = resumed.packet()
+                sent.append(int.from_bytes(pkt[3:5], 'big'))
+                sack = reassembler.receive(pkt)
+            resumed.sack(*unpack_sack(sack[1:])[1:])
+        self.assertEqual(missing, sent, 'only the missing chunks are sent')
+        self.assertEqual(self.data, reassembler.data(msg.transfer_id))
+        self.assertEqual([], index.records(), 'a complete transfer is removed from the index')
+
+    def test_done_packet(self):
+        """Tests that a message with every chunk acked still sends a poll rather than failing"""
+        record = TransferRecord(0, PATH, len(self.data), 0, 3)
+        msg = WindowedMessage.resume(record, 3, index=None)
+        self.assertTrue(msg.done())
+        pkt, _ = msg.packet()
+        self.assertEqual((0, 2, 3), struct.unpack_from('>HHH', pkt, 1), 'polls with the last chunk')
+
+    def test_changed(self):
+        """Tests that a record notices its file changed"""
+        msg = WindowedMessage(PATH, index=self.index)
+        with open(PATH, 'r+b') as f:
+            f.write(b'changed')
+        self.assertTrue(self.index.load(msg.transfer_id).changed())
+
+    def test_commands(self):
+        """Tests resuming from a given chunk and listing the missing chunks by command"""
+        original = cdh.transfer_index
+        cdh.transfer_index = self.index
+        try:
+            tq.clear()
+            msg = WindowedMessage(PATH, index=self.index)
+            self.send_round(msg, Reassembler(), lose=(1, 2, 3))
+
+            cdh.list_missing(Task(), struct.pack('>H', msg.transfer_id))
+            missing = json.loads(downlinked(tq.pop()))
+            self.assertEqual([[1, 3], [WINDOW, msg.count - 1]], missing['missing'])
+
+            cdh.list_transfers(Task())
+            self.assertEqual([[msg.transfer_id, PATH, msg.count, msg.count - WINDOW + 3]],
+                             json.loads(downlinked(tq.pop())))
+
+            cdh.resume_transfer(Task(), struct.pack('>HH', msg.transfer_id, 3))
+            resumed = tq.pop()
+            self.assertEqual(3, resumed.base, 'chunks before the start count as received')
+            self.assertTrue(tq.empty())
+
+            cdh.resume_transfer(Task(), struct.pack('>HH', msg.transfer_id, msg.count))
+            self.assertEqual(f'Transfer {msg.transfer_id} complete'.encode(), tq.pop().str,
+                             'a transfer with nothing left to send is not queued')
+            self.assertTrue(tq.empty())
+            self.assertIsNone(self.index.load(msg.transfer_id), 'a complete transfer is forgotten')
+
+            cdh.resume_transfer(Task(), struct.pack('>H', 999))
+            self.assertEqual(b'Unknown transfer 999', tq.pop().str)
+        finally:
+            cdh.transfer_index = original
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, './drivers/emulation/lib')
+sys.path.insert(0, './drivers/emulation/')
+sys.path.insert(0, './applications/flight')
+sys.path.insert(0, './applications/flight/lib')
+sys.path.insert(0, './frame/')
+sys.path.insert(0, './ground')
+
+from radio_utils.windowed_message import WindowedMessage, CHUNK_LEN, WINDOW, unpack_sack
+from radio_utils.transmission_queue import transmission_queue as tq
+import radio_utils.headers as headers
+from reassembler import Reassembler
+from simulated_link import SimulatedLink
+from radio_test_utils import init_radio_task_for_testing
+
+# relative, the emulated SD card maps absolute paths to ./sd
+PATH = 'test_windowed_message.bin'
+
+class WindowedMessageTests(unittest.TestCase):
+
+    def setUp(self):
+        # a bit over two windows
+        self.data = bytes(i % 253 for i in range(CHUNK_LEN * (2 * WINDOW + 3) - 7))
+        with open(PATH, 'wb') as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        os.remove(PATH)
+
+    def send_round(self, msg, reassembler, lose=()):
+        """Sends a round of packets, losing those with the given sequence numbers, returns the SACK"""
+        sack = None
+        while msg.ready():
+            pkt, with_ack = msg.packet()
+            self.assertFalse(with_ack)
+            seq = int.from_bytes(pkt[3:5], 'big')
+            if seq not in lose:
+                sack = reassembler.receive(pkt)
+        return sack
+
+    def test_selective_repeat(self):
+        """Tests that only the lost chunks of a window are sent again"""
+        msg = WindowedMessage(PATH, index=None)
+        reassembler = Reassembler()
+        sack = self.send_round(msg, reassembler, lose=(3, 17))
+        self.assertEqual(headers.SACK, sack[0])
+        transfer_id, base, bitmap = unpack_sack(sack[1:])
+        self.assertEqual((msg.transfer_id, 3), (transfer_id, base))
+        msg.sack(base, bitmap)
+        self.assertEqual(3, msg.base)
+
+        sent = []
+        while msg.ready():
+            pkt, _ = msg.packet()
+            sent.append(int.from_bytes(pkt[3:5], 'big'))
+            sack = reassembler.receive(pkt)
+        self.assertEqual([3, 17] + list(range(WINDOW, WINDOW + 3)), sent,
+                         'the window slides to the first missing chunk')
+        self.assertEqual(headers.WINDOW_POLL, pkt[0])
+        msg.sack(*unpack_sack(sack[1:])[1:])
+
+        while not msg.done():
+            msg.sack(*unpack_sack(self.send_round(msg, reassembler)[1:])[1:])
+        self.assertEqual(self.data, reassembler.data(msg.transfer_id))
+
+    def test_lost_poll(self):
+        """Tests that a missing SACK polls again with the last chunk"""
+        msg = WindowedMessage(PATH, index=None)
+        reassembler = Reassembler()
+        self.assertIsNone(self.send_round(msg, reassembler, lose=(WINDOW - 1,)))
+        msg.no_ack()
+        self.assertEqual(1, msg.missed_sacks)
+        pkt, _ = msg.packet()
+        self.assertEqual((headers.WINDOW_POLL, WINDOW - 1), (pkt[0], int.from_bytes(pkt[3:5], 'big')))
+        msg.sack(*unpack_sack(reassembler.receive(pkt)[1:])[1:])
+        self.assertEqual(WINDOW, msg.base)
+
+    def test_simulated_link(self):
+        """Tests that the file is reassembled over a lossy link"""
+        for loss in (0.0, 0.3):
+            msg = WindowedMessage(PATH, index=None)
+            _, reassembler = SimulatedLink(loss, seed=1).windowed(msg)
+            self.assertTrue(reassembler.complete(msg.transfer_id))
+            self.assertEqual(self.data, reassembler.data(msg.transfer_id))
+
+    def test_radio_task_sack(self):
+        """Tests that the radio task passes SACKs on, and drops the completed transfer"""
+        rt = init_radio_task_for_testing()
+        tq.clear()
+        msg = WindowedMessage(PATH, index=None)
+        tq.push(msg)
+        reassembler = Reassembler()
+        while not msg.done():
+            sack = self.send_round(msg, reassembler)
+            rt.handle_sack(sack[1:])
+        self.assertTrue(tq.empty())
+        self.assertEqual(self.data, reassembler.data(msg.transfer_id))
+
+
+if __name__ == '__main__':
+    unittest.main()